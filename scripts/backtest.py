@@ -0,0 +1,512 @@
+"""Rolling fiscal-year backtests of the value and modification-risk pipelines.
+
+Each fold trains on every fiscal year before its test year (an expanding
+window, optionally capped at ``max_train_years``) and scores the test year.
+Folds run concurrently in a joblib ``loky`` pool; ``threads_per_job`` caps the
+BLAS/OpenMP threads of every worker so ``n_jobs`` folds do not oversubscribe
+the machine.
+
+Both stages are memoized under ``.cache/backtest``:
+
+* a fold's prepared data is keyed by a fingerprint of its rows, its train/test
+  assignment, the preparation settings and the source of the modules doing
+  the preparation, so appending a new fiscal year only prepares the folds that
+  see it and editing the preparation code invalidates them all;
+* a fold's test predictions are additionally keyed by the unfitted pipeline
+  configuration, so rerunning with one changed model only retrains that model.
+
+Typical use::
+
+    result = backtest_value_models(df, models=("gradient_boost", "log_linear"))
+    result.metric_table("r2")
+"""
+
+from __future__ import annotations
+
+import inspect
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, ClassVar, Mapping, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed, parallel_config
+from sklearn.metrics import (
+    average_precision_score,
+    brier_score_loss,
+    mean_absolute_error,
+    mean_squared_error,
+    r2_score,
+    roc_auc_score,
+)
+from sklearn.pipeline import Pipeline
+
+from .contract_modification_risk import (
+    BOOLEAN_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERIC_FEATURES,
+    TARGET_COLUMN,
+    build_modification_risk_pipeline,
+    prepare_modification_features,
+)
+from .hgb_search import fiscal_year_groups
+from .modeling_utils import VALUE_MODEL_NAMES, build_value_pipeline, prepare_value_dataset
+from .preprocessing_cache import frame_fingerprint, transformer_fingerprint
+from .usaspending_utils import REPO_ROOT
+
+DEFAULT_CACHE_DIR = REPO_ROOT / ".cache" / "backtest"
+
+
+@dataclass
+class BacktestFold:
+    """One expanding-window fold: train on ``train_years``, test on ``test_year``."""
+
+    test_year: int
+    train_years: tuple[int, ...]
+    train_index: pd.Index
+    test_index: pd.Index
+
+
+@dataclass
+class FoldData:
+    """Model-ready train/test split of one fold."""
+
+    X_train: pd.DataFrame
+    y_train: pd.Series
+    X_test: pd.DataFrame
+    y_test: pd.Series
+
+
+@dataclass
+class BacktestResult:
+    """Per-fold metrics and test-year predictions of a backtest.
+
+    ``metrics`` has one row per (model, test_year) with the split sizes, the
+    metric columns, ``fit_seconds`` and whether the fold came from the cache.
+    ``predictions`` holds every test row as (model, test_year, row, y_true, y_pred).
+    """
+
+    metrics: pd.DataFrame
+    predictions: pd.DataFrame
+    folds: list[BacktestFold]
+
+    def metric_table(self, metric: str) -> pd.DataFrame:
+        """Return ``metric`` as a test_year x model table."""
+        if metric not in self.metrics.columns:
+            raise KeyError(f"{metric!r} is not a backtest metric.")
+        return self.metrics.pivot(index="test_year", columns="model", values=metric)
+
+
+def expanding_year_folds(
+    years: pd.Series,
+    *,
+    min_train_years: int = 2,
+    test_years: Optional[Sequence[int]] = None,
+    max_train_years: Optional[int] = None,
+) -> list[BacktestFold]:
+    """Build expanding-window folds from a fiscal-year column.
+
+    Parameters
+    ----------
+    years:
+        Fiscal year of every row, indexed like the data; missing years are
+        left out of every fold.
+    min_train_years:
+        Number of earlier fiscal years a test year needs to become a fold.
+    test_years:
+        Restrict the folds to these test years.
+    max_train_years:
+        Keep only the most recent ``max_train_years`` years in each training
+        window (a rolling rather than expanding window).
+    """
+    if min_train_years < 1:
+        raise ValueError("min_train_years must be at least 1.")
+    year_values = pd.to_numeric(years, errors="coerce")
+    valid = year_values.dropna().astype(int)
+    distinct = sorted(valid.unique().tolist())
+
+    folds: list[BacktestFold] = []
+    for position, test_year in enumerate(distinct):
+        if position < min_train_years:
+            continue
+        if test_years is not None and test_year not in test_years:
+            continue
+        train_years = distinct[:position]
+        if max_train_years is not None:
+            train_years = train_years[-max_train_years:]
+        folds.append(
+            BacktestFold(
+                test_year=int(test_year),
+                train_years=tuple(int(year) for year in train_years),
+                train_index=valid.index[valid.isin(train_years)],
+                test_index=valid.index[valid == test_year],
+            )
+        )
+    if not folds:
+        raise ValueError(
+            f"No fold has {min_train_years} earlier fiscal years; available years: {distinct}"
+        )
+    return folds
+
+
+def _source_fingerprint(*objects: object) -> str:
+    """Hash the source of the modules defining ``objects``.
+
+    Falls back to the object's own source (e.g. functions defined in a
+    notebook) and finally to its ``repr``.
+    """
+    sources = []
+    for obj in objects:
+        for target in (inspect.getmodule(obj), obj):
+            try:
+                sources.append(inspect.getsource(target))
+                break
+            except (OSError, TypeError):
+                continue
+        else:
+            sources.append(repr(obj))
+    return joblib.hash(sources)
+
+
+def _prepare_fold(fold_key, *, prepare, data, train_index):
+    # ``fold_key`` identifies the call; the ignored arguments carry the data.
+    return prepare(data, train_index)
+
+
+def _fit_fold(fit_key, *, pipeline, X_train, y_train, X_test, predict_method):
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    predictions = getattr(pipeline, predict_method)(X_test)
+    if predict_method == "predict_proba":
+        predictions = predictions[:, 1]
+    return np.asarray(predictions, dtype=float), fit_seconds
+
+
+def run_backtest(
+    data: pd.DataFrame,
+    folds: Sequence[BacktestFold],
+    *,
+    prepare: Callable[[pd.DataFrame, pd.Index], FoldData],
+    build_pipelines: Callable[[FoldData], Mapping[str, Pipeline]],
+    score: Callable[[pd.Series, np.ndarray], dict[str, float]],
+    prepare_config: Optional[Mapping[str, object]] = None,
+    predict_method: str = "predict",
+    n_jobs: Optional[int] = -1,
+    threads_per_job: int = 1,
+    cache_dir: Optional[Path | str] = DEFAULT_CACHE_DIR,
+    verbose: int = 0,
+) -> BacktestResult:
+    """Prepare, fit and score every fold, reusing cached folds.
+
+    Parameters
+    ----------
+    prepare:
+        ``prepare(fold_rows, train_index)`` returns the fold's :class:`FoldData`
+        (or any object with the same attributes, e.g. a ``PreparedDataset``).
+        It must be a module-level function so it can be pickled. The source
+        of its module, and of the module of its ``wrapped`` attribute if any,
+        is part of the prepared-data cache key.
+    build_pipelines:
+        Returns ``{model_name: unfitted_pipeline}`` for a prepared fold.
+    score:
+        ``score(y_true, y_pred)`` returns the metric dict of one fold.
+    prepare_config:
+        Settings baked into ``prepare``; part of the prepared-data cache key.
+    threads_per_job:
+        BLAS/OpenMP threads available to each worker process.
+    cache_dir:
+        ``joblib.Memory`` location; ``None`` disables caching.
+    """
+    memory = Memory(None if cache_dir is None else Path(cache_dir).expanduser(), verbose=0)
+    prepare_cached = memory.cache(_prepare_fold, ignore=["prepare", "data", "train_index"])
+    fit_cached = memory.cache(_fit_fold, ignore=["pipeline", "X_train", "y_train", "X_test"])
+    config_key = joblib.hash(
+        (
+            getattr(prepare, "__module__", None),
+            getattr(prepare, "__qualname__", repr(prepare)),
+            dict(prepare_config or {}),
+            _source_fingerprint(prepare, getattr(prepare, "wrapped", prepare)),
+        )
+    )
+
+    prepared: dict[int, FoldData] = {}
+    tasks: list[tuple[BacktestFold, str, str, bool]] = []
+    outcomes: list[Optional[tuple[np.ndarray, float]]] = []
+    jobs = []
+    job_positions: list[int] = []
+    for fold in folds:
+        rows = data.loc[fold.train_index.append(fold.test_index)]
+        data_key = frame_fingerprint(rows) + frame_fingerprint(np.asarray(fold.train_index))
+        fold_key = joblib.hash((config_key, data_key))
+        fold_data = prepare_cached(fold_key, prepare=prepare, data=rows, train_index=fold.train_index)
+        prepared[fold.test_year] = fold_data
+
+        for name, pipeline in build_pipelines(fold_data).items():
+            fit_key = joblib.hash((fold_key, name, transformer_fingerprint(pipeline)))
+            call = dict(
+                pipeline=pipeline,
+                X_train=fold_data.X_train,
+                y_train=fold_data.y_train,
+                X_test=fold_data.X_test,
+                predict_method=predict_method,
+            )
+            cached = cache_dir is not None and fit_cached.check_call_in_cache(fit_key, **call)
+            tasks.append((fold, name, fit_key, cached))
+            if cached:
+                # Load in the parent; a pool job would pickle the fold's frames.
+                outcomes.append(fit_cached(fit_key, **call))
+            else:
+                outcomes.append(None)
+                job_positions.append(len(tasks) - 1)
+                jobs.append(delayed(fit_cached)(fit_key, **call))
+
+    if verbose:
+        n_cached = sum(task[3] for task in tasks)
+        print(f"Backtest: {len(tasks)} fold fits, {n_cached} cached, {len(tasks) - n_cached} to run")
+
+    if jobs:
+        with parallel_config(backend="loky", inner_max_num_threads=threads_per_job):
+            for position, outcome in zip(job_positions, Parallel(n_jobs=n_jobs)(jobs)):
+                outcomes[position] = outcome
+
+    metric_rows = []
+    prediction_frames = []
+    for (fold, name, _, cached), (predictions, fit_seconds) in zip(tasks, outcomes):
+        fold_data = prepared[fold.test_year]
+        metric_rows.append(
+            {
+                "model": name,
+                "test_year": fold.test_year,
+                "train_years": f"{fold.train_years[0]}-{fold.train_years[-1]}",
+                "n_train": len(fold_data.y_train),
+                "n_test": len(fold_data.y_test),
+                **score(fold_data.y_test, predictions),
+                "fit_seconds": fit_seconds,
+                "cached": bool(cached),
+            }
+        )
+        prediction_frames.append(
+            pd.DataFrame(
+                {
+                    "model": name,
+                    "test_year": fold.test_year,
+                    "row": fold_data.y_test.index,
+                    "y_true": fold_data.y_test.to_numpy(),
+                    "y_pred": predictions,
+                }
+            )
+        )
+
+    return BacktestResult(
+        metrics=pd.DataFrame(metric_rows).sort_values(["model", "test_year"], ignore_index=True),
+        predictions=pd.concat(prediction_frames, ignore_index=True),
+        folds=list(folds),
+    )
+
+
+def regression_scores(y_true: pd.Series, y_pred: np.ndarray) -> dict[str, float]:
+    """RMSE, MAE and R^2 (on the log10 scale the value models are trained on)."""
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)) if len(y_true) > 1 else float("nan"),
+    }
+
+
+def classification_scores(y_true: pd.Series, y_scores: np.ndarray) -> dict[str, float]:
+    """ROC AUC, average precision and Brier score; AUCs are NaN for one-class years."""
+    both_classes = pd.Series(y_true).nunique() == 2
+    return {
+        "roc_auc": float(roc_auc_score(y_true, y_scores)) if both_classes else float("nan"),
+        "average_precision": (
+            float(average_precision_score(y_true, y_scores)) if both_classes else float("nan")
+        ),
+        "brier": float(brier_score_loss(y_true, y_scores)),
+        "positive_rate": float(np.mean(y_true)),
+    }
+
+
+@dataclass(frozen=True)
+class _ValuePreparer:
+    """Picklable ``prepare`` callable wrapping :func:`prepare_value_dataset`."""
+
+    wrapped: ClassVar[Callable] = staticmethod(prepare_value_dataset)
+    kwargs: tuple[tuple[str, object], ...]
+
+    def __call__(self, data: pd.DataFrame, train_index: pd.Index):
+        return prepare_value_dataset(data, train_index=train_index, **dict(self.kwargs))
+
+
+@dataclass(frozen=True)
+class _ModificationPreparer:
+    """Picklable ``prepare`` callable wrapping :func:`prepare_modification_features`."""
+
+    wrapped: ClassVar[Callable] = staticmethod(prepare_modification_features)
+    kwargs: tuple[tuple[str, object], ...]
+
+    def __call__(self, data: pd.DataFrame, train_index: pd.Index) -> FoldData:
+        X, y = prepare_modification_features(data, **dict(self.kwargs))
+        in_train = X.index.isin(train_index)
+        return FoldData(
+            X_train=X.loc[in_train],
+            y_train=y.loc[in_train],
+            X_test=X.loc[~in_train],
+            y_test=y.loc[~in_train],
+        )
+
+
+def backtest_value_models(
+    df: pd.DataFrame,
+    *,
+    models: Sequence[str] = VALUE_MODEL_NAMES,
+    year_col: str = "action_date_fiscal_year",
+    min_train_years: int = 2,
+    max_train_years: Optional[int] = None,
+    test_years: Optional[Sequence[int]] = None,
+    model_params: Optional[dict[str, dict[str, object]]] = None,
+    random_state: int = 42,
+    float32: bool = False,
+    sparse: bool = False,
+    n_jobs: Optional[int] = -1,
+    threads_per_job: int = 1,
+    cache_dir: Optional[Path | str] = DEFAULT_CACHE_DIR,
+    verbose: int = 0,
+    **prepare_kwargs: object,
+) -> BacktestResult:
+    """Backtest the value models of :func:`scripts.modeling_utils.train_value_models`.
+
+    Every fold runs :func:`prepare_value_dataset` with its training years as
+    ``train_index`` (so the column filters only see training rows) and fits
+    :func:`build_value_pipeline` for each model. Remaining keyword arguments
+    go to ``prepare_value_dataset`` (``target_col``, ``drop_columns``, ...).
+    Metrics are on the log10 target.
+    """
+    if year_col not in df.columns:
+        raise KeyError(f"{year_col} is missing from the provided DataFrame.")
+    unknown = [name for name in models if name not in VALUE_MODEL_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown value models {unknown}; expected any of {VALUE_MODEL_NAMES}.")
+    folds = expanding_year_folds(
+        df[year_col],
+        min_train_years=min_train_years,
+        test_years=test_years,
+        max_train_years=max_train_years,
+    )
+    params = model_params or {}
+
+    def build_pipelines(prepared) -> dict[str, Pipeline]:
+        return {
+            name: build_value_pipeline(
+                name,
+                prepared,
+                random_state=random_state,
+                params=params.get(name),
+                float32=float32,
+                sparse=sparse,
+            )
+            for name in dict.fromkeys(models)
+        }
+
+    prepare_config = tuple(sorted(prepare_kwargs.items()))
+    return run_backtest(
+        df,
+        folds,
+        prepare=_ValuePreparer(prepare_config),
+        build_pipelines=build_pipelines,
+        score=regression_scores,
+        prepare_config=dict(prepare_config),
+        n_jobs=n_jobs,
+        threads_per_job=threads_per_job,
+        cache_dir=cache_dir,
+        verbose=verbose,
+    )
+
+
+def backtest_modification_risk(
+    dataset: pd.DataFrame,
+    *,
+    year_col: Optional[str] = None,
+    numeric_features: Sequence[str] = NUMERIC_FEATURES,
+    categorical_features: Sequence[str] = CATEGORICAL_FEATURES,
+    boolean_features: Sequence[str] = BOOLEAN_FEATURES,
+    target_column: str = TARGET_COLUMN,
+    min_train_years: int = 2,
+    max_train_years: Optional[int] = None,
+    test_years: Optional[Sequence[int]] = None,
+    model_params: Optional[dict[str, object]] = None,
+    random_state: int = 42,
+    float32: bool = False,
+    n_jobs: Optional[int] = -1,
+    threads_per_job: int = 1,
+    cache_dir: Optional[Path | str] = DEFAULT_CACHE_DIR,
+    verbose: int = 0,
+) -> BacktestResult:
+    """Backtest the modification-risk classifier on base-award fiscal years.
+
+    Without ``year_col`` the fiscal year is derived from ``action_date``.
+    Metrics are computed from the predicted modification probability.
+    """
+    if year_col is None:
+        if "action_date" not in dataset.columns:
+            raise KeyError("Pass year_col or provide an action_date column.")
+        years = pd.Series(fiscal_year_groups(dataset["action_date"]), index=dataset.index)
+        years = years.where(years >= 0)
+    elif year_col not in dataset.columns:
+        raise KeyError(f"{year_col} is missing from the provided DataFrame.")
+    else:
+        years = dataset[year_col]
+    folds = expanding_year_folds(
+        years,
+        min_train_years=min_train_years,
+        test_years=test_years,
+        max_train_years=max_train_years,
+    )
+
+    def build_pipelines(fold_data) -> dict[str, Pipeline]:
+        return {
+            "modification_risk": build_modification_risk_pipeline(
+                numeric_features,
+                categorical_features,
+                boolean_features,
+                random_state=random_state,
+                model_params=model_params,
+                float32=float32,
+            )
+        }
+
+    prepare_config = (
+        ("numeric_features", tuple(numeric_features)),
+        ("categorical_features", tuple(categorical_features)),
+        ("boolean_features", tuple(boolean_features)),
+        ("target_column", target_column),
+    )
+    return run_backtest(
+        dataset,
+        folds,
+        prepare=_ModificationPreparer(prepare_config),
+        build_pipelines=build_pipelines,
+        score=classification_scores,
+        prepare_config=dict(prepare_config),
+        predict_method="predict_proba",
+        n_jobs=n_jobs,
+        threads_per_job=threads_per_job,
+        cache_dir=cache_dir,
+        verbose=verbose,
+    )
+
+
+__all__ = [
+    "BacktestFold",
+    "BacktestResult",
+    "DEFAULT_CACHE_DIR",
+    "FoldData",
+    "backtest_modification_risk",
+    "backtest_value_models",
+    "classification_scores",
+    "expanding_year_folds",
+    "regression_scores",
+    "run_backtest",
+]
@@ -0,0 +1,276 @@
+"""Contract-grouped cross-validation of the modification-cascade models.
+
+The cascade data has one row per modification, so a row-level split puts
+modifications of the same contract on both sides and overstates the scores.
+:func:`cross_validate_cascade` splits with ``GroupKFold`` on
+``contract_award_unique_key`` and evaluates the next-modification classifier
+and the next-value-change regressor with the hyperparameters of the models in
+``models/``.
+
+The encoded feature matrix is built once and dumped to a temporary ``.joblib``
+file; the fold workers receive a read-only memory map of it plus the integer
+row indices of their fold, so the matrix is never pickled to each process.
+Folds run in a joblib ``loky`` pool with ``threads_per_job`` BLAS/OpenMP
+threads each.
+
+Typical use::
+
+    engineered = engineer_modification_features(prepare_modification_history(raw))
+    result = cross_validate_cascade(engineered, categories=vocabulary, n_jobs=5)
+    result.summary()
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, parallel_config
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import GroupKFold
+from sklearn.pipeline import Pipeline
+
+from .backtest import classification_scores, regression_scores
+from .modification_cascade_utils import build_cascade_feature_matrix
+
+GROUP_COLUMN = "contract_award_unique_key"
+CLASSIFIER_TARGET = "has_next_modification"
+REGRESSOR_TARGET = "next_value_change"
+CASCADE_MODELS: tuple[str, ...] = ("classifier", "regressor")
+
+# Hyperparameters of the persisted cascade models.
+CASCADE_MODEL_PARAMS: dict[str, object] = {
+    "learning_rate": 0.08,
+    "max_depth": 8,
+    "min_samples_leaf": 50,
+    "max_iter": 200,
+}
+
+
+@dataclass
+class CascadeCVResult:
+    """Per-fold metrics, timings and out-of-fold predictions.
+
+    ``metrics`` has one row per (model, fold) with the split sizes, the metric
+    columns and ``fit_seconds`` / ``predict_seconds`` / ``fold_seconds`` (the
+    latter measured inside the worker, including slicing the memory map).
+    ``predictions`` holds every test row as (model, fold, row, group, y_true,
+    y_pred). ``setup_seconds`` covers encoding and dumping the feature matrix.
+    """
+
+    metrics: pd.DataFrame
+    predictions: pd.DataFrame
+    setup_seconds: float
+    wall_seconds: float
+
+    def summary(self) -> pd.DataFrame:
+        """Mean and standard deviation of every metric and timing across folds."""
+        numeric = self.metrics.drop(columns=["fold"]).select_dtypes("number")
+        return numeric.groupby(self.metrics["model"]).agg(["mean", "std"])
+
+
+def build_cascade_estimator(
+    model: str,
+    *,
+    random_state: int = 42,
+    params: Optional[Mapping[str, object]] = None,
+) -> Pipeline:
+    """Median imputer plus the HistGradientBoosting model used for ``model``."""
+    if model not in CASCADE_MODELS:
+        raise ValueError(f"Unknown cascade model {model!r}; expected one of {CASCADE_MODELS}.")
+    estimator_cls = (
+        HistGradientBoostingClassifier if model == "classifier" else HistGradientBoostingRegressor
+    )
+    estimator = estimator_cls(
+        **{**CASCADE_MODEL_PARAMS, "random_state": random_state, **dict(params or {})}
+    )
+    return Pipeline(
+        [("imputer", SimpleImputer(strategy="median", keep_empty_features=True)), ("model", estimator)]
+    )
+
+
+def _fit_fold(model, fold, *, estimator, X, y, train_idx, test_idx, clip_quantiles):
+    start = time.perf_counter()
+    # Fancy indexing copies just this fold's rows out of the memory map.
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test = X[test_idx]
+    if clip_quantiles is not None:
+        lower, upper = np.quantile(y_train, clip_quantiles)
+        y_train = np.clip(y_train, lower, upper)
+    if model == "classifier":
+        y_train = y_train.astype(bool)
+
+    fit_start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+
+    predict_start = time.perf_counter()
+    if model == "classifier":
+        predictions = estimator.predict_proba(X_test)[:, 1]
+    else:
+        predictions = estimator.predict(X_test)
+    predict_seconds = time.perf_counter() - predict_start
+    timings = {
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+        "fold_seconds": time.perf_counter() - start,
+    }
+    return np.asarray(predictions, dtype=float), timings
+
+
+def cross_validate_cascade(
+    engineered: pd.DataFrame,
+    *,
+    categories: Optional[Mapping[str, Sequence[str]]] = None,
+    models: Sequence[str] = CASCADE_MODELS,
+    n_splits: int = 5,
+    group_col: str = GROUP_COLUMN,
+    model_params: Optional[dict[str, dict[str, object]]] = None,
+    clip_quantiles: Optional[tuple[float, float]] = (0.01, 0.99),
+    random_state: int = 42,
+    n_jobs: Optional[int] = -1,
+    threads_per_job: int = 1,
+    temp_folder: Optional[Path | str] = None,
+    verbose: int = 0,
+) -> CascadeCVResult:
+    """Cross-validate the cascade models with contract-level ``GroupKFold`` splits.
+
+    Parameters
+    ----------
+    engineered:
+        Output of :func:`scripts.modification_cascade_utils.engineer_modification_features`.
+    categories:
+        Label vocabulary passed to :func:`build_cascade_feature_matrix`; by
+        default every categorical column is encoded by its own sorted labels.
+    models:
+        Any of ``"classifier"`` (``has_next_modification`` on every row) and
+        ``"regressor"`` (``next_value_change`` on rows followed by another
+        modification). Both use the same contract folds.
+    model_params:
+        Per-model overrides of :data:`CASCADE_MODEL_PARAMS`.
+    clip_quantiles:
+        Winsorize the regressor's training target at these quantiles of the
+        fold's training rows (``None`` to fit the raw target). Test targets are
+        never clipped.
+    threads_per_job:
+        BLAS/OpenMP threads available to each worker process.
+    temp_folder:
+        Where the memory-mapped feature matrix is written (default: the system
+        temporary directory). The file is removed afterwards.
+    """
+    missing = [col for col in (group_col, CLASSIFIER_TARGET, REGRESSOR_TARGET) if col not in engineered.columns]
+    if missing:
+        raise KeyError(f"Columns missing from the engineered frame: {missing}")
+    unknown = [name for name in models if name not in CASCADE_MODELS]
+    if unknown:
+        raise ValueError(f"Unknown cascade models {unknown}; expected any of {CASCADE_MODELS}.")
+
+    wall_start = time.perf_counter()
+    data = engineered.loc[engineered[group_col].notna()]
+    groups = data[group_col].to_numpy()
+    n_groups = pd.unique(groups).size
+    if n_groups < n_splits:
+        raise ValueError(f"{n_groups} contracts cannot be split into {n_splits} folds.")
+
+    features = build_cascade_feature_matrix(data, categories)
+    targets = {
+        "classifier": data[CLASSIFIER_TARGET].to_numpy(dtype=float),
+        "regressor": pd.to_numeric(data[REGRESSOR_TARGET], errors="coerce").to_numpy(dtype=float),
+    }
+    eligible = {
+        "classifier": np.ones(len(data), dtype=bool),
+        "regressor": data[CLASSIFIER_TARGET].to_numpy(dtype=bool) & np.isfinite(targets["regressor"]),
+    }
+    splits = list(GroupKFold(n_splits=n_splits).split(features, groups=groups))
+    params = model_params or {}
+
+    with tempfile.TemporaryDirectory(prefix="cascade_cv_", dir=temp_folder) as folder:
+        path = Path(folder) / "features.joblib"
+        joblib.dump(np.ascontiguousarray(features.to_numpy(dtype=np.float64)), path)
+        X = joblib.load(path, mmap_mode="r")
+        setup_seconds = time.perf_counter() - wall_start
+
+        tasks = []
+        jobs = []
+        for fold, (train_idx, test_idx) in enumerate(splits):
+            for model in dict.fromkeys(models):
+                keep = eligible[model]
+                fold_train = train_idx[keep[train_idx]]
+                fold_test = test_idx[keep[test_idx]]
+                if fold_train.size == 0 or fold_test.size == 0:
+                    continue
+                tasks.append((model, fold, fold_train, fold_test))
+                jobs.append(
+                    delayed(_fit_fold)(
+                        model,
+                        fold,
+                        estimator=build_cascade_estimator(
+                            model, random_state=random_state, params=params.get(model)
+                        ),
+                        X=X,
+                        y=targets[model],
+                        train_idx=fold_train,
+                        test_idx=fold_test,
+                        clip_quantiles=clip_quantiles if model == "regressor" else None,
+                    )
+                )
+
+        # The memmap is pickled as a file reference, so max_nbytes only matters
+        # for the target vectors, which are small enough to send directly.
+        with parallel_config(backend="loky", inner_max_num_threads=threads_per_job):
+            outcomes = Parallel(n_jobs=n_jobs, max_nbytes=None, verbose=verbose)(jobs)
+        del X
+
+    metric_rows = []
+    prediction_frames = []
+    for (model, fold, train_idx, test_idx), (predictions, timings) in zip(tasks, outcomes):
+        y_true = targets[model][test_idx]
+        if model == "classifier":
+            y_true = y_true.astype(bool)
+        scores = classification_scores if model == "classifier" else regression_scores
+        metric_rows.append(
+            {
+                "model": model,
+                "fold": fold,
+                "n_train": len(train_idx),
+                "n_test": len(test_idx),
+                "n_test_contracts": pd.unique(groups[test_idx]).size,
+                **scores(pd.Series(y_true), predictions),
+                **timings,
+            }
+        )
+        prediction_frames.append(
+            pd.DataFrame(
+                {
+                    "model": model,
+                    "fold": fold,
+                    "row": data.index[test_idx],
+                    "group": groups[test_idx],
+                    "y_true": y_true.astype(float),
+                    "y_pred": predictions,
+                }
+            )
+        )
+
+    return CascadeCVResult(
+        metrics=pd.DataFrame(metric_rows).sort_values(["model", "fold"], ignore_index=True),
+        predictions=pd.concat(prediction_frames, ignore_index=True),
+        setup_seconds=setup_seconds,
+        wall_seconds=time.perf_counter() - wall_start,
+    )
+
+
+__all__ = [
+    "CASCADE_MODELS",
+    "CASCADE_MODEL_PARAMS",
+    "CascadeCVResult",
+    "build_cascade_estimator",
+    "cross_validate_cascade",
+]
@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 import sqlite3
+from dataclasses import dataclass, field
+from itertools import combinations
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Mapping, Sequence
 
+import joblib
 import numpy as np
 import pandas as pd
 from sklearn.compose import ColumnTransformer
@@ -14,6 +17,8 @@ from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OrdinalEncoder
 
+from .precision_utils import float32_caster
+
 
 # Columns needed for the competition intensity workflow.
 DEFAULT_USECOLS: List[str] = [
@@ -53,6 +58,23 @@ EXCLUSIONARY_EXTENT_LABELS = {
     "FULL AND OPEN COMPETITION AFTER EXCLUSION OF SOURCES",
 }
 
+REGRESSION_MODEL_PARAMS: dict[str, object] = {
+    "max_depth": 8,
+    "learning_rate": 0.08,
+    "min_samples_leaf": 35,
+    "l2_regularization": 0.2,
+    "random_state": 42,
+}
+
+LOW_COMPETITION_MODEL_PARAMS: dict[str, object] = {
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "min_samples_leaf": 30,
+    "l2_regularization": 0.1,
+    "class_weight": "balanced",
+    "random_state": 42,
+}
+
 
 def load_security_transactions(
     csv_path: Path | str,
@@ -190,9 +212,20 @@ def filter_open_competitions(
 
 
 def build_regression_pipeline(
-    categorical_cols: Sequence[str], numeric_cols: Sequence[str]
+    categorical_cols: Sequence[str],
+    numeric_cols: Sequence[str],
+    *,
+    model_params: dict[str, object] | None = None,
+    float32: bool = False,
 ) -> Pipeline:
-    """Create the regressor pipeline for offer-count prediction."""
+    """Create the regressor pipeline for offer-count prediction.
+
+    ``model_params`` overrides entries of ``REGRESSION_MODEL_PARAMS``. Fit it
+    with :func:`scripts.preprocessing_cache.fit_pipeline_cached` to reuse the
+    fitted preprocessor across notebook reruns. ``float32=True`` casts the
+    encoded matrix to float32; HistGradientBoosting converts it back to float64,
+    so this only saves memory in the cached preprocessor output.
+    """
 
     categorical = Pipeline(
         steps=[
@@ -202,13 +235,17 @@ def build_regression_pipeline(
                 OrdinalEncoder(
                     handle_unknown="use_encoded_value",
                     unknown_value=-1,
-                    dtype=np.float32,
+                    dtype=np.float32 if float32 else np.float64,
                 ),
             ),
         ]
     )
 
-    numeric = Pipeline(steps=[("imputer", SimpleImputer(strategy="median"))])
+    numeric_steps = [("imputer", SimpleImputer(strategy="median"))]
+    if float32:
+        # Match the float32 encoder output so the stacked matrix stays float32.
+        numeric_steps.append(("float32", float32_caster()))
+    numeric = Pipeline(steps=numeric_steps)
 
     preprocessor = ColumnTransformer(
         transformers=[
@@ -218,20 +255,26 @@ def build_regression_pipeline(
     )
 
     model = HistGradientBoostingRegressor(
-        max_depth=8,
-        learning_rate=0.08,
-        min_samples_leaf=35,
-        l2_regularization=0.2,
-        random_state=42,
+        **{**REGRESSION_MODEL_PARAMS, **(model_params or {})}
     )
 
     return Pipeline(steps=[("preprocess", preprocessor), ("model", model)])
 
 
 def build_low_competition_classifier(
-    categorical_cols: Sequence[str], numeric_cols: Sequence[str]
+    categorical_cols: Sequence[str],
+    numeric_cols: Sequence[str],
+    *,
+    model_params: dict[str, object] | None = None,
+    float32: bool = False,
 ) -> Pipeline:
-    """Classifier for identifying low-competition opportunities."""
+    """Classifier for identifying low-competition opportunities.
+
+    ``model_params`` overrides entries of ``LOW_COMPETITION_MODEL_PARAMS``.
+    Like :func:`build_regression_pipeline`, it can be fitted through
+    :func:`scripts.preprocessing_cache.fit_pipeline_cached` and builds a
+    float32 matrix only with ``float32=True``.
+    """
 
     categorical = Pipeline(
         steps=[
@@ -241,13 +284,17 @@ def build_low_competition_classifier(
                 OrdinalEncoder(
                     handle_unknown="use_encoded_value",
                     unknown_value=-1,
-                    dtype=np.float32,
+                    dtype=np.float32 if float32 else np.float64,
                 ),
             ),
         ]
     )
 
-    numeric = Pipeline(steps=[("imputer", SimpleImputer(strategy="median"))])
+    numeric_steps = [("imputer", SimpleImputer(strategy="median"))]
+    if float32:
+        # Match the float32 encoder output so the stacked matrix stays float32.
+        numeric_steps.append(("float32", float32_caster()))
+    numeric = Pipeline(steps=numeric_steps)
 
     preprocessor = ColumnTransformer(
         transformers=[
@@ -257,12 +304,7 @@ def build_low_competition_classifier(
     )
 
     model = HistGradientBoostingClassifier(
-        max_depth=6,
-        learning_rate=0.1,
-        min_samples_leaf=30,
-        l2_regularization=0.1,
-        class_weight="balanced",
-        random_state=42,
+        **{**LOW_COMPETITION_MODEL_PARAMS, **(model_params or {})}
     )
 
     return Pipeline(steps=[("preprocess", preprocessor), ("model", model)])
@@ -318,3 +360,253 @@ def summarize_low_competition_niches(
     grouped.attrs["high_value_cutoff"] = value_cut
     grouped.attrs["low_threshold"] = low_threshold
     return grouped
+
+
+def _group_quantiles(
+    sorted_values: np.ndarray,
+    starts: np.ndarray,
+    counts: np.ndarray,
+    q: float,
+) -> np.ndarray:
+    """Linear-interpolated quantile of each group's ascending run of values.
+
+    Group ``i`` occupies ``sorted_values[starts[i]:starts[i] + counts[i]]``;
+    groups without values get NaN (matching ``Series.quantile``).
+    """
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    has_values = counts > 0
+    lo = sorted_values[np.where(has_values, starts + lower, 0)]
+    hi = sorted_values[np.where(has_values, starts + upper, 0)]
+    result = lo + (hi - lo) * (position - lower)
+    return np.where(has_values, result, np.nan)
+
+
+@dataclass
+class NicheCube:
+    """Niche metrics for several grouping subsets of the same dimensions.
+
+    Built by :func:`build_niche_cube`. ``cells`` maps each grouping (a tuple
+    of dimension names in ``dimensions`` order) to a frame of integer codes
+    per dimension plus the unfiltered metrics of every non-empty cell;
+    ``categories`` decodes the codes. :meth:`query` turns a grouping into the
+    same table :func:`summarize_low_competition_niches` returns.
+    """
+
+    dimensions: tuple[str, ...]
+    categories: dict[str, pd.Index]
+    cells: dict[tuple[str, ...], pd.DataFrame]
+    high_value_cutoff: float
+    low_threshold: int
+    high_value_quantile: float
+    metadata: dict[str, object] = field(default_factory=dict)
+
+    @property
+    def groupings(self) -> list[tuple[str, ...]]:
+        return list(self.cells)
+
+    def _grouping_key(self, group_cols: Iterable[str]) -> tuple[str, ...]:
+        requested = list(group_cols)
+        unknown = [col for col in requested if col not in self.dimensions]
+        if unknown:
+            raise KeyError(f"{unknown} are not cube dimensions {list(self.dimensions)}.")
+        key = tuple(dim for dim in self.dimensions if dim in requested)
+        if key not in self.cells:
+            raise KeyError(f"Grouping {key} was not built; available: {self.groupings}")
+        return key
+
+    def query(
+        self,
+        group_cols: Iterable[str],
+        *,
+        filters: Mapping[str, object | Sequence[object]] | None = None,
+        min_awards: int = 10,
+    ) -> pd.DataFrame:
+        """Return the niche table of ``group_cols``, optionally restricted by ``filters``.
+
+        ``filters`` maps a dimension of the grouping to one value or a list of
+        values to keep. Rows are filtered by ``min_awards`` and a positive
+        high-value low-competition count and sorted by ``niche_score``, as in
+        :func:`summarize_low_competition_niches`.
+        """
+        group_cols = list(group_cols)
+        key = self._grouping_key(group_cols)
+        cells = self.cells[key]
+
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, wanted in (filters or {}).items():
+            if dim not in key:
+                raise KeyError(f"Filter column {dim!r} is not part of the grouping {key}.")
+            values = [wanted] if isinstance(wanted, str) or not isinstance(wanted, Sequence) else wanted
+            codes = self.categories[dim].get_indexer(list(values))
+            mask &= np.isin(cells[dim].to_numpy(), codes[codes >= 0])
+        mask &= cells["awards"].to_numpy() >= min_awards
+        mask &= cells["hv_low_comp_count"].to_numpy() > 0
+        selected = cells.loc[mask]
+
+        result = pd.DataFrame(
+            {
+                dim: self.categories[dim].take(selected[dim].to_numpy())
+                for dim in group_cols
+            }
+        )
+        metrics = selected.drop(columns=list(key)).reset_index(drop=True)
+        result = pd.concat([result, metrics], axis=1)
+        result["niche_score"] = result["hv_low_comp_share"] * result["median_value"]
+        result = result.sort_values(
+            by=["niche_score", "hv_low_comp_share"], ascending=False
+        ).reset_index(drop=True)
+
+        result.attrs["high_value_cutoff"] = self.high_value_cutoff
+        result.attrs["low_threshold"] = self.low_threshold
+        return result
+
+    def drill_down(
+        self,
+        group_cols: Iterable[str],
+        by: str,
+        *,
+        filters: Mapping[str, object | Sequence[object]] | None = None,
+        min_awards: int = 10,
+    ) -> pd.DataFrame:
+        """Split the ``filters`` cells of ``group_cols`` further by dimension ``by``."""
+        return self.query([*group_cols, by], filters=filters, min_awards=min_awards)
+
+    def save(self, path: Path | str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path | str) -> "NicheCube":
+        cube = joblib.load(Path(path))
+        if not isinstance(cube, cls):
+            raise ValueError(f"{path} does not contain a {cls.__name__}.")
+        return cube
+
+
+def build_niche_cube(
+    df: pd.DataFrame,
+    dimensions: Sequence[str],
+    *,
+    groupings: Iterable[Sequence[str]] | None = None,
+    max_depth: int | None = None,
+    low_threshold: int = 3,
+    high_value_quantile: float = 0.8,
+) -> NicheCube:
+    """Compute the niche metrics for many groupings of ``dimensions`` at once.
+
+    Every dimension is factorized once and the values are sorted once; each
+    grouping then only combines integer codes into cell ids, sums the additive
+    flags with ``np.bincount`` and reads the median/p90 from the value-sorted
+    rows of each cell. Without ``groupings`` every subset of ``dimensions``
+    with at most ``max_depth`` columns is built. Rows with a missing value in
+    a grouping's columns are left out of that grouping, as in ``groupby``.
+    """
+    dimensions = list(dict.fromkeys(dimensions))
+    required = [*dimensions, "number_of_offers_received", "base_and_all_options_value"]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise KeyError(f"Columns {missing} are missing from the provided DataFrame.")
+
+    if groupings is None:
+        depth = len(dimensions) if max_depth is None else max_depth
+        keys = [
+            combo
+            for size in range(1, depth + 1)
+            for combo in combinations(dimensions, size)
+        ]
+    else:
+        keys = []
+        for grouping in groupings:
+            unknown = [col for col in grouping if col not in dimensions]
+            if unknown:
+                raise KeyError(f"Grouping columns {unknown} are not in dimensions {dimensions}.")
+            keys.append(tuple(dim for dim in dimensions if dim in grouping))
+        keys = list(dict.fromkeys(keys))
+
+    offers = pd.to_numeric(df["number_of_offers_received"], errors="coerce").to_numpy(dtype=float)
+    values = pd.to_numeric(df["base_and_all_options_value"], errors="coerce").to_numpy(dtype=float)
+    value_cut = float(df["base_and_all_options_value"].quantile(high_value_quantile))
+    is_low = offers <= low_threshold
+    is_high = values >= value_cut
+    flags = {
+        "low": is_low.astype(float),
+        "high": is_high.astype(float),
+        "hv_low": (is_low & is_high).astype(float),
+        "offers": np.nan_to_num(offers),
+        "offers_n": (~np.isnan(offers)).astype(float),
+        "values_n": (~np.isnan(values)).astype(float),
+    }
+
+    codes: dict[str, np.ndarray] = {}
+    categories: dict[str, pd.Index] = {}
+    for dim in dimensions:
+        dim_codes, uniques = pd.factorize(df[dim], sort=True)
+        codes[dim] = dim_codes.astype(np.int64)
+        categories[dim] = pd.Index(uniques)
+
+    # NaN values sort last, so within every cell the valid values come first.
+    value_order = np.argsort(values, kind="stable")
+    sorted_values = values[value_order]
+
+    cells: dict[tuple[str, ...], pd.DataFrame] = {}
+    for key in keys:
+        cell_id = np.zeros(len(df), dtype=np.int64)
+        span = 1
+        valid = np.ones(len(df), dtype=bool)
+        for dim in key:
+            radix = max(len(categories[dim]), 1)
+            if span * radix >= 2**62:
+                # Renumber the occupied cells so the combined id cannot overflow.
+                cell_id = np.unique(cell_id, return_inverse=True)[1].astype(np.int64)
+                span = int(cell_id.max()) + 1
+            cell_id = cell_id * radix + codes[dim]
+            span *= radix
+            valid &= codes[dim] >= 0
+        valid_rows = np.flatnonzero(valid)
+        _, first, inverse = np.unique(
+            cell_id[valid_rows], return_index=True, return_inverse=True
+        )
+        n_cells = len(first)
+        row_cell = np.full(len(df), -1, dtype=np.int64)
+        row_cell[valid] = inverse
+
+        def total(name: str) -> np.ndarray:
+            return np.bincount(inverse, weights=flags[name][valid], minlength=n_cells)
+
+        awards = np.bincount(inverse, minlength=n_cells)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frame = {
+                "awards": awards,
+                "avg_offers": total("offers") / total("offers_n"),
+                "low_comp_share": total("low") / awards,
+                "high_value_share": total("high") / awards,
+                "hv_low_comp_count": total("hv_low").astype(np.int64),
+                "hv_low_comp_share": total("hv_low") / awards,
+            }
+
+        # Stable sort of the value-ordered rows by cell keeps each cell's values ascending.
+        ordered_cells = row_cell[value_order]
+        in_grouping = ordered_cells >= 0
+        by_cell = np.argsort(ordered_cells[in_grouping], kind="stable")
+        cell_values = sorted_values[in_grouping][by_cell]
+        starts = np.concatenate([[0], np.cumsum(awards)[:-1]])
+        value_counts = total("values_n").astype(np.int64)
+        frame["median_value"] = _group_quantiles(cell_values, starts, value_counts, 0.5)
+        frame["p90_value"] = _group_quantiles(cell_values, starts, value_counts, 0.9)
+
+        first_rows = valid_rows[first]
+        cells[key] = pd.DataFrame({**{dim: codes[dim][first_rows] for dim in key}, **frame})
+
+    return NicheCube(
+        dimensions=tuple(dimensions),
+        categories=categories,
+        cells=cells,
+        high_value_cutoff=value_cut,
+        low_threshold=low_threshold,
+        high_value_quantile=high_value_quantile,
+        metadata={"rows": len(df)},
+    )
@@ -0,0 +1,391 @@
+"""Export fitted HistGradientBoosting models to plain NumPy arrays and score them.
+
+Unpickling a HistGradientBoosting pipeline imports scikit-learn and rebuilds
+the whole ``ColumnTransformer``, which dominates the start-up of short-lived
+scoring workers. :func:`export_hgb` flattens a fitted model, and optionally
+its preprocessing, into a single ``.npz`` file:
+
+* per output feature: source column, fill value (median/mean/most-frequent
+  imputation), standard-scaler parameters, float32 cast, and the ordinal
+  category table;
+* every tree's nodes (feature, threshold, missing-value direction, children,
+  leaf value) concatenated into flat arrays, plus the baseline and link.
+
+:class:`CompiledHGB` loads that file with ``np.load`` (no pickles) and
+reproduces ``predict``/``predict_proba`` using NumPy and pandas only. All
+trees are traversed together, one depth level per step.
+
+Supported preprocessing steps: ``SimpleImputer``, ``OrdinalEncoder``,
+``StandardScaler``, the :func:`scripts.precision_utils.float32_caster` step
+and ``"passthrough"``/``"drop"``, alone, in a ``Pipeline`` or inside a
+``ColumnTransformer``. Models with native categorical splits are rejected.
+
+Typical use::
+
+    export_hgb(pipeline, "models/modification_risk.npz")
+    model = CompiledHGB.load("models/modification_risk.npz")
+    model.predict_proba(frame)[:, 1]
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Encodings of ``CompiledHGB.link``.
+LINKS: tuple[str, ...] = ("identity", "log", "logit", "multinomial")
+
+_KIND_NUMERIC = 0
+_KIND_ORDINAL = 1
+
+
+@dataclass
+class _FeatureSpec:
+    """Flattened preprocessing of one model input column (export-time only)."""
+
+    source: str
+    kind: int = _KIND_NUMERIC
+    fill_number: float = np.nan
+    fill_label: Optional[str] = None
+    mean: float = 0.0
+    scale: float = 1.0
+    cast32: bool = False
+    categories: list[str] = field(default_factory=list)
+    unknown_value: float = np.nan
+    missing_value: float = np.nan
+
+
+def _apply_step(step: object, specs: list[_FeatureSpec]) -> list[_FeatureSpec]:
+    """Fold one fitted preprocessing step into ``specs``; returns the output specs."""
+    # scikit-learn is only needed to export, never to score.
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer, OrdinalEncoder, StandardScaler
+
+    from .precision_utils import to_float32
+
+    if step == "passthrough" or step is None:
+        return specs
+    if isinstance(step, Pipeline):
+        for _, inner in step.steps:
+            specs = _apply_step(inner, specs)
+        return specs
+    if isinstance(step, SimpleImputer):
+        if getattr(step, "add_indicator", False):
+            raise ValueError("SimpleImputer(add_indicator=True) is not supported.")
+        statistics = step.statistics_
+        if len(statistics) != len(specs):
+            raise ValueError("SimpleImputer dropped all-missing columns; refit with keep_empty_features=True.")
+        for spec, value in zip(specs, statistics):
+            if spec.kind != _KIND_NUMERIC or spec.scale != 1.0 or spec.mean != 0.0:
+                raise ValueError("SimpleImputer must come before encoding and scaling.")
+            if not isinstance(value, (int, float, np.number)):
+                spec.fill_label = str(value)
+            else:
+                spec.fill_number = float(value)
+        return specs
+    if isinstance(step, OrdinalEncoder):
+        if len(step.categories_) != len(specs):
+            raise ValueError("OrdinalEncoder columns do not match its inputs.")
+        unknown = step.unknown_value if step.handle_unknown == "use_encoded_value" else np.nan
+        for spec, categories in zip(specs, step.categories_):
+            if any(pd.isna(value) for value in categories):
+                raise ValueError("OrdinalEncoder categories containing NaN are not supported.")
+            spec.kind = _KIND_ORDINAL
+            spec.categories = [str(value) for value in categories]
+            spec.unknown_value = float(unknown)
+            spec.missing_value = float(step.encoded_missing_value)
+            spec.cast32 = np.dtype(step.dtype) == np.float32
+        return specs
+    if isinstance(step, StandardScaler):
+        means = step.mean_ if step.with_mean else np.zeros(len(specs))
+        scales = step.scale_ if step.with_std else np.ones(len(specs))
+        for spec, mean, scale in zip(specs, means, scales):
+            if spec.cast32:
+                raise ValueError("StandardScaler after a float32 cast is not supported.")
+            spec.mean, spec.scale = float(mean), float(scale)
+        return specs
+    if isinstance(step, FunctionTransformer) and step.func is to_float32:
+        for spec in specs:
+            spec.cast32 = True
+        return specs
+    raise ValueError(f"Cannot compile preprocessing step {type(step).__name__}.")
+
+
+def _flatten_preprocessor(preprocessor: object, input_names: Sequence[str]) -> list[_FeatureSpec]:
+    from sklearn.compose import ColumnTransformer
+
+    if preprocessor is None:
+        return [_FeatureSpec(source=name) for name in input_names]
+    if not isinstance(preprocessor, ColumnTransformer):
+        return _apply_step(preprocessor, [_FeatureSpec(source=name) for name in input_names])
+
+    specs: list[_FeatureSpec] = []
+    for _, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        selected = np.asarray(columns)
+        if selected.dtype == bool:
+            selected = np.flatnonzero(selected)
+        if selected.dtype.kind in "iu":
+            names = [input_names[int(idx)] for idx in selected]
+        else:
+            names = [str(name) for name in selected]
+        if not names:
+            continue
+        specs.extend(_apply_step(transformer, [_FeatureSpec(source=name) for name in names]))
+    return specs
+
+
+def _link_name(model: object) -> str:
+    link = type(model._loss.link).__name__
+    mapping = {
+        "IdentityLink": "identity",
+        "LogLink": "log",
+        "LogitLink": "logit",
+        "MultinomialLogit": "multinomial",
+    }
+    if link not in mapping:
+        raise ValueError(f"Unsupported HistGradientBoosting link {link}.")
+    return mapping[link]
+
+
+def export_hgb(
+    model: object,
+    path: Path | str,
+    *,
+    preprocessor: Optional[object] = None,
+    input_names: Optional[Sequence[str]] = None,
+) -> Path:
+    """Write a fitted HistGradientBoosting model and its preprocessing to ``path`` (``.npz``).
+
+    Parameters
+    ----------
+    model:
+        Fitted ``HistGradientBoostingClassifier``/``Regressor`` or a
+        ``Pipeline`` whose last step is one (earlier steps become the
+        preprocessor).
+    preprocessor:
+        Fitted preprocessing applied before a bare model, e.g. the cascade
+        models' ``SimpleImputer``.
+    input_names:
+        Raw input columns; defaults to the preprocessor's (or model's)
+        ``feature_names_in_``.
+    """
+    from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(model, Pipeline):
+        if preprocessor is not None:
+            raise ValueError("Pass either a Pipeline or a model with a separate preprocessor.")
+        preprocessor = model[:-1] if len(model.steps) > 1 else None
+        if isinstance(preprocessor, Pipeline) and len(preprocessor.steps) == 1:
+            preprocessor = preprocessor.steps[0][1]
+        model = model.steps[-1][1]
+    if not isinstance(model, (HistGradientBoostingClassifier, HistGradientBoostingRegressor)):
+        raise ValueError(f"Expected a HistGradientBoosting model, got {type(model).__name__}.")
+    if getattr(model, "is_categorical_", None) is not None and np.any(model.is_categorical_):
+        raise ValueError("Models with native categorical features cannot be compiled.")
+
+    if input_names is None:
+        source = preprocessor if preprocessor is not None else model
+        if not hasattr(source, "feature_names_in_"):
+            raise ValueError("Pass input_names; the estimator was fitted without column names.")
+        input_names = list(source.feature_names_in_)
+    specs = _flatten_preprocessor(preprocessor, list(input_names))
+    if len(specs) != model.n_features_in_:
+        raise ValueError(
+            f"Preprocessing yields {len(specs)} features but the model expects {model.n_features_in_}."
+        )
+
+    node_fields = (
+        "feature_idx", "num_threshold", "missing_go_to_left", "left", "right", "is_leaf", "value", "depth"
+    )
+    nodes: dict[str, list[np.ndarray]] = {name: [] for name in node_fields}
+    tree_offsets = [0]
+    tree_outputs = []
+    for iteration in model._predictors:
+        for output, predictor in enumerate(iteration):
+            tree_nodes = predictor.nodes
+            if np.any(tree_nodes["is_categorical"]):
+                raise ValueError("Trees with categorical splits cannot be compiled.")
+            for name in node_fields:
+                nodes[name].append(tree_nodes[name])
+            tree_offsets.append(tree_offsets[-1] + len(tree_nodes))
+            tree_outputs.append(output)
+
+    categories = [label for spec in specs for label in spec.categories]
+    category_offsets = np.cumsum([0] + [len(spec.categories) for spec in specs])
+    arrays = {
+        "sources": np.array([spec.source for spec in specs], dtype=str),
+        "kinds": np.array([spec.kind for spec in specs], dtype=np.int8),
+        "fill_number": np.array([spec.fill_number for spec in specs], dtype=float),
+        "has_fill_label": np.array([spec.fill_label is not None for spec in specs]),
+        "fill_label": np.array([spec.fill_label or "" for spec in specs], dtype=str),
+        "mean": np.array([spec.mean for spec in specs], dtype=float),
+        "scale": np.array([spec.scale for spec in specs], dtype=float),
+        "cast32": np.array([spec.cast32 for spec in specs]),
+        "unknown_value": np.array([spec.unknown_value for spec in specs], dtype=float),
+        "missing_value": np.array([spec.missing_value for spec in specs], dtype=float),
+        "categories": np.array(categories, dtype=str) if categories else np.array([], dtype="U1"),
+        "category_offsets": category_offsets.astype(np.int64),
+        "feature_idx": np.concatenate(nodes["feature_idx"]).astype(np.int64),
+        "threshold": np.concatenate(nodes["num_threshold"]).astype(float),
+        "missing_left": np.concatenate(nodes["missing_go_to_left"]).astype(bool),
+        "left": np.concatenate(nodes["left"]).astype(np.int64),
+        "right": np.concatenate(nodes["right"]).astype(np.int64),
+        "is_leaf": np.concatenate(nodes["is_leaf"]).astype(bool),
+        "leaf_value": np.concatenate(nodes["value"]).astype(float),
+        "max_depth": np.array(int(np.concatenate(nodes["depth"]).max())),
+        "tree_offsets": np.array(tree_offsets, dtype=np.int64),
+        "tree_outputs": np.array(tree_outputs, dtype=np.int64),
+        "baseline": np.asarray(model._baseline_prediction, dtype=float).ravel(),
+        "link": np.array(_link_name(model)),
+    }
+    if hasattr(model, "classes_"):
+        classes = np.asarray(model.classes_)
+        arrays["classes"] = classes if classes.dtype.kind in "biuf" else classes.astype(str)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as handle:
+        np.savez(handle, **arrays)
+    return path
+
+
+class CompiledHGB:
+    """NumPy-only scorer for a model written by :func:`export_hgb`."""
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]) -> None:
+        self.sources = [str(name) for name in arrays["sources"]]
+        self.kinds = arrays["kinds"]
+        self.fill_number = arrays["fill_number"]
+        self.has_fill_label = arrays["has_fill_label"]
+        self.fill_label = arrays["fill_label"]
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.cast32 = arrays["cast32"]
+        self.unknown_value = arrays["unknown_value"]
+        self.missing_value = arrays["missing_value"]
+        offsets = arrays["category_offsets"]
+        categories = arrays["categories"]
+        self._category_index = {
+            j: pd.Index(categories[offsets[j] : offsets[j + 1]])
+            for j in range(len(self.sources))
+            if self.kinds[j] == _KIND_ORDINAL
+        }
+
+        tree_offsets = arrays["tree_offsets"]
+        starts = tree_offsets[:-1]
+        self.n_trees = len(starts)
+        # Node indices are made global so all trees live in one set of arrays,
+        # and leaves loop back to themselves so traversal needs no masks.
+        node_tree_start = np.repeat(starts, np.diff(tree_offsets))
+        self.is_leaf = arrays["is_leaf"]
+        node_ids = np.arange(len(self.is_leaf), dtype=np.int64)
+        self.feature_idx = np.where(self.is_leaf, 0, arrays["feature_idx"])
+        self.threshold = arrays["threshold"]
+        self.missing_left = arrays["missing_left"]
+        self.left = np.where(self.is_leaf, node_ids, arrays["left"] + node_tree_start)
+        self.right = np.where(self.is_leaf, node_ids, arrays["right"] + node_tree_start)
+        self.leaf_value = arrays["leaf_value"]
+        self.max_depth = int(arrays["max_depth"])
+        self.tree_roots = starts
+        self.tree_outputs = arrays["tree_outputs"]
+        self.baseline = arrays["baseline"]
+        self.link = str(arrays["link"])
+        self.classes_ = arrays["classes"] if "classes" in arrays else None
+        if self.link not in LINKS:
+            raise ValueError(f"Unknown link {self.link!r}; expected one of {LINKS}.")
+
+    @classmethod
+    def load(cls, path: Path | str) -> "CompiledHGB":
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @property
+    def n_outputs(self) -> int:
+        return len(self.baseline)
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """Apply the exported preprocessing; returns the float64 model matrix."""
+        missing = [name for name in dict.fromkeys(self.sources) if name not in X.columns]
+        if missing:
+            raise KeyError(f"Input is missing columns: {missing}")
+        matrix = np.empty((len(X), len(self.sources)), dtype=float)
+        for j, source in enumerate(self.sources):
+            column = X[source]
+            if self.kinds[j] == _KIND_ORDINAL:
+                if self.has_fill_label[j]:
+                    column = column.where(column.notna(), self.fill_label[j])
+                is_missing = column.isna().to_numpy()
+                codes = self._category_index[j].get_indexer(column.astype(str)).astype(float)
+                codes[codes < 0] = self.unknown_value[j]
+                codes[is_missing] = self.missing_value[j]
+                values = codes
+            else:
+                values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+                if not np.isnan(self.fill_number[j]):
+                    values = np.where(np.isnan(values), self.fill_number[j], values)
+                values = (values - self.mean[j]) / self.scale[j]
+            if self.cast32[j]:
+                values = values.astype(np.float32)
+            matrix[:, j] = values
+        return matrix
+
+    def raw_predict(self, matrix: np.ndarray, *, block_size: int = 1024) -> np.ndarray:
+        """Sum the leaf values of every tree on top of the baseline; shape (n, n_outputs)."""
+        matrix = np.ascontiguousarray(matrix, dtype=float)
+        n_rows, n_features = matrix.shape
+        raw = np.tile(self.baseline, (n_rows, 1))
+        for start in range(0, n_rows, block_size):
+            block = matrix[start : start + block_size]
+            flat = block.ravel()
+            row_offsets = (np.arange(len(block), dtype=np.int64) * n_features)[:, None]
+            node = np.tile(self.tree_roots, (len(block), 1))
+            # Leaves point to themselves, so a fixed number of steps reaches every leaf.
+            for _ in range(self.max_depth):
+                values = flat[row_offsets + self.feature_idx[node]]
+                go_left = (values <= self.threshold[node]) | (
+                    np.isnan(values) & self.missing_left[node]
+                )
+                node = np.where(go_left, self.left[node], self.right[node])
+            leaf_values = self.leaf_value[node]
+            for output in range(self.n_outputs):
+                raw[start : start + len(block), output] += leaf_values[
+                    :, self.tree_outputs == output
+                ].sum(axis=1)
+        return raw
+
+    def _raw(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        matrix = self.transform(X) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=float)
+        return self.raw_predict(matrix)
+
+    def predict_proba(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Class probabilities of a classifier (DataFrames are preprocessed first)."""
+        raw = self._raw(X)
+        if self.link == "logit":
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        if self.link == "multinomial":
+            shifted = np.exp(raw - raw.max(axis=1, keepdims=True))
+            return shifted / shifted.sum(axis=1, keepdims=True)
+        raise ValueError("predict_proba is only available for classifiers.")
+
+    def predict(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Class labels of a classifier or the regression prediction."""
+        if self.link in ("logit", "multinomial"):
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        raw = self._raw(X)[:, 0]
+        return np.exp(raw) if self.link == "log" else raw
+
+
+__all__ = [
+    "CompiledHGB",
+    "LINKS",
+    "export_hgb",
+]
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import sqlite3
 from dataclasses import dataclass
-from typing import Iterable, Optional, Sequence
+from typing import Iterable, Iterator, Optional, Sequence
 
 import numpy as np
 import pandas as pd
@@ -24,12 +25,16 @@ from sklearn.metrics import (
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OrdinalEncoder
-from sklearn.inspection import permutation_importance
 
+from .importance_utils import fast_permutation_importance
+from .precision_utils import float32_caster
+from .preprocessing_cache import PreprocessorCache, fit_pipeline_cached
 from .usaspending_utils import (
     DEFAULT_DB_PATH,
     DEFAULT_SECURITY_NAICS,
     fetch_prime_transactions,
+    get_connection,
+    get_prime_transactions_table_name,
 )
 
 
@@ -248,6 +253,13 @@ BOOLEAN_FEATURES: tuple[str, ...] = (
 
 TARGET_COLUMN = "has_modification"
 
+DEFAULT_MODEL_PARAMS: dict[str, object] = {
+    "learning_rate": 0.08,
+    "max_depth": 8,
+    "min_samples_leaf": 60,
+    "max_bins": 255,
+}
+
 
 def _safe_numeric(series: pd.Series) -> pd.Series:
     return pd.to_numeric(series, errors="coerce")
@@ -265,79 +277,54 @@ def _parse_dates(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
     return df
 
 
-def build_contract_modification_dataset(
-    *,
-    db_path: str | None = None,
-    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
-) -> pd.DataFrame:
-    """Return base-award records enriched with a modification risk target."""
-
-    columns = [
-        # Identifiers (for filtering only, not features)
-        "contract_transaction_unique_key",
-        "contract_award_unique_key",
-        "award_id_piid",
-        "modification_number",
-        "naics_code",
-        "naics_description",
-        # Agency codes (for reference)
-        "awarding_agency_code",
-        "awarding_sub_agency_code",
-        "awarding_office_code",
-        "funding_agency_code",
-        "funding_sub_agency_code",
-        "funding_office_code",
-        "parent_award_agency_id",
-        # Codes (not used as features, descriptive versions used instead)
-        "action_type_code",
-        "extent_competed_code",
-        "solicitation_procedures_code",
-        "type_of_contract_pricing_code",
-        "type_of_set_aside_code",
-        "type_of_idc_code",
-        "multiple_or_single_award_idv_code",
-        "performance_based_service_acquisition_code",
-        "contract_bundling_code",
-        "award_type_code",
-        "idv_type_code",
-        "parent_award_type_code",
-        "parent_award_single_or_multiple_code",
-        "dod_claimant_program_code",
-        "dod_acquisition_program_code",
-        # All categorical features
-        *CATEGORICAL_FEATURES,
-        # All numeric value columns (base)
-        "number_of_offers_received",
-        "price_evaluation_adjustment_preference_percent_difference",
-        "number_of_actions",
-        *VALUE_COLUMNS,
-        # All date columns
-        *DATE_COLUMNS,
-        # All boolean features
-        *BOOLEAN_FEATURES,
-    ]
-
-    df = fetch_prime_transactions(
-        columns,
-        db_path=db_path or DEFAULT_DB_PATH,
-        naics_filter=naics_filter,
-    )
-
-    df["modification_number"] = df["modification_number"].fillna("0").astype(str)
-    df["is_modification"] = df["modification_number"].str.upper() != "0"
+DATASET_COLUMNS: tuple[str, ...] = (
+    # Identifiers (for filtering only, not features)
+    "contract_transaction_unique_key",
+    "contract_award_unique_key",
+    "award_id_piid",
+    "modification_number",
+    "naics_code",
+    "naics_description",
+    # Agency codes (for reference)
+    "awarding_agency_code",
+    "awarding_sub_agency_code",
+    "awarding_office_code",
+    "funding_agency_code",
+    "funding_sub_agency_code",
+    "funding_office_code",
+    "parent_award_agency_id",
+    # Codes (not used as features, descriptive versions used instead)
+    "action_type_code",
+    "extent_competed_code",
+    "solicitation_procedures_code",
+    "type_of_contract_pricing_code",
+    "type_of_set_aside_code",
+    "type_of_idc_code",
+    "multiple_or_single_award_idv_code",
+    "performance_based_service_acquisition_code",
+    "contract_bundling_code",
+    "award_type_code",
+    "idv_type_code",
+    "parent_award_type_code",
+    "parent_award_single_or_multiple_code",
+    "dod_claimant_program_code",
+    "dod_acquisition_program_code",
+    # All categorical features
+    *CATEGORICAL_FEATURES,
+    # All numeric value columns (base)
+    "number_of_offers_received",
+    "price_evaluation_adjustment_preference_percent_difference",
+    "number_of_actions",
+    *VALUE_COLUMNS,
+    # All date columns
+    *DATE_COLUMNS,
+    # All boolean features
+    *BOOLEAN_FEATURES,
+)
 
-    modification_presence = (
-        df.groupby("contract_award_unique_key")["is_modification"].any().rename(TARGET_COLUMN)
-    )
 
-    base_awards = df.loc[~df["is_modification"].astype(bool)].copy()
-    base_awards = base_awards.merge(
-        modification_presence,
-        left_on="contract_award_unique_key",
-        right_index=True,
-        how="left",
-    )
-    base_awards[TARGET_COLUMN] = base_awards[TARGET_COLUMN].fillna(False)
+def _enrich_base_awards(base_awards: pd.DataFrame) -> pd.DataFrame:
+    """Convert raw base-award columns and derive the engineered model features."""
 
     # Convert numeric VALUE_COLUMNS
     for column in VALUE_COLUMNS:
@@ -400,6 +387,127 @@ def build_contract_modification_dataset(
     return base_awards
 
 
+def build_contract_modification_dataset(
+    *,
+    db_path: str | None = None,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+) -> pd.DataFrame:
+    """Return base-award records enriched with a modification risk target."""
+
+    df = fetch_prime_transactions(
+        DATASET_COLUMNS,
+        db_path=db_path or DEFAULT_DB_PATH,
+        naics_filter=naics_filter,
+    )
+
+    df["modification_number"] = df["modification_number"].fillna("0").astype(str)
+    df["is_modification"] = df["modification_number"].str.upper() != "0"
+
+    modification_presence = (
+        df.groupby("contract_award_unique_key")["is_modification"].any().rename(TARGET_COLUMN)
+    )
+
+    base_awards = df.loc[~df["is_modification"].astype(bool)].copy()
+    base_awards = base_awards.merge(
+        modification_presence,
+        left_on="contract_award_unique_key",
+        right_index=True,
+        how="left",
+    )
+    base_awards[TARGET_COLUMN] = base_awards[TARGET_COLUMN].fillna(False)
+
+    return _enrich_base_awards(base_awards)
+
+
+def build_base_award_query(
+    conn: sqlite3.Connection,
+    *,
+    columns: Sequence[str] = DATASET_COLUMNS,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+) -> tuple[str, list[str]]:
+    """Return SQL and parameters selecting base awards with the modification target.
+
+    The target comes from one ``GROUP BY contract_award_unique_key`` pass over
+    the modification rows, left-joined back to the base awards, so the query
+    stays O(N log N) without an index on the contract key (a correlated
+    ``EXISTS`` probe is quadratic on unindexed tables). SQLite only
+    materialises the requested columns for base-award rows.
+    """
+
+    table_name = get_prime_transactions_table_name(conn)
+    is_modification = "UPPER(CAST(COALESCE({alias}.modification_number, '0') AS TEXT)) <> '0'"
+
+    column_sql = ", ".join(f'b."{col}"' for col in dict.fromkeys(columns))
+    naics_sql = ""
+    naics_params: list[str] = []
+    if naics_filter:
+        naics_params = [str(code) for code in naics_filter]
+        placeholders = ",".join("?" for _ in naics_params)
+        naics_sql = f" AND {{alias}}.naics_code IN ({placeholders})"
+
+    sql = (
+        f"WITH modified AS MATERIALIZED (\n"
+        f"  SELECT m.contract_award_unique_key FROM {table_name} AS m\n"
+        f"  WHERE {is_modification.format(alias='m')}{naics_sql.format(alias='m')}\n"
+        f"  GROUP BY m.contract_award_unique_key\n"
+        f")\n"
+        f"SELECT {column_sql},\n"
+        f"  k.contract_award_unique_key IS NOT NULL AS {TARGET_COLUMN}\n"
+        f"FROM {table_name} AS b\n"
+        f"LEFT JOIN modified AS k ON k.contract_award_unique_key = b.contract_award_unique_key\n"
+        f"WHERE NOT ({is_modification.format(alias='b')}){naics_sql.format(alias='b')}"
+    )
+    return sql, naics_params + naics_params
+
+
+def build_contract_modification_dataset_sql(
+    *,
+    db_path: str | None = None,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+) -> pd.DataFrame:
+    """Same output as :func:`build_contract_modification_dataset`, computed in SQLite.
+
+    Base-award filtering and the ``has_modification`` target are pushed down
+    into the query, so the wide column set is never loaded for modification
+    rows.
+    """
+
+    with get_connection(db_path or DEFAULT_DB_PATH) as conn:
+        sql, params = build_base_award_query(conn, naics_filter=naics_filter)
+        base_awards = pd.read_sql_query(sql, conn, params=params)
+
+    base_awards["modification_number"] = base_awards["modification_number"].fillna("0").astype(str)
+    base_awards["is_modification"] = False
+    base_awards[TARGET_COLUMN] = base_awards.pop(TARGET_COLUMN).astype(bool)
+
+    return _enrich_base_awards(base_awards)
+
+
+def iter_base_award_chunks(
+    *,
+    chunksize: int = 100_000,
+    db_path: str | None = None,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+    columns: Sequence[str] = DATASET_COLUMNS,
+) -> Iterator[pd.DataFrame]:
+    """Yield enriched base awards from :func:`build_base_award_query` in chunks.
+
+    Each chunk matches the corresponding rows of
+    :func:`build_contract_modification_dataset_sql`, without loading the
+    whole dataset at once.
+    """
+    conn = get_connection(db_path or DEFAULT_DB_PATH)
+    try:
+        sql, params = build_base_award_query(conn, columns=columns, naics_filter=naics_filter)
+        for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize):
+            chunk["modification_number"] = chunk["modification_number"].fillna("0").astype(str)
+            chunk["is_modification"] = False
+            chunk[TARGET_COLUMN] = chunk.pop(TARGET_COLUMN).astype(bool)
+            yield _enrich_base_awards(chunk)
+    finally:
+        conn.close()
+
+
 @dataclass
 class ModificationModelArtifacts:
     pipeline: Pipeline
@@ -415,17 +523,15 @@ class ModificationModelArtifacts:
     precision_recall_curve: tuple[np.ndarray, np.ndarray, np.ndarray]
 
 
-def train_modification_risk_classifier(
+def prepare_modification_features(
     dataset: pd.DataFrame,
     *,
     numeric_features: Sequence[str] = NUMERIC_FEATURES,
     categorical_features: Sequence[str] = CATEGORICAL_FEATURES,
     boolean_features: Sequence[str] = BOOLEAN_FEATURES,
     target_column: str = TARGET_COLUMN,
-    test_size: float = 0.2,
-    random_state: int = 42,
-) -> ModificationModelArtifacts:
-    """Train a baseline classifier that predicts contract modification risk."""
+) -> tuple[pd.DataFrame, pd.Series]:
+    """Return the classifier feature frame and integer target, keeping ``dataset``'s index."""
 
     missing_numeric = [col for col in numeric_features if col not in dataset.columns]
     missing_categorical = [col for col in categorical_features if col not in dataset.columns]
@@ -447,17 +553,27 @@ def train_modification_risk_classifier(
     X = data[features]
     y = data[target_column].astype(int)
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X,
-        y,
-        test_size=test_size,
-        stratify=y,
-        random_state=random_state,
-    )
+    return X, y
+
+
+def build_modification_risk_pipeline(
+    numeric_features: Sequence[str] = NUMERIC_FEATURES,
+    categorical_features: Sequence[str] = CATEGORICAL_FEATURES,
+    boolean_features: Sequence[str] = BOOLEAN_FEATURES,
+    *,
+    random_state: int = 42,
+    model_params: Optional[dict[str, object]] = None,
+    float32: bool = False,
+) -> Pipeline:
+    """Return the unfitted preprocessing + HistGradientBoosting classifier pipeline."""
+
+    # Every branch ends in float32 when requested so the stacked matrix stays float32.
+    cast_steps = [("float32", float32_caster())] if float32 else []
 
     numeric_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="median")),
+            *cast_steps,
         ]
     )
 
@@ -469,6 +585,7 @@ def train_modification_risk_classifier(
                 OrdinalEncoder(
                     handle_unknown="use_encoded_value",
                     unknown_value=np.nan,
+                    dtype=np.float32 if float32 else np.float64,
                 ),
             ),
         ]
@@ -478,6 +595,7 @@ def train_modification_risk_classifier(
     boolean_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="most_frequent")),
+            *cast_steps,
         ]
     )
 
@@ -489,22 +607,72 @@ def train_modification_risk_classifier(
         ]
     )
 
+    # random_state sits in the merged dict so model_params may override it.
     model = HistGradientBoostingClassifier(
-        learning_rate=0.08,
-        max_depth=8,
-        min_samples_leaf=60,
-        random_state=random_state,
-        max_bins=255,
+        **{**DEFAULT_MODEL_PARAMS, "random_state": random_state, **(model_params or {})}
     )
 
-    pipeline = Pipeline(
+    return Pipeline(
         steps=[
             ("preprocess", preprocessor),
             ("model", model),
         ]
     )
 
-    pipeline.fit(X_train, y_train)
+
+def train_modification_risk_classifier(
+    dataset: pd.DataFrame,
+    *,
+    numeric_features: Sequence[str] = NUMERIC_FEATURES,
+    categorical_features: Sequence[str] = CATEGORICAL_FEATURES,
+    boolean_features: Sequence[str] = BOOLEAN_FEATURES,
+    target_column: str = TARGET_COLUMN,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    cache: Optional[PreprocessorCache] = None,
+    model_params: Optional[dict[str, object]] = None,
+    importance_n_jobs: Optional[int] = -1,
+    importance_max_samples: Optional[int | float] = None,
+    float32: bool = False,
+) -> ModificationModelArtifacts:
+    """Train a baseline classifier that predicts contract modification risk.
+
+    Pass a :class:`~scripts.preprocessing_cache.PreprocessorCache` as ``cache``
+    to reuse the fitted preprocessor across reruns on unchanged data.
+    ``model_params`` overrides entries of ``DEFAULT_MODEL_PARAMS`` (for example
+    the best parameters found by :mod:`scripts.hgb_search`). Permutation
+    importances run in ``importance_n_jobs`` processes, optionally on an
+    ``importance_max_samples`` subsample of the test split. ``float32=True``
+    makes the preprocessed matrix float32; off by default because
+    HistGradientBoosting copies it back to float64.
+    """
+
+    X, y = prepare_modification_features(
+        dataset,
+        numeric_features=numeric_features,
+        categorical_features=categorical_features,
+        boolean_features=boolean_features,
+        target_column=target_column,
+    )
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X,
+        y,
+        test_size=test_size,
+        stratify=y,
+        random_state=random_state,
+    )
+
+    pipeline = build_modification_risk_pipeline(
+        numeric_features,
+        categorical_features,
+        boolean_features,
+        random_state=random_state,
+        model_params=model_params,
+        float32=float32,
+    )
+
+    fit_pipeline_cached(pipeline, X_train, y_train, cache=cache)
 
     y_scores = pipeline.predict_proba(X_test)[:, 1]
     y_pred = (y_scores >= 0.5).astype(int)
@@ -522,19 +690,14 @@ def train_modification_risk_classifier(
     cmatrix = confusion_matrix(y_test, y_pred)
     pr_curve = precision_recall_curve(y_test, y_scores)
 
-    feature_names = pipeline.named_steps["preprocess"].get_feature_names_out()
-    perm = permutation_importance(
+    feature_importances = fast_permutation_importance(
         pipeline,
         X_test,
         y_test,
         n_repeats=5,
+        n_jobs=importance_n_jobs,
+        max_samples=importance_max_samples,
         random_state=random_state,
-        n_jobs=1,
-    )
-    feature_importances = (
-        pd.DataFrame({"feature": feature_names, "importance": perm.importances_mean})
-        .sort_values("importance", ascending=False)
-        .reset_index(drop=True)
     )
 
     return ModificationModelArtifacts(
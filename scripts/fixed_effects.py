@@ -0,0 +1,328 @@
+"""OLS with high-dimensional fixed effects absorbed by iterative demeaning.
+
+Adding ``C(awarding_agency_code)`` to an ``smf.ols`` formula materializes one
+dense dummy column per agency, so the design matrix and the ``X'X`` solve grow
+with the number of levels. :func:`absorbed_ols` instead removes the group
+means of the response and of every non-fixed-effect regressor (the method of
+alternating projections; a single pass when only one effect is absorbed) and
+runs OLS on the demeaned data. By the Frisch-Waugh-Lovell theorem the slope
+coefficients equal those of the dummy-variable regression.
+
+Group means are computed with sparse indicator matrices, so each sweep costs
+``O(n * k)`` regardless of the number of levels. Standard errors can be
+classical, heteroskedasticity-robust (HC1) or clustered.
+
+Typical use::
+
+    result = absorbed_ols(
+        "log_current_value ~ is_performance_based + duration_years",
+        df,
+        absorb=["awarding_agency_code", "action_date_fiscal_year"],
+        cov_type="cluster",
+        cluster="awarding_agency_code",
+    )
+    result.summary()
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from patsy import dmatrices
+from scipy import sparse, stats
+
+COV_TYPES: tuple[str, ...] = ("nonrobust", "HC1", "cluster")
+
+
+@dataclass
+class AbsorbedRegressionResult:
+    """Coefficients and inference of an :func:`absorbed_ols` fit.
+
+    Mirrors the attributes of a statsmodels results object that the notebooks
+    use (``params``, ``bse``, ``tvalues``, ``pvalues``, ``rsquared``,
+    ``rsquared_adj``, ``nobs``, ``conf_int()`` and ``summary()``). The
+    absorbed fixed effects have no coefficients.
+    """
+
+    params: pd.Series
+    bse: pd.Series
+    tvalues: pd.Series
+    pvalues: pd.Series
+    cov_params_matrix: pd.DataFrame
+    nobs: int
+    df_resid: float
+    df_absorbed: int
+    rsquared: float
+    rsquared_adj: float
+    rsquared_within: float
+    cov_type: str
+    absorbed: tuple[str, ...]
+    n_groups: dict[str, int]
+    iterations: int
+    dropped_singletons: int = 0
+    dropped_collinear: list[str] = field(default_factory=list)
+    resid: Optional[pd.Series] = None
+
+    def cov_params(self) -> pd.DataFrame:
+        return self.cov_params_matrix
+
+    def conf_int(self, alpha: float = 0.05) -> pd.DataFrame:
+        """Return ``[lower, upper]`` confidence bounds for every coefficient."""
+        q = stats.t.ppf(1 - alpha / 2, self._inference_df)
+        return pd.DataFrame(
+            {0: self.params - q * self.bse, 1: self.params + q * self.bse},
+            index=self.params.index,
+        )
+
+    @property
+    def _inference_df(self) -> float:
+        if self.cov_type == "cluster":
+            return float(self.n_groups.get("__cluster__", self.df_resid + 1) - 1)
+        return self.df_resid
+
+    def summary(self, alpha: float = 0.05) -> pd.DataFrame:
+        """Coefficient table; fit statistics are stored in ``.attrs``."""
+        bounds = self.conf_int(alpha)
+        table = pd.DataFrame(
+            {
+                "coef": self.params,
+                "std_err": self.bse,
+                "t": self.tvalues,
+                "p_value": self.pvalues,
+                f"ci_{alpha / 2:g}": bounds[0],
+                f"ci_{1 - alpha / 2:g}": bounds[1],
+            }
+        )
+        table.attrs = {
+            "nobs": self.nobs,
+            "rsquared": self.rsquared,
+            "rsquared_adj": self.rsquared_adj,
+            "rsquared_within": self.rsquared_within,
+            "cov_type": self.cov_type,
+            "absorbed": {name: self.n_groups[name] for name in self.absorbed},
+        }
+        return table
+
+
+def _indicator(codes: np.ndarray, n_groups: int) -> sparse.csr_matrix:
+    n = len(codes)
+    return sparse.csr_matrix(
+        (np.ones(n), (np.arange(n), codes)), shape=(n, n_groups)
+    )
+
+
+def demean_by_groups(
+    values: np.ndarray,
+    group_codes: Sequence[np.ndarray],
+    *,
+    tol: float = 1e-8,
+    max_iter: int = 1000,
+) -> tuple[np.ndarray, int]:
+    """Sweep out the means of every grouping from the columns of ``values``.
+
+    Parameters
+    ----------
+    values:
+        ``(n, k)`` array; a copy is demeaned.
+    group_codes:
+        One integer code array (``0..G-1``, no gaps) per absorbed effect.
+    tol:
+        Stop once the largest change of a sweep falls below ``tol`` times the
+        scale of ``values``.
+
+    Returns
+    -------
+    The demeaned array and the number of sweeps performed.
+    """
+    result = np.array(values, dtype=float, copy=True)
+    if result.ndim == 1:
+        result = result[:, None]
+    projections = []
+    for codes in group_codes:
+        n_groups = int(codes.max()) + 1 if len(codes) else 0
+        indicator = _indicator(codes, n_groups)
+        counts = np.bincount(codes, minlength=n_groups).astype(float)
+        projections.append((indicator, indicator.T.tocsr(), counts))
+
+    scale = max(float(np.abs(result).max(initial=0.0)), 1.0)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        change = 0.0
+        for indicator, indicator_t, counts in projections:
+            means = (indicator_t @ result) / counts[:, None]
+            step = indicator @ means
+            result -= step
+            change = max(change, float(np.abs(step).max(initial=0.0)))
+        if len(projections) <= 1 or change < tol * scale:
+            break
+    else:
+        raise ValueError(
+            f"Fixed-effect demeaning did not converge in {max_iter} sweeps (last change {change:.3g})."
+        )
+    return result, iterations
+
+
+def _drop_singletons(codes: list[np.ndarray]) -> np.ndarray:
+    """Return a keep-mask removing rows alone in any group, repeated to a fixed point."""
+    keep = np.ones(len(codes[0]), dtype=bool)
+    while True:
+        singleton = np.zeros_like(keep)
+        for group in codes:
+            counts = np.bincount(group[keep], minlength=int(group.max()) + 1)
+            singleton |= keep & (counts[group] == 1)
+        if not singleton.any():
+            return keep
+        keep &= ~singleton
+
+
+def absorbed_ols(
+    formula: str,
+    data: pd.DataFrame,
+    *,
+    absorb: Sequence[str],
+    cov_type: str = "HC1",
+    cluster: Optional[str] = None,
+    drop_singletons: bool = True,
+    tol: float = 1e-8,
+    max_iter: int = 1000,
+) -> AbsorbedRegressionResult:
+    """Fit ``formula`` by OLS with the ``absorb`` columns as fixed effects.
+
+    Parameters
+    ----------
+    formula:
+        Patsy formula of the response and the non-absorbed terms (categorical
+        terms and interactions are allowed). The intercept is absorbed.
+    absorb:
+        Columns whose levels become fixed effects, e.g. agency, office, year.
+    cov_type:
+        ``"nonrobust"``, ``"HC1"`` or ``"cluster"``.
+    cluster:
+        Column defining the clusters when ``cov_type="cluster"``.
+    drop_singletons:
+        Drop observations that are alone in a fixed-effect group; they are
+        fitted perfectly and would only understate the standard errors.
+
+    Notes
+    -----
+    With several absorbed effects the degrees of freedom they consume are
+    counted as ``sum(levels) - (n_effects - 1)``, which is exact when the
+    groups form one connected set. Columns that are collinear with the fixed
+    effects (e.g. constant within every agency) are dropped and listed in
+    ``dropped_collinear``.
+    """
+    if cov_type not in COV_TYPES:
+        raise ValueError(f"Unknown cov_type {cov_type!r}; expected one of {COV_TYPES}.")
+    if cov_type == "cluster" and cluster is None:
+        raise ValueError("cov_type='cluster' requires a cluster column.")
+    absorb = list(absorb)
+    if not absorb:
+        raise ValueError("At least one column must be absorbed.")
+    extra_cols = absorb + ([cluster] if cluster is not None else [])
+    missing = [col for col in extra_cols if col not in data.columns]
+    if missing:
+        raise KeyError(f"Columns {missing} are missing from the provided DataFrame.")
+
+    working = data.dropna(subset=extra_cols)
+    if working.empty:
+        raise ValueError(f"No rows have non-missing values for {extra_cols}.")
+    y_frame, X_frame = dmatrices(formula, working, return_type="dataframe", NA_action="drop")
+    # Keep the treatment coding of the intercept model, then let the effects absorb the intercept.
+    X_frame = X_frame.drop(columns=["Intercept"], errors="ignore")
+    working = working.loc[X_frame.index]
+
+    codes = [pd.factorize(working[col], sort=True)[0] for col in absorb]
+    n_dropped = 0
+    if drop_singletons:
+        keep = _drop_singletons(codes)
+        n_dropped = int((~keep).sum())
+        if n_dropped:
+            working = working.loc[keep]
+            X_frame, y_frame = X_frame.loc[keep], y_frame.loc[keep]
+            codes = [pd.factorize(code[keep], sort=True)[0] for code in codes]
+    n_groups = {col: int(code.max()) + 1 for col, code in zip(absorb, codes)}
+
+    y = y_frame.to_numpy(dtype=float)[:, 0]
+    X = X_frame.to_numpy(dtype=float)
+    demeaned, iterations = demean_by_groups(
+        np.column_stack([y, X]), codes, tol=tol, max_iter=max_iter
+    )
+    y_within, X_within = demeaned[:, 0], demeaned[:, 1:]
+
+    # Regressors with (numerically) no within-group variation are not identified.
+    original_norm = np.linalg.norm(X - X.mean(axis=0), axis=0)
+    within_norm = np.linalg.norm(X_within, axis=0)
+    identified = within_norm > 1e-9 * np.maximum(original_norm, 1.0)
+    names = X_frame.columns[identified]
+    dropped = X_frame.columns[~identified].tolist()
+    X_within = X_within[:, identified]
+
+    nobs, n_params = X_within.shape
+    df_absorbed = sum(n_groups.values()) - (len(absorb) - 1)
+    df_resid = float(nobs - n_params - df_absorbed)
+    if df_resid <= 0:
+        raise ValueError("Not enough observations left after absorbing the fixed effects.")
+
+    xtx_inv = np.linalg.pinv(X_within.T @ X_within)
+    beta = xtx_inv @ (X_within.T @ y_within)
+    resid = y_within - X_within @ beta
+
+    if cov_type == "nonrobust":
+        cov = xtx_inv * (resid @ resid / df_resid)
+    elif cov_type == "HC1":
+        meat = (X_within * resid[:, None] ** 2).T @ X_within
+        cov = xtx_inv @ meat @ xtx_inv * (nobs / df_resid)
+    else:
+        cluster_codes, uniques = pd.factorize(working[cluster])
+        n_clusters = len(uniques)
+        if n_clusters < 2:
+            raise ValueError("Clustered standard errors need at least two clusters.")
+        scores = _indicator(cluster_codes, n_clusters).T @ (X_within * resid[:, None])
+        correction = n_clusters / (n_clusters - 1) * (nobs - 1) / df_resid
+        cov = xtx_inv @ (scores.T @ scores) @ xtx_inv * correction
+        n_groups["__cluster__"] = n_clusters
+
+    bse = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tvalues = beta / bse
+    inference_df = n_groups["__cluster__"] - 1 if cov_type == "cluster" else df_resid
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), inference_df)
+
+    ssr = float(resid @ resid)
+    tss = float(((y - y.mean()) ** 2).sum())
+    tss_within = float(y_within @ y_within)
+    rsquared = 1 - ssr / tss if tss > 0 else float("nan")
+    rsquared_adj = 1 - (1 - rsquared) * (nobs - 1) / df_resid
+    rsquared_within = 1 - ssr / tss_within if tss_within > 0 else float("nan")
+
+    return AbsorbedRegressionResult(
+        params=pd.Series(beta, index=names),
+        bse=pd.Series(bse, index=names),
+        tvalues=pd.Series(tvalues, index=names),
+        pvalues=pd.Series(pvalues, index=names),
+        cov_params_matrix=pd.DataFrame(cov, index=names, columns=names),
+        nobs=nobs,
+        df_resid=df_resid,
+        df_absorbed=df_absorbed,
+        rsquared=rsquared,
+        rsquared_adj=rsquared_adj,
+        rsquared_within=rsquared_within,
+        cov_type=cov_type,
+        absorbed=tuple(absorb),
+        n_groups=n_groups,
+        iterations=iterations,
+        dropped_singletons=n_dropped,
+        dropped_collinear=dropped,
+        resid=pd.Series(resid, index=X_frame.index, name="resid"),
+    )
+
+
+__all__ = [
+    "AbsorbedRegressionResult",
+    "COV_TYPES",
+    "absorbed_ols",
+    "demean_by_groups",
+]
@@ -0,0 +1,204 @@
+"""Hyperparameter search for the HistGradientBoosting pipelines.
+
+The HGB settings in ``contract_modification_risk`` and
+``competition_intensity_utils`` were tuned by hand in notebooks. This module
+runs successive halving over candidate settings with folds grouped by fiscal
+year, fits candidates in a joblib process pool with HGB early stopping on an
+inner validation split, and reports the wall-clock time spent on every
+candidate. The features are preprocessed once up front; binning is left to
+HGB, which computes its bin edges on each fold's training rows only.
+
+Typical use::
+
+    matrix = preprocess_for_search(build_low_competition_classifier(cat, num), X, y)
+    result = run_hgb_search(matrix, y, fiscal_year_groups(df["action_date"]))
+    pipeline = build_low_competition_classifier(cat, num, model_params=result.best_params)
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GroupKFold, HalvingRandomSearchCV
+from sklearn.pipeline import Pipeline
+
+DEFAULT_PARAM_SPACE: dict[str, list[object]] = {
+    "learning_rate": [0.03, 0.05, 0.08, 0.12, 0.2],
+    "max_depth": [None, 4, 6, 8, 12],
+    "min_samples_leaf": [20, 35, 60, 100, 200],
+    "l2_regularization": [0.0, 0.1, 0.2, 1.0],
+    "max_leaf_nodes": [15, 31, 63],
+}
+
+DEFAULT_SCORING = {
+    "classifier": "roc_auc",
+    "regressor": "neg_root_mean_squared_error",
+}
+
+
+@dataclass
+class HGBSearchResult:
+    """Outcome of :func:`run_hgb_search`."""
+
+    best_params: dict[str, object]
+    best_score: float
+    candidates: pd.DataFrame
+    elapsed_seconds: float
+    search: HalvingRandomSearchCV
+
+
+def fiscal_year_groups(dates: pd.Series) -> np.ndarray:
+    """Map action dates to US federal fiscal years (October starts the next FY)."""
+    parsed = pd.to_datetime(dates, errors="coerce")
+    fiscal_year = parsed.dt.year + (parsed.dt.month >= 10).astype(int)
+    return fiscal_year.fillna(-1).astype(int).to_numpy()
+
+
+def preprocess_for_search(
+    pipeline: Pipeline,
+    X: pd.DataFrame,
+    y: pd.Series | np.ndarray | None = None,
+) -> np.ndarray:
+    """Fit the pipeline's ``preprocess`` step on ``X`` and return the encoded matrix.
+
+    The encoders are fitted on the whole frame, so fold scores are slightly
+    optimistic; use the search to rank candidates, not to report final metrics.
+    """
+    return pipeline.named_steps["preprocess"].fit_transform(X, y)
+
+
+def _summarize_candidates(search: HalvingRandomSearchCV, n_splits: int) -> pd.DataFrame:
+    results = pd.DataFrame(search.cv_results_)
+    params = pd.json_normalize(results["params"].tolist())
+    summary = pd.concat(
+        [
+            results[["iter", "n_resources", "mean_test_score", "std_test_score"]],
+            params,
+        ],
+        axis=1,
+    )
+    summary["fit_seconds"] = results["mean_fit_time"] * n_splits
+    summary["score_seconds"] = results["mean_score_time"] * n_splits
+    summary["wall_seconds"] = summary["fit_seconds"] + summary["score_seconds"]
+    return summary.sort_values(["iter", "mean_test_score"], ascending=[True, False]).reset_index(
+        drop=True
+    )
+
+
+def run_hgb_search(
+    X: np.ndarray | pd.DataFrame,
+    y: pd.Series | np.ndarray,
+    groups: Sequence[int] | np.ndarray,
+    *,
+    task: str = "classifier",
+    param_space: Optional[Mapping[str, Sequence[object]]] = None,
+    base_params: Optional[Mapping[str, object]] = None,
+    n_candidates: int = 48,
+    scoring: Optional[str] = None,
+    n_splits: int = 5,
+    factor: int = 3,
+    n_jobs: Optional[int] = -1,
+    random_state: int = 42,
+    max_bins: int = 255,
+    max_iter: int = 500,
+    validation_fraction: float = 0.1,
+    n_iter_no_change: int = 10,
+) -> HGBSearchResult:
+    """Run successive halving over HGB settings with fiscal-year grouped folds.
+
+    Parameters
+    ----------
+    X:
+        Encoded feature matrix, typically from :func:`preprocess_for_search`.
+    y:
+        Target aligned with ``X``.
+    groups:
+        Fold groups, typically :func:`fiscal_year_groups`; no fiscal year is
+        split between training and validation folds.
+    task:
+        ``"classifier"`` or ``"regressor"``.
+    param_space:
+        Candidate values per HGB parameter (defaults to ``DEFAULT_PARAM_SPACE``).
+    base_params:
+        Fixed HGB parameters shared by every candidate (e.g. ``class_weight``).
+    n_candidates:
+        Number of sampled candidates in the first halving round.
+    n_jobs:
+        Worker processes; joblib caps each worker's OpenMP threads so HGB
+        does not oversubscribe the CPU.
+
+    Returns
+    -------
+    HGBSearchResult with the best parameters, one row per evaluated
+    candidate (score and wall-clock seconds) and the total elapsed time.
+    ``best_params`` holds the winning sampled values merged over every fixed
+    estimator setting (early stopping, ``max_iter``, ``max_bins``,
+    ``random_state`` and ``base_params``), so passing it as ``model_params``
+    refits the candidate exactly as it was scored.
+    """
+    if task not in DEFAULT_SCORING:
+        raise ValueError(f"task must be one of {tuple(DEFAULT_SCORING)}, got {task!r}")
+
+    groups = np.asarray(groups)
+    n_groups = len(np.unique(groups))
+    if n_groups < 2:
+        raise ValueError("At least two distinct groups are required for grouped folds.")
+    n_splits = min(n_splits, n_groups)
+
+    matrix = np.asarray(X)
+    target = np.asarray(y)
+
+    estimator_params = {
+        "early_stopping": True,
+        "validation_fraction": validation_fraction,
+        "n_iter_no_change": n_iter_no_change,
+        "max_iter": max_iter,
+        "max_bins": max_bins,
+        "random_state": random_state,
+        **(base_params or {}),
+    }
+    if task == "classifier":
+        estimator = HistGradientBoostingClassifier(**estimator_params)
+    else:
+        estimator = HistGradientBoostingRegressor(**estimator_params)
+
+    search = HalvingRandomSearchCV(
+        estimator,
+        param_distributions=dict(param_space or DEFAULT_PARAM_SPACE),
+        n_candidates=n_candidates,
+        factor=factor,
+        resource="n_samples",
+        min_resources="exhaust",
+        cv=GroupKFold(n_splits=n_splits),
+        scoring=scoring or DEFAULT_SCORING[task],
+        n_jobs=n_jobs,
+        random_state=random_state,
+        refit=False,
+    )
+
+    start = time.perf_counter()
+    search.fit(matrix, target, groups=groups)
+    elapsed = time.perf_counter() - start
+
+    return HGBSearchResult(
+        best_params={**estimator_params, **search.best_params_},
+        best_score=float(search.best_score_),
+        candidates=_summarize_candidates(search, n_splits),
+        elapsed_seconds=elapsed,
+        search=search,
+    )
+
+
+__all__ = [
+    "DEFAULT_PARAM_SPACE",
+    "HGBSearchResult",
+    "fiscal_year_groups",
+    "preprocess_for_search",
+    "run_hgb_search",
+]
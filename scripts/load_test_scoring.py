@@ -0,0 +1,140 @@
+"""Load test for :mod:`scripts.scoring_service` on localhost.
+
+Samples contract keys from the prime transactions database, fires
+``--requests`` POST /predict calls from ``--concurrency`` client threads and
+reports client-side throughput and latency percentiles next to the server's
+own ``/metrics``.
+
+Usage::
+
+    python -m scripts.scoring_service --port 8765 &
+    python -m scripts.load_test_scoring --port 8765 --requests 2000 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .scoring_service import DEFAULT_HOST, DEFAULT_PORT
+from .usaspending_utils import DEFAULT_DB_PATH, get_connection, get_prime_transactions_table_name
+
+
+def sample_contract_keys(
+    db_path: Path | str = DEFAULT_DB_PATH,
+    n_keys: int = 500,
+    seed: int = 42,
+) -> list[str]:
+    """Return up to ``n_keys`` distinct contract keys from the database."""
+    with get_connection(db_path) as conn:
+        table_name = get_prime_transactions_table_name(conn)
+        rows = conn.execute(
+            f"SELECT DISTINCT contract_award_unique_key FROM {table_name} "
+            "WHERE contract_award_unique_key IS NOT NULL"
+        ).fetchall()
+    keys = [row[0] for row in rows]
+    random.Random(seed).shuffle(keys)
+    return keys[:n_keys]
+
+
+def _post(url: str, payload: dict[str, object], timeout: float) -> tuple[float, int]:
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = 0
+    return (time.perf_counter() - start) * 1000, status
+
+
+def run_load_test(
+    keys: Sequence[str],
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    n_requests: int = 1000,
+    concurrency: int = 16,
+    timeout: float = 30.0,
+    seed: int = 42,
+) -> dict[str, object]:
+    """Send ``n_requests`` predictions with ``concurrency`` threads and summarize latencies."""
+    if not keys:
+        raise ValueError("At least one contract key is required.")
+    url = f"http://{host}:{port}/predict"
+    rng = random.Random(seed)
+    payloads = [{"contract_award_unique_key": rng.choice(keys)} for _ in range(n_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda payload: _post(url, payload, timeout), payloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in outcomes])
+    # Status 0 marks connection errors and timeouts.
+    statuses: dict[str, int] = {}
+    for _, status in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=timeout) as response:
+        server_metrics = json.loads(response.read())
+
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": n_requests / elapsed if elapsed > 0 else float("nan"),
+        "statuses": statuses,
+        "client_latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(latencies.max()),
+        },
+        "server": server_metrics,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the local modification scoring service.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Database to sample contract keys from.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Service host.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Service port.")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests to send.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads.")
+    parser.add_argument("--keys", type=int, default=500, help="Distinct contracts to sample.")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    keys = sample_contract_keys(args.db, args.keys)
+    report = run_load_test(
+        keys,
+        host=args.host,
+        port=args.port,
+        n_requests=args.requests,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
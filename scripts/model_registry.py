@@ -0,0 +1,393 @@
+"""Versioned on-disk registry for trained models and their training artifacts.
+
+Each registered version lives in ``<root>/<name>/<version>/`` and holds one
+uncompressed joblib file per stored object plus a ``manifest.json`` with:
+
+* the feature schema (column names and dtypes the model was trained on),
+* a fingerprint of the training data (:func:`frame_fingerprint`),
+* the evaluation metrics,
+* Python / numpy / pandas / scikit-learn / joblib versions,
+* the sha256 and size of every stored file.
+
+Because the files are uncompressed, numpy arrays (tree node tables, numeric
+DataFrame blocks) are memory-mapped copy-on-write (``mmap_mode="c"``) instead
+of copied into memory, so reloaded frames stay writable without touching the
+stored files. :class:`RegisteredModel` only reads a file when its object is
+first requested, and the artifact loaders return dataclasses whose fields are
+read the same way.
+
+Typical use::
+
+    registry = ModelRegistry()
+    save_modification_artifacts(registry, "modification_risk", artifacts)
+    artifacts = load_modification_artifacts(registry, "modification_risk")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import platform
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Mapping, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from .contract_modification_risk import ModificationModelArtifacts
+from .modeling_utils import TreeModelArtifacts
+from .preprocessing_cache import frame_fingerprint
+from .usaspending_utils import REPO_ROOT
+
+DEFAULT_REGISTRY_DIR = REPO_ROOT / "models" / "registry"
+MANIFEST_NAME = "manifest.json"
+_HASH_BLOCK = 1 << 20
+
+
+@dataclass
+class ModelManifest:
+    """Metadata stored next to every registered model version."""
+
+    name: str
+    version: int
+    kind: str
+    created_at: str
+    files: dict[str, dict[str, object]]
+    feature_schema: list[dict[str, str]] = field(default_factory=list)
+    data_fingerprint: Optional[str] = None
+    metrics: dict[str, float] = field(default_factory=dict)
+    library_versions: dict[str, str] = field(default_factory=dict)
+    extra: dict[str, object] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "ModelManifest":
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def library_versions() -> dict[str, str]:
+    """Return the versions of the libraries that determine pickle compatibility."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "joblib": joblib.__version__,
+    }
+
+
+def feature_schema(frame: pd.DataFrame) -> list[dict[str, str]]:
+    """Describe the columns of ``frame`` as ``[{"name": ..., "dtype": ...}, ...]``."""
+    return [{"name": str(col), "dtype": str(dtype)} for col, dtype in frame.dtypes.items()]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_safe(metrics: Mapping[str, object]) -> dict[str, float]:
+    return {str(key): float(value) for key, value in metrics.items()}
+
+
+class RegisteredModel:
+    """One registered version; stored objects are loaded on first access.
+
+    Parameters
+    ----------
+    path:
+        Version directory containing ``manifest.json``.
+    mmap_mode:
+        Passed to ``joblib.load``; ``"c"`` maps numpy arrays copy-on-write
+        instead of copying them, ``"r"`` maps them read-only and ``None``
+        loads everything into memory.
+    verify:
+        Check each file's sha256 against the manifest before loading it.
+    """
+
+    def __init__(self, path: Path, *, mmap_mode: Optional[str] = "c", verify: bool = True) -> None:
+        self.path = Path(path)
+        manifest_path = self.path / MANIFEST_NAME
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"Model manifest not found at {manifest_path}")
+        self.manifest = ModelManifest.from_dict(json.loads(manifest_path.read_text(encoding="utf-8")))
+        self.mmap_mode = mmap_mode
+        self.verify = verify
+        self._loaded: dict[str, object] = {}
+
+    def keys(self) -> list[str]:
+        return [Path(filename).stem for filename in self.manifest.files]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def __getitem__(self, key: str) -> object:
+        if key not in self._loaded:
+            filename = f"{key}.joblib"
+            entry = self.manifest.files.get(filename)
+            if entry is None:
+                raise KeyError(f"{key!r} is not stored in {self.manifest.name} v{self.manifest.version}")
+            path = self.path / filename
+            if self.verify and file_sha256(path) != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch for {path}; the file changed after registration.")
+            self._loaded[key] = joblib.load(path, mmap_mode=self.mmap_mode)
+        return self._loaded[key]
+
+    @property
+    def model(self) -> object:
+        """The primary stored object (``"model"``)."""
+        return self["model"]
+
+    def check_environment(self) -> dict[str, tuple[str, str]]:
+        """Return ``{library: (registered, installed)}`` for every differing version."""
+        current = library_versions()
+        return {
+            lib: (version, current.get(lib, "missing"))
+            for lib, version in self.manifest.library_versions.items()
+            if current.get(lib) != version
+        }
+
+
+class ModelRegistry:
+    """Directory of named, integer-versioned model bundles."""
+
+    def __init__(self, root: Path | str = DEFAULT_REGISTRY_DIR) -> None:
+        self.root = Path(root).expanduser()
+
+    def list_models(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    def list_versions(self, name: str) -> list[int]:
+        model_dir = self.root / name
+        if not model_dir.exists():
+            return []
+        return sorted(
+            int(path.name)
+            for path in model_dir.iterdir()
+            if path.is_dir() and path.name.isdigit() and (path / MANIFEST_NAME).exists()
+        )
+
+    def save(
+        self,
+        name: str,
+        objects: Mapping[str, object],
+        *,
+        kind: str = "objects",
+        features: Optional[pd.DataFrame] = None,
+        training_data: Optional[pd.DataFrame | pd.Series | np.ndarray] = None,
+        metrics: Optional[Mapping[str, object]] = None,
+        extra: Optional[Mapping[str, object]] = None,
+    ) -> ModelManifest:
+        """Store ``objects`` as the next version of ``name`` and return its manifest.
+
+        Parameters
+        ----------
+        objects:
+            Mapping of key to object; ``"model"`` is the conventional primary key.
+        features:
+            Training feature frame; its columns and dtypes become the schema.
+        training_data:
+            Data fingerprinted to identify the training set (defaults to ``features``).
+        """
+        if not objects:
+            raise ValueError("At least one object must be stored.")
+        model_dir = self.root / name
+        model_dir.mkdir(parents=True, exist_ok=True)
+        versions = self.list_versions(name)
+        version = versions[-1] + 1 if versions else 1
+
+        staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=model_dir))
+        try:
+            files: dict[str, dict[str, object]] = {}
+            for key, obj in objects.items():
+                filename = f"{key}.joblib"
+                path = staging / filename
+                # Uncompressed so numpy buffers can be memory-mapped on load.
+                joblib.dump(obj, path, compress=0)
+                files[filename] = {"sha256": file_sha256(path), "bytes": path.stat().st_size}
+
+            fingerprint_source = training_data if training_data is not None else features
+            manifest = ModelManifest(
+                name=name,
+                version=version,
+                kind=kind,
+                created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                files=files,
+                feature_schema=feature_schema(features) if features is not None else [],
+                data_fingerprint=(
+                    frame_fingerprint(fingerprint_source) if fingerprint_source is not None else None
+                ),
+                metrics=_json_safe(metrics or {}),
+                library_versions=library_versions(),
+                extra=dict(extra or {}),
+            )
+            (staging / MANIFEST_NAME).write_text(
+                json.dumps(asdict(manifest), indent=2, default=str), encoding="utf-8"
+            )
+            staging.rename(model_dir / str(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return manifest
+
+    def open(
+        self,
+        name: str,
+        version: Optional[int] = None,
+        *,
+        mmap_mode: Optional[str] = "c",
+        verify: bool = True,
+    ) -> RegisteredModel:
+        """Open ``version`` of ``name`` (latest when omitted) without loading its objects."""
+        versions = self.list_versions(name)
+        if not versions:
+            raise KeyError(f"No registered versions of {name!r} in {self.root}")
+        if version is None:
+            version = versions[-1]
+        elif version not in versions:
+            raise KeyError(f"{name!r} has no version {version}; available: {versions}")
+        return RegisteredModel(self.root / name / str(version), mmap_mode=mmap_mode, verify=verify)
+
+
+class _LazyArtifacts:
+    """Dataclass mixin whose fields are loaded from a registry entry on first access."""
+
+    def __getattr__(self, name: str) -> object:
+        # Only called for attributes not yet in __dict__, i.e. unloaded fields.
+        keys = self.__dict__.get("_registry_keys")
+        if keys is None or name not in keys:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = self.__dict__["_registry_entry"][keys[name]]
+        setattr(self, name, value)
+        return value
+
+
+class _LazyModificationModelArtifacts(_LazyArtifacts, ModificationModelArtifacts):
+    pass
+
+
+class _LazyTreeModelArtifacts(_LazyArtifacts, TreeModelArtifacts):
+    pass
+
+
+def _lazy_artifacts(cls: type, entry: RegisteredModel, keys: Mapping[str, str]) -> object:
+    artifacts = cls.__new__(cls)
+    artifacts._registry_entry = entry
+    artifacts._registry_keys = dict(keys)
+    return artifacts
+
+
+def save_modification_artifacts(
+    registry: ModelRegistry,
+    name: str,
+    artifacts: ModificationModelArtifacts,
+    *,
+    extra: Optional[Mapping[str, object]] = None,
+) -> ModelManifest:
+    """Register every field of a :class:`ModificationModelArtifacts`."""
+    objects = {f.name: getattr(artifacts, f.name) for f in fields(artifacts)}
+    objects["model"] = objects.pop("pipeline")
+    return registry.save(
+        name,
+        objects,
+        kind="ModificationModelArtifacts",
+        features=artifacts.X_train,
+        training_data=pd.concat([artifacts.X_train, artifacts.y_train], axis=1),
+        metrics=artifacts.metrics,
+        extra=extra,
+    )
+
+
+def load_modification_artifacts(
+    registry: ModelRegistry,
+    name: str,
+    version: Optional[int] = None,
+    *,
+    mmap_mode: Optional[str] = "c",
+    verify: bool = True,
+) -> ModificationModelArtifacts:
+    """Rebuild a :class:`ModificationModelArtifacts` saved by :func:`save_modification_artifacts`.
+
+    Each field is read from disk the first time it is accessed, so loading
+    only the pipeline for scoring never touches the stored splits.
+    """
+    entry = registry.open(name, version, mmap_mode=mmap_mode, verify=verify)
+    if entry.manifest.kind != "ModificationModelArtifacts":
+        raise ValueError(f"{name!r} holds {entry.manifest.kind}, not ModificationModelArtifacts")
+    keys = {
+        f.name: "model" if f.name == "pipeline" else f.name
+        for f in fields(ModificationModelArtifacts)
+    }
+    return _lazy_artifacts(_LazyModificationModelArtifacts, entry, keys)
+
+
+def save_tree_artifacts(
+    registry: ModelRegistry,
+    name: str,
+    artifacts: TreeModelArtifacts,
+    *,
+    training_data: Optional[pd.DataFrame] = None,
+    extra: Optional[Mapping[str, object]] = None,
+) -> ModelManifest:
+    """Register every field of a :class:`TreeModelArtifacts`.
+
+    The artifacts do not keep the training frame; pass it as ``training_data``
+    to record its schema and fingerprint.
+    """
+    objects = {f.name: getattr(artifacts, f.name) for f in fields(artifacts)}
+    metrics = {
+        **{f"train_{key}": value for key, value in artifacts.train_metrics.items()},
+        **{f"test_{key}": value for key, value in artifacts.test_metrics.items()},
+    }
+    return registry.save(
+        name,
+        objects,
+        kind="TreeModelArtifacts",
+        features=training_data,
+        metrics=metrics,
+        extra={"feature_columns": artifacts.feature_columns, **(extra or {})},
+    )
+
+
+def load_tree_artifacts(
+    registry: ModelRegistry,
+    name: str,
+    version: Optional[int] = None,
+    *,
+    mmap_mode: Optional[str] = "c",
+    verify: bool = True,
+) -> TreeModelArtifacts:
+    """Rebuild a :class:`TreeModelArtifacts` saved by :func:`save_tree_artifacts`.
+
+    Fields are read lazily, as in :func:`load_modification_artifacts`.
+    """
+    entry = registry.open(name, version, mmap_mode=mmap_mode, verify=verify)
+    if entry.manifest.kind != "TreeModelArtifacts":
+        raise ValueError(f"{name!r} holds {entry.manifest.kind}, not TreeModelArtifacts")
+    keys = {f.name: f.name for f in fields(TreeModelArtifacts)}
+    return _lazy_artifacts(_LazyTreeModelArtifacts, entry, keys)
+
+
+__all__ = [
+    "DEFAULT_REGISTRY_DIR",
+    "ModelManifest",
+    "ModelRegistry",
+    "RegisteredModel",
+    "feature_schema",
+    "library_versions",
+    "load_modification_artifacts",
+    "load_tree_artifacts",
+    "save_modification_artifacts",
+    "save_tree_artifacts",
+]
@@ -2,15 +2,16 @@
 
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass
 from typing import Iterable, Optional, Sequence
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
-from sklearn.inspection import permutation_importance
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
@@ -18,12 +19,114 @@ from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.tree import DecisionTreeRegressor
 
+from .importance_utils import fast_permutation_importance
+from .precision_utils import float32_caster
+from .preprocessing_cache import PreprocessorCache, fit_pipeline_cached
 from .usaspending_utils import DEFAULT_DB_PATH, list_prime_transaction_columns
 
 # ---------------------------------------------------------------------------
 # Analysis and interpretation utilities
 
 
+RULE_COLUMNS = ['rule_text', 'predicted_value', 'sample_count', 'depth']
+
+
+def extract_rule_table(
+    tree_model: DecisionTreeRegressor,
+    feature_names: list[str],
+    max_depth: int = 3,
+    min_samples: int = 100
+) -> pd.DataFrame:
+    """Extract the leaf rules of a fitted tree as a structured table.
+    
+    The tree arrays (``children_left``/``children_right``) are walked with an
+    explicit stack, so no Python recursion or per-node path copies are needed;
+    each kept leaf's conditions are recovered from parent pointers.
+    
+    Parameters
+    ----------
+    tree_model:
+        Trained DecisionTreeRegressor
+    feature_names:
+        List of feature names in order
+    max_depth:
+        Maximum depth of rules to extract
+    min_samples:
+        Minimum samples in leaf to include rule
+        
+    Returns
+    -------
+    DataFrame with one row per leaf (in depth-first order) and columns:
+    leaf_id, rule_text, predicted_value, sample_count, depth, feature_idx,
+    features, ops, thresholds and nan_satisfies (one list entry per condition,
+    root first; ``nan_satisfies`` says whether a missing value meets it).
+    """
+    tree = tree_model.tree_
+    children_left = tree.children_left
+    children_right = tree.children_right
+    missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+
+    parent = np.full(tree.node_count, -1, dtype=np.int64)
+    went_left = np.zeros(tree.node_count, dtype=bool)
+    leaves: list[tuple[int, int]] = []
+    stack = [(0, 0)]
+    while stack:
+        node_id, depth = stack.pop()
+        if depth > max_depth:
+            continue
+        left, right = children_left[node_id], children_right[node_id]
+        if left == -1:
+            if tree.n_node_samples[node_id] >= min_samples:
+                leaves.append((node_id, depth))
+            continue
+        parent[left] = parent[right] = node_id
+        went_left[left] = True
+        # Right is pushed first so the left subtree is visited first.
+        stack.append((right, depth + 1))
+        stack.append((left, depth + 1))
+
+    rows = []
+    for leaf_id, depth in leaves:
+        path = []
+        node_id = leaf_id
+        while parent[node_id] >= 0:
+            path.append((parent[node_id], went_left[node_id]))
+            node_id = parent[node_id]
+        path.reverse()
+
+        feature_idx = [int(tree.feature[node]) for node, _ in path]
+        thresholds = [float(tree.threshold[node]) for node, _ in path]
+        ops = ['<=' if left else '>' for _, left in path]
+        # NaN follows the branch the tree sends missing values to.
+        nan_satisfies = [
+            bool(missing_go_to_left[node]) == bool(left) if missing_go_to_left is not None else False
+            for node, left in path
+        ]
+        features = [feature_names[idx] for idx in feature_idx]
+        conditions = [
+            f"{name} {op} {threshold:.2f}"
+            for name, op, threshold in zip(features, ops, thresholds)
+        ]
+        rows.append({
+            'leaf_id': int(leaf_id),
+            'rule_text': ' AND '.join(conditions) if conditions else 'All contracts',
+            'predicted_value': tree.value[leaf_id][0, 0],
+            'sample_count': tree.n_node_samples[leaf_id],
+            'depth': depth,
+            'feature_idx': feature_idx,
+            'features': features,
+            'ops': ops,
+            'thresholds': thresholds,
+            'nan_satisfies': nan_satisfies,
+        })
+
+    if not rows:
+        return pd.DataFrame(columns=[
+            'leaf_id', *RULE_COLUMNS, 'feature_idx', 'features', 'ops', 'thresholds', 'nan_satisfies'
+        ])
+    return pd.DataFrame(rows)
+
+
 def extract_decision_rules(
     tree_model: DecisionTreeRegressor,
     feature_names: list[str],
@@ -50,47 +153,125 @@ def extract_decision_rules(
     -------
     DataFrame with columns: rule_text, predicted_value, sample_count, depth
     """
-    tree = tree_model.tree_
-    rules = []
-    
-    def recurse(node_id: int, path: list[str], depth: int):
-        if depth > max_depth:
-            return
-        
-        # Leaf node
-        if tree.feature[node_id] == -2:
-            if tree.n_node_samples[node_id] >= min_samples:
-                rule_text = ' AND '.join(path) if path else 'All contracts'
-                rules.append({
-                    'rule_text': rule_text,
-                    'predicted_value': tree.value[node_id][0, 0],
-                    'sample_count': tree.n_node_samples[node_id],
-                    'depth': depth
-                })
-            return
-        
-        # Internal node
-        feature_idx = tree.feature[node_id]
-        threshold = tree.threshold[node_id]
-        feature_name = feature_names[feature_idx]
-        
-        # Left branch (<=)
-        left_path = path + [f"{feature_name} <= {threshold:.2f}"]
-        recurse(tree.children_left[node_id], left_path, depth + 1)
-        
-        # Right branch (>)
-        right_path = path + [f"{feature_name} > {threshold:.2f}"]
-        recurse(tree.children_right[node_id], right_path, depth + 1)
-    
-    recurse(0, [], 0)
-    
-    if not rules:
-        return pd.DataFrame(columns=['rule_text', 'predicted_value', 'sample_count', 'depth'])
+    table = extract_rule_table(
+        tree_model, feature_names, max_depth=max_depth, min_samples=min_samples
+    )
+    if table.empty:
+        return pd.DataFrame(columns=RULE_COLUMNS)
     
-    rules_df = pd.DataFrame(rules).sort_values('predicted_value', ascending=False)
+    rules_df = table[RULE_COLUMNS].sort_values('predicted_value', ascending=False)
     return rules_df
 
 
+@dataclass
+class CompiledRules:
+    """Rule table compiled into flat node arrays for vectorized evaluation.
+    
+    The rules' condition paths are merged into a prefix tree: node ``i``
+    tests ``X[:, feature[i]] <= threshold[i]`` (missing values go left when
+    ``nan_left[i]``) and continues to ``left[i]`` or ``right[i]``; ``rule[i]``
+    is the rule position ending there. Evaluation advances all rows one level
+    per step with NumPy comparisons, so its cost is rows times rule depth.
+    """
+
+    rules: pd.DataFrame
+    feature_names: list[str]
+    feature: np.ndarray
+    threshold: np.ndarray
+    nan_left: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    rule: np.ndarray
+
+    def _feature_matrix(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            missing = [name for name in self.feature_names if name not in X.columns]
+            if missing:
+                raise KeyError(f"Missing rule features: {missing}")
+            X = X[self.feature_names]
+        values = np.asarray(X, dtype=float)
+        if values.ndim != 2 or values.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"Expected {len(self.feature_names)} feature columns, got shape {values.shape}."
+            )
+        return values
+
+    def assign(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Return each row's position in ``rules`` (-1 when no kept rule covers it)."""
+        values = self._feature_matrix(X)
+        node = np.zeros(len(values), dtype=np.int64)
+        active = np.arange(len(values))
+        while active.size:
+            current = node[active]
+            internal = self.feature[current] >= 0
+            active, current = active[internal], current[internal]
+            if not active.size:
+                break
+            column = values[active, self.feature[current]]
+            with np.errstate(invalid='ignore'):
+                go_left = column <= self.threshold[current]
+            go_left |= np.isnan(column) & self.nan_left[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+            # -1 marks a branch without any kept rule; those rows stop here.
+            active = active[node[active] >= 0]
+        return np.where(node >= 0, self.rule[np.clip(node, 0, None)], -1)
+
+    def predict(self, X: pd.DataFrame | np.ndarray, default: float = np.nan) -> np.ndarray:
+        """Return the matched rule's predicted value, or ``default`` for uncovered rows."""
+        positions = self.assign(X)
+        values = self.rules['predicted_value'].to_numpy(dtype=float)
+        if not len(values):
+            return np.full(len(positions), default, dtype=float)
+        return np.where(positions >= 0, values[np.clip(positions, 0, None)], default)
+
+
+def compile_rules(rules: pd.DataFrame, feature_names: list[str]) -> CompiledRules:
+    """Compile a table from :func:`extract_rule_table` for vectorized evaluation."""
+    required = {'feature_idx', 'ops', 'thresholds', 'nan_satisfies'}
+    if not required.issubset(rules.columns):
+        raise KeyError(f"Rule table needs the structured columns {sorted(required)}.")
+    rules = rules.reset_index(drop=True)
+
+    feature = [-1]
+    threshold = [np.nan]
+    nan_left = [False]
+    children = [[-1, -1]]
+    rule = [-1]
+    for position, row in enumerate(rules.itertuples(index=False)):
+        node = 0
+        for feature_idx, op, value, nan_satisfies in zip(
+            row.feature_idx, row.ops, row.thresholds, row.nan_satisfies
+        ):
+            goes_left = op == '<='
+            test = (int(feature_idx), float(value), bool(nan_satisfies) == goes_left)
+            if feature[node] < 0:
+                feature[node], threshold[node], nan_left[node] = test
+            elif (feature[node], threshold[node], nan_left[node]) != test:
+                raise ValueError(f"Rule {position} does not share its path prefix with the other rules.")
+            side = 0 if goes_left else 1
+            if children[node][side] < 0:
+                children[node][side] = len(feature)
+                feature.append(-1)
+                threshold.append(np.nan)
+                nan_left.append(False)
+                children.append([-1, -1])
+                rule.append(-1)
+            node = children[node][side]
+        rule[node] = position
+
+    child_array = np.array(children, dtype=np.int64)
+    return CompiledRules(
+        rules=rules,
+        feature_names=list(feature_names),
+        feature=np.array(feature, dtype=np.int64),
+        threshold=np.array(threshold, dtype=float),
+        nan_left=np.array(nan_left, dtype=bool),
+        left=child_array[:, 0],
+        right=child_array[:, 1],
+        rule=np.array(rule, dtype=np.int64),
+    )
+
+
 def identify_high_value_contracts(
     model_df: pd.DataFrame,
     percentile: float = 90,
@@ -305,15 +486,17 @@ def candidate_feature_columns(
 # Modelling utilities
 
 
-def _build_one_hot_encoder(max_categories: Optional[int] = None) -> OneHotEncoder:
+def _build_one_hot_encoder(
+    max_categories: Optional[int] = None, *, sparse: bool = False
+) -> OneHotEncoder:
     encoder_kwargs = {"handle_unknown": "ignore"}
     if max_categories is not None:
         encoder_kwargs["max_categories"] = max_categories
     try:
-        return OneHotEncoder(sparse_output=False, **encoder_kwargs)
+        return OneHotEncoder(sparse_output=sparse, **encoder_kwargs)
     except TypeError:
         encoder_kwargs.pop("max_categories", None)
-        encoder_kwargs["sparse"] = False
+        encoder_kwargs["sparse"] = sparse
         if max_categories is not None:
             encoder_kwargs["max_categories"] = max_categories
         return OneHotEncoder(**encoder_kwargs)
@@ -342,6 +525,19 @@ class PreparedDataset:
     dropped_price_like: list[str]
 
 
+def add_log_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add ``log_offers`` and ``log_duration`` in place when their sources are present."""
+    if "number_of_offers_received" in df.columns:
+        df["log_offers"] = np.log1p(
+            df["number_of_offers_received"].clip(lower=0).astype(float)
+        )
+
+    if "performance_years" in df.columns:
+        valid_years = df["performance_years"].where(df["performance_years"] > 0)
+        df["log_duration"] = np.log10(valid_years)
+    return df
+
+
 def _prepare_training_data(
     source_df: pd.DataFrame,
     *,
@@ -353,7 +549,10 @@ def _prepare_training_data(
     max_unique_ratio: float,
     max_unique_categories: int,
     drop_price_patterns: Optional[Sequence[str]],
+    train_index: Optional[pd.Index] = None,
 ) -> PreparedDataset:
+    # With an explicit ``train_index`` the remaining rows form the test split
+    # and the column filters only look at training rows.
     if target_col not in source_df.columns:
         raise KeyError(f"{target_col} is missing from the provided DataFrame.")
 
@@ -363,17 +562,7 @@ def _prepare_training_data(
     mask = working[target_col].notna() & (working[target_col] > 0)
     working = working.loc[mask].copy()
     working["log_target"] = np.log10(working[target_col])
-
-    if "number_of_offers_received" in working.columns:
-        working["log_offers"] = np.log1p(
-            working["number_of_offers_received"].clip(lower=0).astype(float)
-        )
-
-    if "performance_years" in working.columns:
-        valid_years = working["performance_years"].where(
-            working["performance_years"] > 0
-        )
-        working["log_duration"] = np.log10(valid_years)
+    add_log_features(working)
 
     drop_cols = set(drop_columns or [])
     price_like_cols: list[str] = []
@@ -394,25 +583,30 @@ def _prepare_training_data(
     y = working["log_target"]
     feature_df = feature_df.drop(columns=[target_col, "log_target"])
 
-    nonnull_ratio = feature_df.notna().mean()
+    in_train = None if train_index is None else feature_df.index.isin(train_index)
+    stats_df = feature_df if in_train is None else feature_df.loc[in_train]
+
+    nonnull_ratio = stats_df.notna().mean()
     low_support_cols = nonnull_ratio[nonnull_ratio < min_nonnull_ratio].index.tolist()
     if low_support_cols:
         feature_df = feature_df.drop(columns=low_support_cols)
+        stats_df = stats_df.drop(columns=low_support_cols)
 
-    constant_cols = feature_df.columns[feature_df.nunique(dropna=True) <= 1].tolist()
+    constant_cols = feature_df.columns[stats_df.nunique(dropna=True) <= 1].tolist()
     if constant_cols:
         feature_df = feature_df.drop(columns=constant_cols)
+        stats_df = stats_df.drop(columns=constant_cols)
 
     numeric_cols = feature_df.select_dtypes(include=["number", "bool"]).columns.tolist()
     categorical_cols = [col for col in feature_df.columns if col not in numeric_cols]
 
     high_card_cols: list[str] = []
     for col in categorical_cols:
-        nunique = feature_df[col].nunique(dropna=True)
+        nunique = stats_df[col].nunique(dropna=True)
         if nunique == 0:
             high_card_cols.append(col)
             continue
-        ratio = nunique / len(feature_df)
+        ratio = nunique / len(stats_df)
         if (ratio > max_unique_ratio) or (
             max_unique_categories and nunique > max_unique_categories
         ):
@@ -424,9 +618,13 @@ def _prepare_training_data(
         ]
 
     X = feature_df
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state
-    )
+    if in_train is None:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=random_state
+        )
+    else:
+        X_train, X_test = X.loc[in_train], X.loc[~in_train]
+        y_train, y_test = y.loc[in_train], y.loc[~in_train]
 
     return PreparedDataset(
         X_train=X_train,
@@ -442,32 +640,9 @@ def _prepare_training_data(
     )
 
 
-def train_log_linear_model_with_split(
-    source_df: pd.DataFrame,
-    *,
-    target_col: str = "annualized_base_all",
-    test_size: float = 0.2,
-    random_state: int = 42,
-    max_categories: int = 50,
-    min_nonnull_ratio: float = 0.01,
-    max_unique_ratio: float = 0.8,
-    max_unique_categories: int = 300,
-    drop_columns: Optional[Sequence[str]] = None,
-    price_feature_patterns: Optional[Sequence[str]] = None,
-) -> LinearModelArtifacts:
-    """Train a multivariate log-linear model with an explicit train/test split."""
-    prepared = _prepare_training_data(
-        source_df,
-        target_col=target_col,
-        test_size=test_size,
-        random_state=random_state,
-        drop_columns=drop_columns,
-        min_nonnull_ratio=min_nonnull_ratio,
-        max_unique_ratio=max_unique_ratio,
-        max_unique_categories=max_unique_categories,
-        drop_price_patterns=price_feature_patterns,
-    )
-
+def _build_one_hot_preprocessor(
+    prepared: PreparedDataset, *, max_categories: Optional[int], sparse: bool = False
+) -> ColumnTransformer:
     numeric_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="median")),
@@ -477,70 +652,188 @@ def train_log_linear_model_with_split(
     categorical_transformer = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("encoder", _build_one_hot_encoder(max_categories=max_categories)),
+            ("encoder", _build_one_hot_encoder(max_categories=max_categories, sparse=sparse)),
         ]
     )
 
-    preprocessor = ColumnTransformer(
+    return ColumnTransformer(
         transformers=[
             ("num", numeric_transformer, prepared.numeric_cols),
             ("cat", categorical_transformer, prepared.categorical_cols),
         ],
         remainder="drop",
+        # sparse=True always stacks into CSR, however dense the numeric block is.
+        sparse_threshold=1.0 if sparse else 0.3,
     )
 
-    pipeline = Pipeline(
+
+def _build_ordinal_preprocessor(
+    prepared: PreparedDataset, *, float32: bool = False
+) -> ColumnTransformer:
+    # With float32 every branch ends in float32, so the stacked matrix does too.
+    numeric_steps = [("imputer", SimpleImputer(strategy="median"))]
+    if float32:
+        numeric_steps.append(("float32", float32_caster()))
+    numeric_transformer = Pipeline(steps=numeric_steps)
+    categorical_transformer = Pipeline(
         steps=[
-            ("preprocess", preprocessor),
-            ("regressor", LinearRegression()),
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            (
+                "encoder",
+                OrdinalEncoder(
+                    handle_unknown="use_encoded_value",
+                    unknown_value=-1,
+                    dtype=np.float32 if float32 else np.float64,
+                ),
+            ),
         ]
     )
 
-    pipeline.fit(prepared.X_train, prepared.y_train)
-
-    train_pred = pipeline.predict(prepared.X_train)
-    test_pred = pipeline.predict(prepared.X_test)
+    return ColumnTransformer(
+        transformers=[
+            ("num", numeric_transformer, prepared.numeric_cols),
+            ("cat", categorical_transformer, prepared.categorical_cols),
+        ],
+        remainder="drop",
+    )
 
-    train_mse = mean_squared_error(prepared.y_train, train_pred)
-    test_mse = mean_squared_error(prepared.y_test, test_pred)
 
-    train_metrics = {
-        "rmse": float(np.sqrt(train_mse)),
-        "mae": float(mean_absolute_error(prepared.y_train, train_pred)),
-        "r2": float(r2_score(prepared.y_train, train_pred)),
-    }
-    test_metrics = {
-        "rmse": float(np.sqrt(test_mse)),
-        "mae": float(mean_absolute_error(prepared.y_test, test_pred)),
-        "r2": float(r2_score(prepared.y_test, test_pred)),
+def _regression_metrics(y_true: pd.Series, y_pred: np.ndarray) -> dict[str, float]:
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        "rmse": float(np.sqrt(mse)),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)),
     }
 
+
+def _build_predictions_frame(y_test: pd.Series, test_pred: np.ndarray) -> pd.DataFrame:
     predictions = pd.DataFrame(
         {
-            "actual_log10": prepared.y_test,
+            "actual_log10": y_test,
             "predicted_log10": test_pred,
         },
-        index=prepared.y_test.index,
+        index=y_test.index,
     )
     predictions["actual_value"] = np.power(10.0, predictions["actual_log10"])
     predictions["predicted_value"] = np.power(10.0, predictions["predicted_log10"])
     predictions["residual_log10"] = (
         predictions["actual_log10"] - predictions["predicted_log10"]
     )
+    return predictions.sort_index()
+
+
+def _feature_column_summary(prepared: PreparedDataset) -> dict[str, list[str]]:
+    return {
+        "numeric": prepared.numeric_cols,
+        "categorical": prepared.categorical_cols,
+        "dropped_low_support": prepared.dropped_low_support,
+        "dropped_high_cardinality": prepared.dropped_high_cardinality,
+        "dropped_constant": prepared.dropped_constant,
+        "dropped_price_like": prepared.dropped_price_like,
+    }
+
+
+def _tree_feature_importance(
+    pipeline: Pipeline, prepared: PreparedDataset, *, random_state: int
+) -> pd.DataFrame:
+    feature_names = prepared.numeric_cols + prepared.categorical_cols
+    regressor = pipeline.named_steps["regressor"]
+    if hasattr(regressor, "feature_importances_"):
+        base_importance = np.asarray(regressor.feature_importances_)
+        importance_std = np.zeros_like(base_importance)
+    else:
+        perm_result = fast_permutation_importance(
+            pipeline,
+            prepared.X_test,
+            prepared.y_test,
+            n_repeats=3,
+            n_jobs=-1,
+            feature_names=feature_names,
+            random_state=random_state,
+        ).set_index("feature")
+        base_importance = perm_result.loc[feature_names, "importance"].to_numpy()
+        importance_std = perm_result.loc[feature_names, "importance_std"].to_numpy()
+
+    importances = pd.DataFrame(
+        {
+            "feature": feature_names,
+            "importance": base_importance,
+            "importance_std": importance_std,
+        }
+    ).sort_values("importance", ascending=False)
+    return importances.reset_index(drop=True)
+
+
+def _build_linear_regressor(ridge_alpha: Optional[float]) -> LinearRegression | Ridge:
+    if ridge_alpha is None:
+        return LinearRegression()
+    return Ridge(alpha=ridge_alpha, solver="lsqr")
+
+
+def train_log_linear_model_with_split(
+    source_df: pd.DataFrame,
+    *,
+    target_col: str = "annualized_base_all",
+    test_size: float = 0.2,
+    random_state: int = 42,
+    max_categories: int = 50,
+    min_nonnull_ratio: float = 0.01,
+    max_unique_ratio: float = 0.8,
+    max_unique_categories: int = 300,
+    drop_columns: Optional[Sequence[str]] = None,
+    price_feature_patterns: Optional[Sequence[str]] = None,
+    cache: Optional[PreprocessorCache] = None,
+    sparse: bool = False,
+    ridge_alpha: Optional[float] = None,
+) -> LinearModelArtifacts:
+    """Train a multivariate log-linear model with an explicit train/test split.
+
+    Pass a :class:`~scripts.preprocessing_cache.PreprocessorCache` as ``cache``
+    to reuse the fitted preprocessor across reruns on unchanged data.
+
+    With ``sparse=True`` the one-hot design matrix is kept in CSR format and
+    ``LinearRegression`` solves the least-squares problem with sparse LSQR,
+    which uses a fraction of the memory of the dense matrix on wide category
+    sets. ``ridge_alpha`` switches to a ``Ridge`` fit with that penalty
+    (``lsqr`` solver), which stays well conditioned when rare categories make
+    the design nearly collinear.
+    """
+    prepared = _prepare_training_data(
+        source_df,
+        target_col=target_col,
+        test_size=test_size,
+        random_state=random_state,
+        drop_columns=drop_columns,
+        min_nonnull_ratio=min_nonnull_ratio,
+        max_unique_ratio=max_unique_ratio,
+        max_unique_categories=max_unique_categories,
+        drop_price_patterns=price_feature_patterns,
+    )
+
+    pipeline = Pipeline(
+        steps=[
+            (
+                "preprocess",
+                _build_one_hot_preprocessor(
+                    prepared, max_categories=max_categories, sparse=sparse
+                ),
+            ),
+            ("regressor", _build_linear_regressor(ridge_alpha)),
+        ]
+    )
+
+    fit_pipeline_cached(pipeline, prepared.X_train, prepared.y_train, cache=cache)
+
+    train_pred = pipeline.predict(prepared.X_train)
+    test_pred = pipeline.predict(prepared.X_test)
 
     return LinearModelArtifacts(
         model=pipeline,
-        feature_columns={
-            "numeric": prepared.numeric_cols,
-            "categorical": prepared.categorical_cols,
-            "dropped_low_support": prepared.dropped_low_support,
-            "dropped_high_cardinality": prepared.dropped_high_cardinality,
-            "dropped_constant": prepared.dropped_constant,
-            "dropped_price_like": prepared.dropped_price_like,
-        },
-        train_metrics=train_metrics,
-        test_metrics=test_metrics,
-        predictions=predictions.sort_index(),
+        feature_columns=_feature_column_summary(prepared),
+        train_metrics=_regression_metrics(prepared.y_train, train_pred),
+        test_metrics=_regression_metrics(prepared.y_test, test_pred),
+        predictions=_build_predictions_frame(prepared.y_test, test_pred),
     )
 
 
@@ -552,7 +845,7 @@ def extract_linear_feature_importance(
     """Return coefficients and percentage impacts from a fitted linear pipeline."""
     pipeline = artifacts.model
     preprocessor: ColumnTransformer = pipeline.named_steps["preprocess"]
-    regressor: LinearRegression = pipeline.named_steps["regressor"]
+    regressor: LinearRegression | Ridge = pipeline.named_steps["regressor"]
 
     numeric_cols = artifacts.feature_columns.get("numeric", [])
     categorical_cols = artifacts.feature_columns.get("categorical", [])
@@ -622,8 +915,14 @@ def train_gradient_boost_model_with_split(
     learning_rate: float = 0.05,
     max_depth: Optional[int] = 8,
     price_feature_patterns: Optional[Sequence[str]] = None,
+    cache: Optional[PreprocessorCache] = None,
+    float32: bool = False,
 ) -> TreeModelArtifacts:
-    """Train a gradient boosting regressor on log10 target with an explicit split."""
+    """Train a gradient boosting regressor on log10 target with an explicit split.
+
+    ``cache`` optionally reuses the fitted preprocessor across reruns; with
+    ``float32=True`` the encoded matrices are float32 instead of float64.
+    """
     prepared = _prepare_training_data(
         source_df,
         target_col=target_col,
@@ -636,32 +935,6 @@ def train_gradient_boost_model_with_split(
         drop_price_patterns=price_feature_patterns,
     )
 
-    numeric_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="median")),
-        ]
-    )
-    categorical_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="most_frequent")),
-            (
-                "encoder",
-                OrdinalEncoder(
-                    handle_unknown="use_encoded_value",
-                    unknown_value=-1,
-                ),
-            ),
-        ]
-    )
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", numeric_transformer, prepared.numeric_cols),
-            ("cat", categorical_transformer, prepared.categorical_cols),
-        ],
-        remainder="drop",
-    )
-
     gradient_model = HistGradientBoostingRegressor(
         loss="squared_error",
         learning_rate=learning_rate,
@@ -672,82 +945,25 @@ def train_gradient_boost_model_with_split(
 
     pipeline = Pipeline(
         steps=[
-            ("preprocess", preprocessor),
+            ("preprocess", _build_ordinal_preprocessor(prepared, float32=float32)),
             ("regressor", gradient_model),
         ]
     )
 
-    pipeline.fit(prepared.X_train, prepared.y_train)
+    fit_pipeline_cached(pipeline, prepared.X_train, prepared.y_train, cache=cache)
 
     train_pred = pipeline.predict(prepared.X_train)
     test_pred = pipeline.predict(prepared.X_test)
 
-    train_mse = mean_squared_error(prepared.y_train, train_pred)
-    test_mse = mean_squared_error(prepared.y_test, test_pred)
-
-    train_metrics = {
-        "rmse": float(np.sqrt(train_mse)),
-        "mae": float(mean_absolute_error(prepared.y_train, train_pred)),
-        "r2": float(r2_score(prepared.y_train, train_pred)),
-    }
-    test_metrics = {
-        "rmse": float(np.sqrt(test_mse)),
-        "mae": float(mean_absolute_error(prepared.y_test, test_pred)),
-        "r2": float(r2_score(prepared.y_test, test_pred)),
-    }
-
-    predictions = pd.DataFrame(
-        {
-            "actual_log10": prepared.y_test,
-            "predicted_log10": test_pred,
-        },
-        index=prepared.y_test.index,
-    )
-    predictions["actual_value"] = np.power(10.0, predictions["actual_log10"])
-    predictions["predicted_value"] = np.power(10.0, predictions["predicted_log10"])
-    predictions["residual_log10"] = (
-        predictions["actual_log10"] - predictions["predicted_log10"]
-    )
-
-    feature_names = prepared.numeric_cols + prepared.categorical_cols
-    regressor = pipeline.named_steps["regressor"]
-    if hasattr(regressor, "feature_importances_"):
-        base_importance = np.asarray(regressor.feature_importances_)
-        importance_std = np.zeros_like(base_importance)
-    else:
-        perm_result = permutation_importance(
-            pipeline,
-            prepared.X_test,
-            prepared.y_test,
-            n_repeats=3,
-            random_state=random_state,
-            n_jobs=-1,
-        )
-        base_importance = perm_result.importances_mean
-        importance_std = perm_result.importances_std
-
-    importances = pd.DataFrame(
-        {
-            "feature": feature_names,
-            "importance": base_importance,
-            "importance_std": importance_std,
-        }
-    ).sort_values("importance", ascending=False)
-
     return TreeModelArtifacts(
         model=pipeline,
-        feature_columns={
-            "numeric": prepared.numeric_cols,
-            "categorical": prepared.categorical_cols,
-            "dropped_low_support": prepared.dropped_low_support,
-            "dropped_high_cardinality": prepared.dropped_high_cardinality,
-            "dropped_constant": prepared.dropped_constant,
-            "dropped_price_like": prepared.dropped_price_like,
-        },
-        train_metrics=train_metrics,
-        test_metrics=test_metrics,
-        predictions=predictions.sort_index(),
-        feature_importance=importances.reset_index(drop=True),
+        feature_columns=_feature_column_summary(prepared),
+        train_metrics=_regression_metrics(prepared.y_train, train_pred),
+        test_metrics=_regression_metrics(prepared.y_test, test_pred),
+        predictions=_build_predictions_frame(prepared.y_test, test_pred),
+        feature_importance=_tree_feature_importance(
+            pipeline, prepared, random_state=random_state
+        ),
     )
 
 
@@ -764,8 +980,14 @@ def train_decision_tree_model_with_split(
     max_depth: Optional[int] = 10,
     min_samples_leaf: int = 30,
     price_feature_patterns: Optional[Sequence[str]] = None,
+    cache: Optional[PreprocessorCache] = None,
+    float32: bool = False,
 ) -> TreeModelArtifacts:
-    """Train a single decision tree regressor on the log10 target."""
+    """Train a single decision tree regressor on the log10 target.
+
+    ``cache`` optionally reuses the fitted preprocessor across reruns; with
+    ``float32=True`` the encoded matrices are float32 instead of float64.
+    """
     prepared = _prepare_training_data(
         source_df,
         target_col=target_col,
@@ -778,32 +1000,6 @@ def train_decision_tree_model_with_split(
         drop_price_patterns=price_feature_patterns,
     )
 
-    numeric_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="median")),
-        ]
-    )
-    categorical_transformer = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="most_frequent")),
-            (
-                "encoder",
-                OrdinalEncoder(
-                    handle_unknown="use_encoded_value",
-                    unknown_value=-1,
-                ),
-            ),
-        ]
-    )
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", numeric_transformer, prepared.numeric_cols),
-            ("cat", categorical_transformer, prepared.categorical_cols),
-        ],
-        remainder="drop",
-    )
-
     tree_model = DecisionTreeRegressor(
         random_state=random_state,
         max_depth=max_depth,
@@ -812,92 +1008,251 @@ def train_decision_tree_model_with_split(
 
     pipeline = Pipeline(
         steps=[
-            ("preprocess", preprocessor),
+            ("preprocess", _build_ordinal_preprocessor(prepared, float32=float32)),
             ("regressor", tree_model),
         ]
     )
 
-    pipeline.fit(prepared.X_train, prepared.y_train)
+    fit_pipeline_cached(pipeline, prepared.X_train, prepared.y_train, cache=cache)
 
     train_pred = pipeline.predict(prepared.X_train)
     test_pred = pipeline.predict(prepared.X_test)
 
-    train_mse = mean_squared_error(prepared.y_train, train_pred)
-    test_mse = mean_squared_error(prepared.y_test, test_pred)
+    return TreeModelArtifacts(
+        model=pipeline,
+        feature_columns=_feature_column_summary(prepared),
+        train_metrics=_regression_metrics(prepared.y_train, train_pred),
+        test_metrics=_regression_metrics(prepared.y_test, test_pred),
+        predictions=_build_predictions_frame(prepared.y_test, test_pred),
+        feature_importance=_tree_feature_importance(
+            pipeline, prepared, random_state=random_state
+        ),
+    )
 
-    train_metrics = {
-        "rmse": float(np.sqrt(train_mse)),
-        "mae": float(mean_absolute_error(prepared.y_train, train_pred)),
-        "r2": float(r2_score(prepared.y_train, train_pred)),
-    }
-    test_metrics = {
-        "rmse": float(np.sqrt(test_mse)),
-        "mae": float(mean_absolute_error(prepared.y_test, test_pred)),
-        "r2": float(r2_score(prepared.y_test, test_pred)),
-    }
 
-    predictions = pd.DataFrame(
-        {
-            "actual_log10": prepared.y_test,
-            "predicted_log10": test_pred,
-        },
-        index=prepared.y_test.index,
-    )
-    predictions["actual_value"] = np.power(10.0, predictions["actual_log10"])
-    predictions["predicted_value"] = np.power(10.0, predictions["predicted_log10"])
-    predictions["residual_log10"] = (
-        predictions["actual_log10"] - predictions["predicted_log10"]
+# ---------------------------------------------------------------------------
+# Multi-model training
+
+
+VALUE_MODEL_NAMES: tuple[str, ...] = ("log_linear", "gradient_boost", "decision_tree")
+
+
+def _build_value_regressor(
+    name: str, params: dict[str, object], *, random_state: int
+) -> LinearRegression | HistGradientBoostingRegressor | DecisionTreeRegressor:
+    # Defaults mirror the single-model trainers above.
+    if name == "log_linear":
+        return LinearRegression(**params)
+    if name == "gradient_boost":
+        defaults = {
+            "loss": "squared_error",
+            "learning_rate": 0.05,
+            "max_depth": 8,
+            "max_bins": 255,
+            "random_state": random_state,
+        }
+        return HistGradientBoostingRegressor(**{**defaults, **params})
+    if name == "decision_tree":
+        defaults = {"max_depth": 10, "min_samples_leaf": 30, "random_state": random_state}
+        return DecisionTreeRegressor(**{**defaults, **params})
+    raise ValueError(f"Unknown value model {name!r}; expected one of {VALUE_MODEL_NAMES}.")
+
+
+def prepare_value_dataset(
+    source_df: pd.DataFrame,
+    *,
+    train_index: Optional[pd.Index] = None,
+    target_col: str = "annualized_base_all",
+    test_size: float = 0.2,
+    random_state: int = 42,
+    drop_columns: Optional[Sequence[str]] = None,
+    min_nonnull_ratio: float = 0.01,
+    max_unique_ratio: float = 0.8,
+    max_unique_categories: int = 300,
+    price_feature_patterns: Optional[Sequence[str]] = None,
+) -> PreparedDataset:
+    """Prepare the value-model features and log10 target as the trainers do.
+
+    Rows in ``train_index`` form the training split and every other usable
+    row the test split (e.g. one fiscal year held out); without it the split
+    is the trainers' random ``train_test_split``.
+    """
+    return _prepare_training_data(
+        source_df,
+        target_col=target_col,
+        test_size=test_size,
+        random_state=random_state,
+        drop_columns=drop_columns,
+        min_nonnull_ratio=min_nonnull_ratio,
+        max_unique_ratio=max_unique_ratio,
+        max_unique_categories=max_unique_categories,
+        drop_price_patterns=price_feature_patterns,
+        train_index=train_index,
     )
 
-    feature_names = prepared.numeric_cols + prepared.categorical_cols
-    regressor = pipeline.named_steps["regressor"]
-    if hasattr(regressor, "feature_importances_"):
-        base_importance = np.asarray(regressor.feature_importances_)
-        importance_std = np.zeros_like(base_importance)
-    else:
-        perm_result = permutation_importance(
-            pipeline,
-            prepared.X_test,
-            prepared.y_test,
-            n_repeats=3,
-            random_state=random_state,
-            n_jobs=-1,
+
+def build_value_pipeline(
+    name: str,
+    prepared: PreparedDataset,
+    *,
+    random_state: int = 42,
+    params: Optional[dict[str, object]] = None,
+    max_categories: int = 50,
+    float32: bool = False,
+    sparse: bool = False,
+) -> Pipeline:
+    """Return the unfitted preprocessing + regressor pipeline of a value model."""
+    if name == "log_linear":
+        preprocessor = _build_one_hot_preprocessor(
+            prepared, max_categories=max_categories, sparse=sparse
         )
-        base_importance = perm_result.importances_mean
-        importance_std = perm_result.importances_std
+    else:
+        preprocessor = _build_ordinal_preprocessor(prepared, float32=float32)
+    regressor = _build_value_regressor(name, dict(params or {}), random_state=random_state)
+    return Pipeline(steps=[("preprocess", preprocessor), ("regressor", regressor)])
 
-    importances = pd.DataFrame(
-        {
-            "feature": feature_names,
-            "importance": base_importance,
-            "importance_std": importance_std,
-        }
-    ).sort_values("importance", ascending=False)
 
-    return TreeModelArtifacts(
-        model=pipeline,
-        feature_columns={
-            "numeric": prepared.numeric_cols,
-            "categorical": prepared.categorical_cols,
-            "dropped_low_support": prepared.dropped_low_support,
-            "dropped_high_cardinality": prepared.dropped_high_cardinality,
-            "dropped_constant": prepared.dropped_constant,
-            "dropped_price_like": prepared.dropped_price_like,
-        },
-        train_metrics=train_metrics,
-        test_metrics=test_metrics,
-        predictions=predictions.sort_index(),
-        feature_importance=importances.reset_index(drop=True),
+def _fit_value_regressor(regressor, X_train, y_train, X_test):
+    """Fit one regressor on pre-encoded matrices (runs inside a pool worker)."""
+    regressor.fit(X_train, y_train)
+    return regressor, regressor.predict(X_train), regressor.predict(X_test)
+
+
+def train_value_models(
+    source_df: pd.DataFrame,
+    *,
+    models: Sequence[str] = VALUE_MODEL_NAMES,
+    n_jobs: Optional[int] = -1,
+    target_col: str = "annualized_base_all",
+    test_size: float = 0.2,
+    random_state: int = 42,
+    max_categories: int = 50,
+    min_nonnull_ratio: float = 0.01,
+    max_unique_ratio: float = 0.8,
+    max_unique_categories: int = 300,
+    drop_columns: Optional[Sequence[str]] = None,
+    price_feature_patterns: Optional[Sequence[str]] = None,
+    model_params: Optional[dict[str, dict[str, object]]] = None,
+    cache: Optional[PreprocessorCache] = None,
+    float32: bool = False,
+    sparse: bool = False,
+) -> dict[str, LinearModelArtifacts | TreeModelArtifacts]:
+    """Train several value models on one shared preparation of ``source_df``.
+
+    ``_prepare_training_data`` runs once, each distinct preprocessor is fitted
+    once (the tree models share the ordinal encoding), and the regressors are
+    fitted concurrently in a joblib process pool that memory-maps the encoded
+    matrices instead of copying them to every worker. ``model_params`` maps a
+    model name to keyword overrides for its regressor. Returns the same
+    artifact dataclasses as the ``train_*_with_split`` functions, keyed by
+    model name. ``cache`` optionally reuses fitted preprocessors and encoded
+    matrices across reruns, ``float32`` keeps the shared ordinal matrices
+    of the tree models in float32, and ``sparse`` keeps the log-linear
+    one-hot matrix in CSR format.
+    """
+    requested = list(dict.fromkeys(models))
+    unknown = [name for name in requested if name not in VALUE_MODEL_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown value models {unknown}; expected any of {VALUE_MODEL_NAMES}.")
+    if not requested:
+        raise ValueError("At least one model must be requested.")
+
+    prepared = _prepare_training_data(
+        source_df,
+        target_col=target_col,
+        test_size=test_size,
+        random_state=random_state,
+        drop_columns=drop_columns,
+        min_nonnull_ratio=min_nonnull_ratio,
+        max_unique_ratio=max_unique_ratio,
+        max_unique_categories=max_unique_categories,
+        drop_price_patterns=price_feature_patterns,
     )
 
+    preprocessors: dict[str, ColumnTransformer] = {}
+    matrices: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for name in requested:
+        encoding = "one_hot" if name == "log_linear" else "ordinal"
+        if encoding in preprocessors:
+            continue
+        if encoding == "one_hot":
+            preprocessor = _build_one_hot_preprocessor(
+                prepared, max_categories=max_categories, sparse=sparse
+            )
+        else:
+            preprocessor = _build_ordinal_preprocessor(prepared, float32=float32)
+        if cache is None:
+            X_train_encoded = preprocessor.fit_transform(prepared.X_train, prepared.y_train)
+            X_test_encoded = preprocessor.transform(prepared.X_test)
+        else:
+            preprocessor, X_train_encoded = cache.fit_transform(
+                preprocessor, prepared.X_train, prepared.y_train
+            )
+            X_test_encoded = cache.transform(preprocessor, prepared.X_test)
+        preprocessors[encoding] = preprocessor
+        matrices[encoding] = (X_train_encoded, X_test_encoded)
+
+    params = model_params or {}
+    jobs = []
+    for name in requested:
+        encoding = "one_hot" if name == "log_linear" else "ordinal"
+        X_train_encoded, X_test_encoded = matrices[encoding]
+        regressor = _build_value_regressor(
+            name, dict(params.get(name, {})), random_state=random_state
+        )
+        jobs.append(
+            delayed(_fit_value_regressor)(
+                regressor, X_train_encoded, prepared.y_train.to_numpy(), X_test_encoded
+            )
+        )
+
+    fitted = Parallel(n_jobs=n_jobs)(jobs)
+
+    results: dict[str, LinearModelArtifacts | TreeModelArtifacts] = {}
+    for name, (regressor, train_pred, test_pred) in zip(requested, fitted):
+        encoding = "one_hot" if name == "log_linear" else "ordinal"
+        # The encoded matrices are shared, but each pipeline owns its preprocessor
+        # so refitting one model cannot change the encoding of another.
+        pipeline = Pipeline(
+            steps=[
+                ("preprocess", copy.deepcopy(preprocessors[encoding])),
+                ("regressor", regressor),
+            ]
+        )
+        common = dict(
+            model=pipeline,
+            feature_columns=_feature_column_summary(prepared),
+            train_metrics=_regression_metrics(prepared.y_train, train_pred),
+            test_metrics=_regression_metrics(prepared.y_test, test_pred),
+            predictions=_build_predictions_frame(prepared.y_test, test_pred),
+        )
+        if name == "log_linear":
+            results[name] = LinearModelArtifacts(**common)
+        else:
+            results[name] = TreeModelArtifacts(
+                **common,
+                feature_importance=_tree_feature_importance(
+                    pipeline, prepared, random_state=random_state
+                ),
+            )
+    return results
+
 
 __all__ = [
+    "add_log_features",
+    "build_value_pipeline",
+    "compile_rules",
+    "CompiledRules",
     "candidate_feature_columns",
+    "extract_rule_table",
     "LinearModelArtifacts",
     "PreparedDataset",
+    "prepare_value_dataset",
     "TreeModelArtifacts",
+    "VALUE_MODEL_NAMES",
     "train_log_linear_model_with_split",
     "train_gradient_boost_model_with_split",
     "train_decision_tree_model_with_split",
     "extract_linear_feature_importance",
+    "train_value_models",
 ]
@@ -5,7 +5,7 @@ This module provides plotting, feature engineering, and analysis functions
 for predicting sequential contract modifications in federal security contracts.
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
@@ -13,6 +13,122 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 
+# Raw transaction fields needed to rebuild the modification history.
+CASCADE_RAW_COLUMNS: List[str] = [
+    'contract_transaction_unique_key',
+    'contract_award_unique_key',
+    'modification_number',
+    'action_date',
+    'action_type',
+    'period_of_performance_current_end_date',
+    'current_total_value_of_award',
+    'potential_total_value_of_award',
+    'federal_action_obligation',
+    'number_of_offers_received',
+    'awarding_agency_name',
+    'awarding_sub_agency_name',
+    'awarding_office_name',
+    'type_of_contract_pricing',
+    'solicitation_procedures',
+    'extent_competed',
+    'performance_based_service_acquisition',
+    'product_or_service_code',
+]
+
+# Feature order expected by the persisted models in models/.
+CASCADE_NUMERIC_FEATURES: List[str] = [
+    'current_value',
+    'potential_value',
+    'cumulative_value_change',
+    'cumulative_value_change_pct',
+    'value_change_from_prev',
+    'value_change_from_prev_pct',
+    'value_headroom',
+    'value_headroom_pct',
+    'days_since_prev_mod',
+    'days_since_contract_start',
+    'days_until_current_end',
+    'mod_frequency',
+    'value_growth_rate',
+    'cumulative_obligation',
+    'mods_to_date',
+    'number_of_offers_received',
+]
+
+CASCADE_CATEGORICAL_FEATURES: List[str] = [
+    'awarding_agency_name',
+    'awarding_office_name',
+    'type_of_contract_pricing',
+    'solicitation_procedures',
+    'extent_competed',
+    'performance_based_service_acquisition',
+    'current_action_type',
+]
+
+CASCADE_FEATURES: List[str] = CASCADE_NUMERIC_FEATURES + CASCADE_CATEGORICAL_FEATURES
+
+
+def prepare_modification_history(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type raw transaction rows and number each contract's actions.
+    
+    Parses dates and amounts and adds ``mod_sequence`` (0 for the first
+    action of a contract, 1 for the next one, ...), which is the input
+    expected by :func:`engineer_modification_features`.
+    """
+    df = raw.copy()
+    for col in ('action_date', 'period_of_performance_current_end_date'):
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in (
+        'current_total_value_of_award',
+        'potential_total_value_of_award',
+        'federal_action_obligation',
+        'number_of_offers_received',
+    ):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    df = df.dropna(subset=['contract_award_unique_key', 'action_date'])
+    df = df.sort_values(['contract_award_unique_key', 'action_date']).reset_index(drop=True)
+    df['mod_sequence'] = df.groupby('contract_award_unique_key').cumcount()
+    return df
+
+
+def build_cascade_feature_matrix(
+    df_engineered: pd.DataFrame,
+    categories: Optional[Mapping[str, Sequence[str]]] = None,
+) -> pd.DataFrame:
+    """
+    Return the model feature frame with categorical labels integer-encoded.
+    
+    Parameters
+    ----------
+    df_engineered : pd.DataFrame
+        Output of :func:`engineer_modification_features`
+    categories : Mapping[str, Sequence[str]], optional
+        Sorted label vocabulary per categorical feature (the ``classes_`` of
+        the label encoders used in training). Labels outside the vocabulary
+        become NaN and are left to the imputer. Without a vocabulary each
+        column is encoded by its own sorted labels.
+        
+    Returns
+    -------
+    pd.DataFrame
+        Frame with ``CASCADE_FEATURES`` columns in model order
+    """
+    features = df_engineered[CASCADE_FEATURES].copy()
+    for col in CASCADE_CATEGORICAL_FEATURES:
+        values = features[col].astype('string')
+        if categories is not None and col in categories:
+            vocabulary = pd.Index(categories[col])
+        else:
+            vocabulary = pd.Index(sorted(values.dropna().unique()))
+        codes = vocabulary.get_indexer(values.fillna(''))
+        features[col] = np.where(codes >= 0, codes, np.nan)
+    
+    numeric = features.astype(float)
+    return numeric.replace([np.inf, -np.inf], np.nan)
+
+
 def engineer_modification_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Create features for each modification that predict the next modification.
@@ -2,19 +2,21 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Optional, Sequence
 
 import numpy as np
 import pandas as pd
 import statsmodels.formula.api as smf
+from joblib import Parallel, delayed
 from statsmodels.regression.linear_model import RegressionResultsWrapper
 from sklearn.compose import ColumnTransformer
 from sklearn.linear_model import LogisticRegression
-from sklearn.neighbors import NearestNeighbors
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from .fixed_effects import AbsorbedRegressionResult, absorbed_ols
 from .usaspending_utils import DEFAULT_DB_PATH, prepare_cost_dataset
 
 
@@ -25,7 +27,9 @@ PERFORMANCE_EXTRA_FIELDS: tuple[str, ...] = (
     "award_id_piid",
     "awarding_agency_code",
     "awarding_agency_name",
+    "awarding_office_code",
     "action_date",
+    "action_date_fiscal_year",
     "performance_based_service_acquisition",
     "performance_based_service_acquisition_code",
     "modification_number",
@@ -41,6 +45,9 @@ class MatchingResult:
     control_mean: float
     coverage_ratio: float
     matches: pd.DataFrame
+    att_se: Optional[float] = None
+    att_ci: Optional[tuple[float, float]] = None
+    bootstrap_atts: Optional[np.ndarray] = None
 
 
 def prepare_performance_outcomes_dataset(
@@ -218,12 +225,128 @@ def compute_cohens_d(df: pd.DataFrame, column: str) -> float:
     return mean_diff / pooled_std
 
 
+def _weighted_group_moments(
+    values: np.ndarray,
+    weights: np.ndarray,
+    treatment: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Counts, means and (frequency-weighted, ddof=1) variances per group and column."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    moments: dict[str, np.ndarray] = {}
+    for label, mask in (("treated", treatment), ("control", ~treatment)):
+        w = (weights * mask)[:, None] * present
+        count = w.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (w * filled).sum(axis=0) / count
+            # Second pass over the deviations; sum(x**2) - n * mean**2 cancels
+            # catastrophically when the mean is large relative to the spread.
+            deviation = np.where(present, filled - mean, 0.0)
+            var = (w * deviation * deviation).sum(axis=0) / (count - 1)
+        moments[f"n_{label}"] = count
+        moments[f"mean_{label}"] = mean
+        moments[f"var_{label}"] = np.clip(var, 0.0, None)
+    return moments
+
+
+def compute_balance_table(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    matches: Optional[pd.DataFrame] = None,
+    treatment_col: str = "is_performance_based",
+) -> pd.DataFrame:
+    """Covariate balance between performance groups for many columns at once.
+
+    Parameters
+    ----------
+    columns:
+        Covariates to compare; defaults to every numeric column except the
+        treatment flag. Booleans are treated as 0/1.
+    matches:
+        ``MatchingResult.matches``; adds an ``after`` stage computed on the
+        matched rows, each weighted by how often it was matched.
+
+    Returns
+    -------
+    DataFrame with one row per (covariate, stage) and columns n/mean/var per
+    group, mean_diff, cohens_d (pooled-variance, as :func:`compute_cohens_d`),
+    smd (difference over ``sqrt((var_t + var_c) / 2)``) and variance_ratio.
+    """
+    if treatment_col not in df.columns:
+        raise KeyError(f"{treatment_col} is missing from the provided DataFrame.")
+    if columns is None:
+        columns = [
+            col
+            for col in df.select_dtypes(include=["number", "bool"]).columns
+            if col != treatment_col
+        ]
+    columns = list(columns)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise KeyError(f"Columns {missing} are missing from the provided DataFrame.")
+
+    values = df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    treatment = df[treatment_col].fillna(False).to_numpy(dtype=bool)
+    stages = {"before": np.ones(len(df))}
+    if matches is not None:
+        positions = df.index.get_indexer(
+            pd.concat([matches["treated_index"], matches["control_index"]], ignore_index=True)
+        )
+        if (positions < 0).any():
+            raise KeyError("Some matched indices are not present in the provided DataFrame.")
+        stages["after"] = np.bincount(positions, minlength=len(df)).astype(float)
+
+    frames = []
+    for stage, weights in stages.items():
+        moments = _weighted_group_moments(values, weights, treatment)
+        n_t, n_c = moments["n_treated"], moments["n_control"]
+        var_t, var_c = moments["var_treated"], moments["var_control"]
+        diff = moments["mean_treated"] - moments["mean_control"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pooled = np.sqrt(((n_t - 1) * var_t + (n_c - 1) * var_c) / (n_t + n_c - 2))
+            average = np.sqrt((var_t + var_c) / 2)
+            frame = pd.DataFrame(
+                {
+                    "covariate": columns,
+                    "stage": stage,
+                    **moments,
+                    "mean_diff": diff,
+                    "cohens_d": np.where((pooled > 0) & (n_t > 1) & (n_c > 1), diff / pooled, np.nan),
+                    "smd": np.where(average > 0, diff / average, np.nan),
+                    "variance_ratio": np.where(var_c > 0, var_t / var_c, np.nan),
+                }
+            )
+        frames.append(frame)
+
+    table = pd.concat(frames, ignore_index=True)
+    order = {
+        "covariate": {col: position for position, col in enumerate(columns)},
+        "stage": {stage: position for position, stage in enumerate(stages)},
+    }
+    return table.sort_values(
+        ["covariate", "stage"], key=lambda s: s.map(order[s.name])
+    ).reset_index(drop=True)
+
+
 def run_value_regression(
     df: pd.DataFrame,
     *,
     response: str = "log_current_value",
-) -> RegressionResultsWrapper:
-    """Run an OLS model with interaction terms requested in the analysis brief."""
+    absorb: Optional[Sequence[str]] = None,
+    cov_type: Optional[str] = None,
+    cluster: Optional[str] = None,
+) -> RegressionResultsWrapper | AbsorbedRegressionResult:
+    """Run an OLS model with interaction terms requested in the analysis brief.
+
+    By default agency effects enter as ``C(awarding_agency_code)`` dummies
+    with HC3 errors. Passing ``absorb`` (e.g. ``["awarding_agency_code",
+    "awarding_office_code", "action_date_fiscal_year"]``) absorbs those
+    effects with :func:`scripts.fixed_effects.absorbed_ols` instead, which
+    scales to many levels; ``cov_type`` then defaults to ``"HC1"``, or
+    ``"cluster"`` with a ``cluster`` column. Both results expose ``params``,
+    ``bse``, ``pvalues`` and ``rsquared_adj``.
+    """
 
     required_cols = [
         response,
@@ -234,44 +357,56 @@ def run_value_regression(
         "type_of_contract_pricing",
         "extent_competed",
         "awarding_agency_code",
+        *(absorb or []),
+        *([cluster] if cluster else []),
     ]
-    working = df.dropna(subset=required_cols).copy()
+    working = df.dropna(subset=list(dict.fromkeys(required_cols))).copy()
 
-    formula = (
-        f"{response} ~ is_performance_based"
+    main_terms = (
         " + log_base_all_options_value"
         " + duration_years"
         " + number_of_offers_received"
         " + C(type_of_contract_pricing)"
         " + C(extent_competed)"
-        " + C(awarding_agency_code)"
+    )
+    interactions = (
         " + is_performance_based:C(type_of_contract_pricing)"
         " + is_performance_based:C(extent_competed)"
     )
 
-    model = smf.ols(formula=formula, data=working).fit(cov_type="HC3")
+    if absorb:
+        return absorbed_ols(
+            f"{response} ~ is_performance_based{main_terms}{interactions}",
+            working,
+            absorb=absorb,
+            cov_type=cov_type or ("cluster" if cluster else "HC1"),
+            cluster=cluster,
+        )
+
+    formula = (
+        f"{response} ~ is_performance_based{main_terms}"
+        f" + C(awarding_agency_code){interactions}"
+    )
+    model = smf.ols(formula=formula, data=working).fit(cov_type=cov_type or "HC3")
     return model
 
 
-def propensity_score_match(
-    df: pd.DataFrame,
-    *,
-    outcome_col: str = "current_total_value_of_award",
-    n_neighbors: int = 5,
-    max_iter: int = 500,
-) -> MatchingResult:
-    """Perform one-to-one nearest propensity score matching."""
+PROPENSITY_FEATURES: tuple[str, ...] = (
+    "awarding_agency_code",
+    "type_of_contract_pricing",
+    "log_base_all_options_value",
+)
 
-    features: Sequence[str] = (
-        "awarding_agency_code",
-        "type_of_contract_pricing",
-        "log_base_all_options_value",
+
+def _build_propensity_classifier(max_iter: int) -> LogisticRegression:
+    return LogisticRegression(
+        max_iter=max_iter,
+        class_weight="balanced",
+        solver="lbfgs",
     )
 
-    feature_list = list(features)
-    required = ["is_performance_based", outcome_col, *feature_list]
-    working = df.dropna(subset=required).copy()
 
+def _build_propensity_pipeline(max_iter: int) -> Pipeline:
     categorical = ["awarding_agency_code", "type_of_contract_pricing"]
     numeric = ["log_base_all_options_value"]
 
@@ -282,55 +417,239 @@ def propensity_score_match(
         ]
     )
 
-    log_reg = LogisticRegression(
-        max_iter=max_iter,
-        class_weight="balanced",
-        solver="lbfgs",
-    )
-
-    pipeline = Pipeline(
+    return Pipeline(
         steps=[
             ("prep", preprocessor),
-            ("clf", log_reg),
+            ("clf", _build_propensity_classifier(max_iter)),
         ]
     )
 
-    pipeline.fit(working[feature_list], working["is_performance_based"])
-    working["propensity_score"] = pipeline.predict_proba(working[feature_list])[:, 1]
-
-    treated = working[working["is_performance_based"]].copy()
-    control = working[~working["is_performance_based"]].copy()
-
-    if treated.empty or control.empty:
-        return MatchingResult(float("nan"), float("nan"), float("nan"), 0.0, pd.DataFrame())
 
-    treated_scores = treated["propensity_score"].to_numpy().reshape(-1, 1)
-    control_scores = control["propensity_score"].to_numpy().reshape(-1, 1)
+def _nearest_available(
+    treated_scores: np.ndarray,
+    treated_strata: np.ndarray,
+    control_scores: np.ndarray,
+    control_strata: np.ndarray,
+    available: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the nearest available same-stratum control and its distance per treated unit.
+
+    Scores are offset by ``2 * stratum`` so a single sorted array keeps every
+    stratum contiguous; units without a candidate get index -1 and distance inf.
+    """
+    positions = np.flatnonzero(available)
+    keys = control_scores[positions] + 2.0 * control_strata[positions]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys, sorted_positions = keys[order], positions[order]
+    n_sorted = len(sorted_keys)
+
+    queries = treated_scores + 2.0 * treated_strata
+    best = np.full(len(queries), -1, dtype=np.int64)
+    best_distance = np.full(len(queries), np.inf)
+    if n_sorted == 0:
+        return best, best_distance
+    upper = np.searchsorted(sorted_keys, queries)
+    for candidate in (upper - 1, upper):
+        valid = (candidate >= 0) & (candidate < n_sorted)
+        control = np.where(valid, sorted_positions[np.clip(candidate, 0, n_sorted - 1)], -1)
+        valid &= control_strata[control] == treated_strata
+        distance = np.where(valid, np.abs(control_scores[control] - treated_scores), np.inf)
+        closer = distance < best_distance
+        best = np.where(closer, control, best)
+        best_distance = np.where(closer, distance, best_distance)
+    return best, best_distance
+
+
+def match_propensity_scores(
+    treated_scores: np.ndarray,
+    control_scores: np.ndarray,
+    *,
+    treated_strata: Optional[np.ndarray] = None,
+    control_strata: Optional[np.ndarray] = None,
+    caliper: Optional[float] = None,
+    replace: bool = False,
+    max_rounds: int = 5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Nearest-neighbour matching of treated to control propensity scores.
+
+    Parameters
+    ----------
+    treated_strata, control_strata:
+        Integer stratum codes; units only match within their stratum.
+    caliper:
+        Maximum absolute propensity difference of a match.
+    replace:
+        Allow a control to serve several treated units.
+    max_rounds:
+        Without replacement, every round proposes each unmatched treated unit
+        to its nearest still-available control and the closest proposal per
+        control wins; losers retry in the next round.
+
+    Returns
+    -------
+    Positions of the matched treated units and of their controls.
+    """
+    treated_scores = np.asarray(treated_scores, dtype=float)
+    control_scores = np.asarray(control_scores, dtype=float)
+    if treated_strata is None or control_strata is None:
+        treated_strata = np.zeros(len(treated_scores), dtype=np.int64)
+        control_strata = np.zeros(len(control_scores), dtype=np.int64)
+    limit = np.inf if caliper is None else caliper
+
+    available = np.ones(len(control_scores), dtype=bool)
+    unmatched = np.arange(len(treated_scores))
+    matched_treated: list[np.ndarray] = []
+    matched_control: list[np.ndarray] = []
+    for _ in range(1 if replace else max_rounds):
+        if len(unmatched) == 0 or not available.any():
+            break
+        control, distance = _nearest_available(
+            treated_scores[unmatched],
+            treated_strata[unmatched],
+            control_scores,
+            control_strata,
+            available,
+        )
+        # Units without a same-stratum control come back as -1 / inf; with no
+        # caliper ``inf <= inf`` would otherwise accept them.
+        proposing = (control >= 0) & np.isfinite(distance) & (distance <= limit)
+        treated, control, distance = unmatched[proposing], control[proposing], distance[proposing]
+        if not replace:
+            # Closest proposal per control wins; ties go to the earlier treated unit.
+            order = np.lexsort((treated, distance, control))
+            _, first = np.unique(control[order], return_index=True)
+            winners = order[first]
+            treated, control = treated[winners], control[winners]
+            available[control] = False
+        if len(treated) == 0:
+            break
+        matched_treated.append(treated)
+        matched_control.append(control)
+        unmatched = np.setdiff1d(unmatched, treated, assume_unique=True)
+
+    if not matched_treated:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    treated = np.concatenate(matched_treated)
+    control = np.concatenate(matched_control)
+    order = np.argsort(treated, kind="stable")
+    return treated[order], control[order]
+
+
+def _strata_codes(frame: pd.DataFrame, exact: Sequence[str]) -> np.ndarray:
+    if not exact:
+        return np.zeros(len(frame), dtype=np.int64)
+    return frame.groupby(list(exact), sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def _matched_att(
+    scores: np.ndarray,
+    treatment: np.ndarray,
+    outcome: np.ndarray,
+    strata: np.ndarray,
+    *,
+    caliper: Optional[float],
+    replace: bool,
+    max_rounds: int,
+) -> tuple[float, float, float, float, np.ndarray, np.ndarray]:
+    """Match on ``scores``; returns ATT, group means, coverage and matched row positions."""
+    treated_rows = np.flatnonzero(treatment)
+    control_rows = np.flatnonzero(~treatment)
+    t_pos, c_pos = match_propensity_scores(
+        scores[treated_rows],
+        scores[control_rows],
+        treated_strata=strata[treated_rows],
+        control_strata=strata[control_rows],
+        caliper=caliper,
+        replace=replace,
+        max_rounds=max_rounds,
+    )
+    t_rows, c_rows = treated_rows[t_pos], control_rows[c_pos]
+    if len(t_rows) == 0:
+        return float("nan"), float("nan"), float("nan"), 0.0, t_rows, c_rows
+    treated_mean = float(outcome[t_rows].mean())
+    control_mean = float(outcome[c_rows].mean())
+    coverage = len(t_rows) / len(treated_rows)
+    return treated_mean - control_mean, treated_mean, control_mean, coverage, t_rows, c_rows
+
+
+def _bootstrap_atts(
+    design: np.ndarray,
+    treatment: np.ndarray,
+    outcome: np.ndarray,
+    strata: np.ndarray,
+    seeds: Sequence[int],
+    max_iter: int,
+    match_kwargs: dict,
+) -> list[float]:
+    """Resample rows, refit the propensity model on the encoded design and rematch."""
+    atts = []
+    n_rows = len(treatment)
+    for seed in seeds:
+        rows = np.random.default_rng(seed).integers(0, n_rows, size=n_rows)
+        sample_treatment = treatment[rows]
+        if sample_treatment.all() or not sample_treatment.any():
+            atts.append(float("nan"))
+            continue
+        classifier = _build_propensity_classifier(max_iter)
+        classifier.fit(design[rows], sample_treatment)
+        scores = classifier.predict_proba(design[rows])[:, 1]
+        atts.append(
+            _matched_att(scores, sample_treatment, outcome[rows], strata[rows], **match_kwargs)[0]
+        )
+    return atts
 
-    k = min(n_neighbors, len(control))
-    neighbor_model = NearestNeighbors(n_neighbors=k)
-    neighbor_model.fit(control_scores)
-    distances, indices = neighbor_model.kneighbors(treated_scores)
 
-    control_available = np.ones(len(control), dtype=bool)
-    pairs: list[tuple[int, int]] = []
+def propensity_score_match(
+    df: pd.DataFrame,
+    *,
+    outcome_col: str = "current_total_value_of_award",
+    n_neighbors: int = 5,
+    max_iter: int = 500,
+    caliper: Optional[float] = None,
+    replace: bool = False,
+    exact: Optional[Sequence[str]] = None,
+    n_bootstrap: int = 0,
+    n_jobs: Optional[int] = -1,
+    confidence: float = 0.95,
+    random_state: int = 42,
+) -> MatchingResult:
+    """Perform one-to-one nearest propensity score matching.
+
+    Matching is vectorized over treated units (see
+    :func:`match_propensity_scores`); without replacement a treated unit gets
+    up to ``n_neighbors`` rounds to find a free control. ``caliper`` bounds
+    the propensity gap of a match, ``exact`` (e.g. ``["awarding_agency_code"]``)
+    restricts matches to identical values of those columns, and ``replace``
+    lets controls be reused. With ``n_bootstrap > 0`` the propensity model is
+    refitted on the once-encoded design and the matching redone on that many
+    resamples in ``n_jobs`` worker processes to estimate the ATT's standard
+    error and percentile interval.
+    """
+
+    exact_cols = list(exact or [])
+    required = ["is_performance_based", outcome_col, *PROPENSITY_FEATURES, *exact_cols]
+    working = df.dropna(subset=list(dict.fromkeys(required))).copy()
+
+    treatment = working["is_performance_based"].to_numpy(dtype=bool)
+    if treatment.all() or not treatment.any():
+        return MatchingResult(float("nan"), float("nan"), float("nan"), 0.0, pd.DataFrame())
 
-    for treated_idx, neighbor_idxs in enumerate(indices):
-        match_idx = None
-        for candidate in neighbor_idxs:
-            if control_available[candidate]:
-                match_idx = candidate
-                break
-        if match_idx is None:
-            continue
-        control_available[match_idx] = False
-        pairs.append((treated_idx, match_idx))
+    feature_list = list(PROPENSITY_FEATURES)
+    pipeline = _build_propensity_pipeline(max_iter)
+    pipeline.fit(working[feature_list], treatment)
+    working["propensity_score"] = pipeline.predict_proba(working[feature_list])[:, 1]
 
-    if not pairs:
+    outcome = working[outcome_col].to_numpy(dtype=float)
+    strata = _strata_codes(working, exact_cols)
+    match_kwargs = dict(caliper=caliper, replace=replace, max_rounds=n_neighbors)
+    att, treated_mean, control_mean, coverage, t_rows, c_rows = _matched_att(
+        working["propensity_score"].to_numpy(), treatment, outcome, strata, **match_kwargs
+    )
+    if len(t_rows) == 0:
         return MatchingResult(float("nan"), float("nan"), float("nan"), 0.0, pd.DataFrame())
 
-    treated_indices = [treated.index[i] for i, _ in pairs]
-    control_indices = [control.index[j] for _, j in pairs]
+    treated_indices = working.index[t_rows]
+    control_indices = working.index[c_rows]
 
     matched_df = pd.DataFrame(
         {
@@ -345,19 +664,45 @@ def propensity_score_match(
     matched_df["difference"] = matched_df["treated_outcome"] - matched_df["control_outcome"]
     matched_df["propensity_gap"] = matched_df["treated_propensity"] - matched_df["control_propensity"]
 
-    att = matched_df["difference"].mean()
-    treated_mean = matched_df["treated_outcome"].mean()
-    control_mean = matched_df["control_outcome"].mean()
-    coverage = len(matched_df) / len(treated)
-
-    return MatchingResult(att, treated_mean, control_mean, coverage, matched_df)
+    if n_bootstrap <= 0:
+        return MatchingResult(att, treated_mean, control_mean, coverage, matched_df)
+
+    # Encode once; each draw only refits the logistic model on its resampled rows.
+    design = pipeline.named_steps["prep"].transform(working[feature_list])
+    seeds = np.random.default_rng(random_state).integers(0, 2**31 - 1, size=n_bootstrap)
+    workers = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(1, int(n_jobs))
+    batches = [batch.tolist() for batch in np.array_split(seeds, min(workers, n_bootstrap))]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_atts)(design, treatment, outcome, strata, batch, max_iter, match_kwargs)
+        for batch in batches
+    )
+    draws = np.array([value for batch in results for value in batch])
+    finite = draws[np.isfinite(draws)]
+    tail = (1 - confidence) / 2
+    ci = (
+        (float(np.quantile(finite, tail)), float(np.quantile(finite, 1 - tail)))
+        if len(finite)
+        else (float("nan"), float("nan"))
+    )
+    return MatchingResult(
+        att,
+        treated_mean,
+        control_mean,
+        coverage,
+        matched_df,
+        att_se=float(finite.std(ddof=1)) if len(finite) > 1 else float("nan"),
+        att_ci=ci,
+        bootstrap_atts=draws,
+    )
 
 
 __all__ = [
     "MatchingResult",
     "compute_agency_performance_share",
+    "compute_balance_table",
     "compute_cohens_d",
     "compute_pricing_mix",
+    "match_propensity_scores",
     "prepare_performance_outcomes_dataset",
     "propensity_score_match",
     "run_value_regression",
@@ -0,0 +1,123 @@
+"""float32 preprocessing steps and metric tolerance checks for the tree trainers.
+
+Decision trees cast their inputs to float32 internally, but
+HistGradientBoosting validates ``X`` as float64 in ``fit`` and ``predict``, so
+a float32 design matrix is converted back and costs an extra copy there. The
+float32 switches of the trainers are therefore off by default; they only pay
+off where the preprocessed matrix itself is the memory bottleneck (cached
+encodings, decision trees). :func:`float32_caster` ends a ``ColumnTransformer``
+branch in float32, which keeps the stacked matrix float32 as long as every
+branch does. Because the cast can move values across a bin edge,
+:func:`compare_float32_training` trains a model both ways and reports whether
+the metrics stay within tolerance.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Mapping
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import FunctionTransformer
+
+
+def to_float32(X: object) -> object:
+    """Return ``X`` as float32 (dense arrays, frames and sparse matrices)."""
+    if sparse.issparse(X):
+        return X.astype(np.float32)
+    if isinstance(X, pd.DataFrame):
+        return X.astype(np.float32)
+    return np.asarray(X, dtype=np.float32)
+
+
+def float32_caster() -> FunctionTransformer:
+    """Stateless pipeline step casting its input to float32, keeping feature names."""
+    return FunctionTransformer(to_float32, feature_names_out="one-to-one", validate=False)
+
+
+def compare_metrics(
+    reference: Mapping[str, float],
+    candidate: Mapping[str, float],
+    *,
+    rtol: float = 0.01,
+    atol: float = 0.005,
+) -> pd.DataFrame:
+    """Compare two metric dicts key by key.
+
+    A metric is within tolerance when ``|candidate - reference| <= atol + rtol * |reference|``.
+
+    Returns
+    -------
+    DataFrame with columns metric, reference, candidate, abs_diff and within_tolerance.
+    """
+    rows = []
+    for metric in reference:
+        if metric not in candidate:
+            raise KeyError(f"Metric {metric!r} is missing from the candidate metrics.")
+        ref = float(reference[metric])
+        cand = float(candidate[metric])
+        diff = abs(cand - ref)
+        rows.append(
+            {
+                "metric": metric,
+                "reference": ref,
+                "candidate": cand,
+                "abs_diff": diff,
+                "within_tolerance": bool(diff <= atol + rtol * abs(ref)),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def check_metric_tolerance(
+    reference: Mapping[str, float],
+    candidate: Mapping[str, float],
+    *,
+    rtol: float = 0.01,
+    atol: float = 0.005,
+) -> pd.DataFrame:
+    """Like :func:`compare_metrics`, but raise ``ValueError`` if any metric drifts."""
+    comparison = compare_metrics(reference, candidate, rtol=rtol, atol=atol)
+    failed = comparison.loc[~comparison["within_tolerance"], "metric"].tolist()
+    if failed:
+        raise ValueError(f"Metrics outside tolerance (rtol={rtol}, atol={atol}): {failed}")
+    return comparison
+
+
+def compare_float32_training(
+    train_fn: Callable[..., object],
+    *args: object,
+    metrics_attr: str = "test_metrics",
+    rtol: float = 0.01,
+    atol: float = 0.005,
+    **kwargs: object,
+) -> pd.DataFrame:
+    """Train with ``float32=False`` and ``float32=True`` and compare the metrics.
+
+    ``train_fn`` is any trainer accepting a ``float32`` keyword, e.g.
+    ``train_gradient_boost_model_with_split`` (``metrics_attr="test_metrics"``)
+    or ``train_modification_risk_classifier`` (``metrics_attr="metrics"``).
+    The returned comparison carries the wall-clock seconds of both runs in
+    ``attrs["seconds"]``.
+    """
+    metrics: dict[bool, Mapping[str, float]] = {}
+    seconds: dict[str, float] = {}
+    for use_float32 in (False, True):
+        start = time.perf_counter()
+        artifacts = train_fn(*args, float32=use_float32, **kwargs)
+        seconds["float32" if use_float32 else "float64"] = time.perf_counter() - start
+        metrics[use_float32] = getattr(artifacts, metrics_attr)
+    comparison = compare_metrics(metrics[False], metrics[True], rtol=rtol, atol=atol)
+    comparison.attrs["seconds"] = seconds
+    return comparison
+
+
+__all__ = [
+    "check_metric_tolerance",
+    "compare_float32_training",
+    "compare_metrics",
+    "float32_caster",
+    "to_float32",
+]
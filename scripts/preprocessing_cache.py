@@ -0,0 +1,168 @@
+"""Opt-in on-disk memoization of fitted preprocessors for the training helpers.
+
+Notebook reruns refit the same imputers and encoders on unchanged data. A
+:class:`PreprocessorCache` stores each fitted preprocessor together with the
+matrix it produced, keyed by a fast content hash of the training frame and a
+hash of the unfitted transformer configuration, and trims the cache directory
+to a byte budget after every write.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Memory
+from sklearn.base import BaseEstimator, clone
+from sklearn.pipeline import Pipeline
+
+from .usaspending_utils import REPO_ROOT
+
+DEFAULT_CACHE_DIR = REPO_ROOT / ".cache" / "preprocessors"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+def frame_fingerprint(data: pd.DataFrame | pd.Series | np.ndarray | None) -> str:
+    """Return a content hash of ``data`` (values, index, column names and dtypes)."""
+    digest = hashlib.blake2b(digest_size=16)
+    if data is None:
+        digest.update(b"none")
+    elif isinstance(data, (pd.DataFrame, pd.Series)):
+        row_hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+        digest.update(row_hashes.tobytes())
+        if isinstance(data, pd.DataFrame):
+            digest.update(repr(list(data.columns)).encode("utf-8"))
+            digest.update(repr([str(dtype) for dtype in data.dtypes]).encode("utf-8"))
+        else:
+            digest.update(repr((data.name, str(data.dtype))).encode("utf-8"))
+    else:
+        array = np.ascontiguousarray(data)
+        digest.update(repr((array.shape, str(array.dtype))).encode("utf-8"))
+        if array.dtype == object:
+            digest.update(joblib.hash(array).encode("utf-8"))
+        else:
+            digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def transformer_fingerprint(transformer: BaseEstimator) -> str:
+    """Return a hash of the transformer configuration, ignoring any fitted state."""
+    return joblib.hash(clone(transformer))
+
+
+def _fit_transform(transformer_key, X_key, y_key, *, transformer, X, y):
+    # The keys identify the call; the ignored arguments carry the actual data.
+    fitted = clone(transformer)
+    transformed = fitted.fit_transform(X, y)
+    return fitted, transformed
+
+
+def _transform(fitted_key, X_key, *, fitted, X):
+    return fitted.transform(X)
+
+
+class PreprocessorCache:
+    """Disk cache of fitted preprocessors and their transformed matrices.
+
+    Parameters
+    ----------
+    location:
+        Directory used by the underlying ``joblib.Memory``.
+    max_bytes:
+        Size budget for the directory; least recently used entries are evicted
+        once it is exceeded.
+    verbose:
+        Verbosity passed to ``joblib.Memory``.
+    """
+
+    def __init__(
+        self,
+        location: Path | str = DEFAULT_CACHE_DIR,
+        *,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        verbose: int = 0,
+    ) -> None:
+        self.location = Path(location).expanduser()
+        self.max_bytes = max_bytes
+        self.memory = Memory(location=str(self.location), verbose=verbose)
+        self._cached_fit_transform = self.memory.cache(
+            _fit_transform, ignore=["transformer", "X", "y"]
+        )
+        self._cached_transform = self.memory.cache(_transform, ignore=["fitted", "X"])
+
+    def fit_transform(
+        self,
+        transformer: BaseEstimator,
+        X: pd.DataFrame | np.ndarray,
+        y: pd.Series | np.ndarray | None = None,
+    ) -> tuple[BaseEstimator, np.ndarray]:
+        """Return a fitted clone of ``transformer`` and ``transformer.fit_transform(X, y)``."""
+        fitted, transformed = self._cached_fit_transform(
+            transformer_fingerprint(transformer),
+            frame_fingerprint(X),
+            frame_fingerprint(y),
+            transformer=transformer,
+            X=X,
+            y=y,
+        )
+        self._evict()
+        return fitted, transformed
+
+    def transform(self, fitted: BaseEstimator, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Return ``fitted.transform(X)``, reusing the stored matrix when available."""
+        transformed = self._cached_transform(
+            joblib.hash(fitted), frame_fingerprint(X), fitted=fitted, X=X
+        )
+        self._evict()
+        return transformed
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        self.memory.clear(warn=False)
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        try:
+            self.memory.reduce_size(bytes_limit=self.max_bytes)
+        except TypeError:
+            # joblib < 1.4 configures the budget on the Memory object instead.
+            self.memory.bytes_limit = self.max_bytes
+            self.memory.reduce_size()
+
+
+def fit_pipeline_cached(
+    pipeline: Pipeline,
+    X: pd.DataFrame,
+    y: pd.Series | np.ndarray | None = None,
+    *,
+    cache: Optional[PreprocessorCache] = None,
+) -> Pipeline:
+    """Fit ``pipeline`` in place, taking its first step from ``cache`` when given.
+
+    The first step is expected to be the preprocessor (``"preprocess"`` in the
+    project pipelines); the remaining steps are fitted on its cached output.
+    Without a cache this is exactly ``pipeline.fit(X, y)``.
+    """
+    if cache is None:
+        return pipeline.fit(X, y)
+
+    name, preprocessor = pipeline.steps[0]
+    fitted, transformed = cache.fit_transform(preprocessor, X, y)
+    pipeline.steps[0] = (name, fitted)
+    if len(pipeline.steps) > 1:
+        pipeline[1:].fit(transformed, y)
+    return pipeline
+
+
+__all__ = [
+    "DEFAULT_CACHE_DIR",
+    "PreprocessorCache",
+    "fit_pipeline_cached",
+    "frame_fingerprint",
+    "transformer_fingerprint",
+]
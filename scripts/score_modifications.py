@@ -0,0 +1,495 @@
+"""Batch scoring of contract modifications with the persisted cascade models.
+
+The notebooks train ``models/modification_cascade_classifier.pkl`` (does a
+further modification follow?), ``modification_cost_regressor.pkl`` (value
+change of that next modification) and the median ``modification_imputer.pkl``
+shared by both. This module scores a whole prime transactions database with
+them:
+
+* transactions are streamed in chunks ordered by contract, and a contract is
+  never split across chunks, so the per-contract features in
+  :func:`scripts.modification_cascade_utils.engineer_modification_features`
+  see the full history;
+* chunks are scored in worker processes that load the three artifacts once,
+  in their initializer;
+* with ``--compiled`` the workers load NumPy exports of the models (see
+  :mod:`scripts.compiled_hgb` and the ``export-compiled`` command) instead of
+  the pickles, so they start without importing scikit-learn;
+* predictions are bulk-written to a results table, one transaction per chunk.
+
+The categorical features were label-encoded in training, but the encoders
+were not persisted. Pass the training vocabulary (a JSON mapping of feature to
+sorted labels) when available; otherwise it is rebuilt from the distinct
+values in the database, which matches the training codes only when the
+models were fitted on the same set of labels.
+
+Usage::
+
+    python -m scripts.score_modifications score --db db/prime_transactions_filtered.sqlite --workers 4
+    python -m scripts.score_modifications export-compiled
+    python -m scripts.score_modifications score --compiled --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Sequence
+
+import joblib
+import pandas as pd
+
+from .compiled_hgb import CompiledHGB, export_hgb
+from .modification_cascade_utils import (
+    CASCADE_CATEGORICAL_FEATURES,
+    CASCADE_RAW_COLUMNS,
+    build_cascade_feature_matrix,
+    engineer_modification_features,
+    prepare_modification_history,
+)
+from .usaspending_utils import (
+    DEFAULT_DB_PATH,
+    DEFAULT_SECURITY_NAICS,
+    REPO_ROOT,
+    ensure_contract_history_indexes,
+    get_connection,
+    get_prime_transactions_table_name,
+)
+
+LOGGER = logging.getLogger("score_modifications")
+
+DEFAULT_MODELS_DIR = REPO_ROOT / "models"
+DEFAULT_RESULTS_TABLE = "modification_predictions"
+DEFAULT_CHUNK_SIZE = 50_000
+
+MODEL_FILES: dict[str, str] = {
+    "classifier": "modification_cascade_classifier.pkl",
+    "regressor": "modification_cost_regressor.pkl",
+    "imputer": "modification_imputer.pkl",
+}
+
+# NumPy exports of the classifier and regressor; each embeds the imputer.
+COMPILED_MODEL_FILES: dict[str, str] = {
+    "classifier": "modification_cascade_classifier.npz",
+    "regressor": "modification_cost_regressor.npz",
+}
+
+# Raw column holding the labels of each encoded categorical feature.
+_CATEGORY_SOURCES: dict[str, str] = {
+    **{col: col for col in CASCADE_CATEGORICAL_FEATURES},
+    "current_action_type": "action_type",
+}
+
+RESULT_COLUMNS: tuple[str, ...] = (
+    "contract_transaction_unique_key",
+    "contract_award_unique_key",
+    "mod_sequence",
+    "predicted_risk",
+    "predicted_cost_change",
+    "scored_at",
+)
+
+_WORKER_STATE: dict[str, object] = {}
+
+
+@dataclass
+class CascadeModels:
+    """Loaded cascade artifacts and the categorical vocabulary used to encode inputs.
+
+    ``imputer`` is ``None`` for compiled models, which impute internally.
+    """
+
+    classifier: object
+    regressor: object
+    imputer: Optional[object]
+    categories: dict[str, list[str]]
+
+
+@dataclass
+class ScoringSummary:
+    """Throughput of a :func:`score_database` run."""
+
+    rows: int
+    contracts: int
+    chunks: int
+    elapsed_seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds > 0 else float("nan")
+
+
+def load_cascade_models(
+    models_dir: Path | str = DEFAULT_MODELS_DIR,
+    categories: Optional[Mapping[str, Sequence[str]]] = None,
+    *,
+    compiled: bool = False,
+) -> CascadeModels:
+    """Load the classifier, regressor and imputer pickles from ``models_dir``.
+
+    With ``compiled`` the ``.npz`` exports written by
+    :func:`export_compiled_cascade` are loaded instead.
+    """
+    models_dir = Path(models_dir).expanduser()
+    files = COMPILED_MODEL_FILES if compiled else MODEL_FILES
+    loaded: dict[str, object] = {"imputer": None}
+    for role, filename in files.items():
+        path = models_dir / filename
+        if not path.exists():
+            raise FileNotFoundError(f"Model artifact not found at {path}")
+        loaded[role] = CompiledHGB.load(path) if compiled else joblib.load(path)
+    return CascadeModels(
+        categories={key: list(values) for key, values in (categories or {}).items()},
+        **loaded,
+    )
+
+
+def export_compiled_cascade(
+    models_dir: Path | str = DEFAULT_MODELS_DIR,
+    output_dir: Optional[Path | str] = None,
+) -> list[Path]:
+    """Export the classifier and regressor pickles, with the imputer, to ``.npz`` files."""
+    models = load_cascade_models(models_dir)
+    output_dir = Path(output_dir).expanduser() if output_dir is not None else Path(models_dir).expanduser()
+    return [
+        export_hgb(getattr(models, role), output_dir / filename, preprocessor=models.imputer)
+        for role, filename in COMPILED_MODEL_FILES.items()
+    ]
+
+
+def build_category_vocabulary(
+    conn: sqlite3.Connection,
+    *,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+) -> dict[str, list[str]]:
+    """Return the sorted distinct labels of each categorical feature in the database.
+
+    Sorting mirrors ``LabelEncoder``, so the codes agree with training as long
+    as the models were fitted on the same labels.
+    """
+    table_name = get_prime_transactions_table_name(conn)
+    where_sql, params = _naics_where(naics_filter)
+    vocabulary: dict[str, list[str]] = {}
+    for feature, source in _CATEGORY_SOURCES.items():
+        rows = conn.execute(
+            f"SELECT DISTINCT {source} FROM {table_name} {where_sql}", params
+        ).fetchall()
+        vocabulary[feature] = sorted(str(value) for (value,) in rows if value is not None)
+    return vocabulary
+
+
+def load_category_vocabulary(path: Path | str) -> dict[str, list[str]]:
+    """Read a ``{feature: [labels, ...]}`` JSON vocabulary."""
+    path = Path(path).expanduser()
+    if not path.exists():
+        raise FileNotFoundError(f"Category vocabulary not found at {path}")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    missing = [col for col in CASCADE_CATEGORICAL_FEATURES if col not in data]
+    if missing:
+        raise KeyError(f"Category vocabulary is missing features: {missing}")
+    return {key: [str(label) for label in labels] for key, labels in data.items()}
+
+
+def _naics_where(naics_filter: Optional[Iterable[str]]) -> tuple[str, list[str]]:
+    if not naics_filter:
+        return "", []
+    codes = [str(code) for code in naics_filter]
+    placeholders = ",".join("?" for _ in codes)
+    return f"WHERE naics_code IN ({placeholders})", codes
+
+
+def iter_contract_chunks(
+    conn: sqlite3.Connection,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+) -> Iterator[pd.DataFrame]:
+    """Yield raw transaction chunks of roughly ``chunk_size`` rows with whole contracts.
+
+    Rows are read ordered by contract and action date; the trailing contract
+    of every chunk is carried over to the next one so each contract's history
+    arrives in a single chunk.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive.")
+    table_name = get_prime_transactions_table_name(conn)
+    where_sql, params = _naics_where(naics_filter)
+    key_filter = "contract_award_unique_key IS NOT NULL"
+    where_sql = f"{where_sql} AND {key_filter}" if where_sql else f"WHERE {key_filter}"
+    query = (
+        f"SELECT {', '.join(CASCADE_RAW_COLUMNS)} FROM {table_name} {where_sql} "
+        "ORDER BY contract_award_unique_key, action_date"
+    )
+
+    carry: Optional[pd.DataFrame] = None
+    for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunk_size):
+        if carry is not None and not carry.empty:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        keys = chunk["contract_award_unique_key"]
+        is_last_contract = keys.eq(keys.iloc[-1]).to_numpy()
+        carry = chunk.loc[is_last_contract]
+        complete = chunk.loc[~is_last_contract]
+        if not complete.empty:
+            yield complete.reset_index(drop=True)
+    if carry is not None and not carry.empty:
+        yield carry.reset_index(drop=True)
+
+
+def score_chunk(raw: pd.DataFrame, models: CascadeModels) -> pd.DataFrame:
+    """Engineer features for ``raw`` transactions and score every modification."""
+    history = prepare_modification_history(raw)
+    columns = ["contract_transaction_unique_key", "contract_award_unique_key", "mod_sequence"]
+    if history.empty:
+        return pd.DataFrame(columns=list(RESULT_COLUMNS[:-1]))
+
+    engineered = engineer_modification_features(history)
+    features = build_cascade_feature_matrix(engineered, models.categories or None)
+    if models.imputer is None:
+        imputed = features
+    else:
+        # The estimators were fitted on a named frame; keep the names to match.
+        imputed = pd.DataFrame(
+            models.imputer.transform(features), columns=features.columns, index=features.index
+        )
+
+    scored = engineered[columns].copy()
+    scored["predicted_risk"] = models.classifier.predict_proba(imputed)[:, 1]
+    scored["predicted_cost_change"] = models.regressor.predict(imputed)
+    return scored
+
+
+def _init_worker(
+    models_dir: str, categories: Optional[dict[str, list[str]]], compiled: bool = False
+) -> None:
+    _WORKER_STATE["models"] = load_cascade_models(models_dir, categories, compiled=compiled)
+
+
+def _score_in_worker(raw: pd.DataFrame) -> pd.DataFrame:
+    return score_chunk(raw, _WORKER_STATE["models"])
+
+
+def ensure_results_table(conn: sqlite3.Connection, table: str = DEFAULT_RESULTS_TABLE) -> None:
+    """Create the predictions table if missing."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS "{table}" (
+            contract_transaction_unique_key TEXT PRIMARY KEY,
+            contract_award_unique_key TEXT,
+            mod_sequence INTEGER,
+            predicted_risk REAL,
+            predicted_cost_change REAL,
+            scored_at TEXT
+        )
+        """
+    )
+    conn.commit()
+
+
+def write_predictions(
+    conn: sqlite3.Connection,
+    scored: pd.DataFrame,
+    table: str = DEFAULT_RESULTS_TABLE,
+) -> int:
+    """Upsert ``scored`` into ``table`` in a single transaction; return the row count."""
+    if scored.empty:
+        return 0
+    frame = scored.copy()
+    frame["scored_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    frame = frame[list(RESULT_COLUMNS)]
+    frame["mod_sequence"] = frame["mod_sequence"].astype(int)
+    frame = frame.astype(object).where(frame.notna(), None)
+
+    placeholders = ", ".join("?" for _ in RESULT_COLUMNS)
+    with conn:
+        conn.executemany(
+            f'INSERT OR REPLACE INTO "{table}" ({", ".join(RESULT_COLUMNS)}) '
+            f"VALUES ({placeholders})",
+            frame.itertuples(index=False, name=None),
+        )
+    return len(frame)
+
+
+def score_database(
+    *,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    output_db: Optional[Path | str] = None,
+    table: str = DEFAULT_RESULTS_TABLE,
+    models_dir: Path | str = DEFAULT_MODELS_DIR,
+    categories: Optional[Mapping[str, Sequence[str]]] = None,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    compiled: bool = False,
+    create_indexes: bool = False,
+) -> ScoringSummary:
+    """Score every transaction in ``db_path`` and write predictions to ``table``.
+
+    Parameters
+    ----------
+    db_path:
+        Prime transactions database to read.
+    output_db:
+        Database receiving the results table; defaults to ``db_path``.
+    categories:
+        Training vocabulary of the categorical features; rebuilt from
+        ``db_path`` when omitted (see the module docstring).
+    chunk_size:
+        Approximate rows per chunk; whole contracts are kept together.
+    workers:
+        Scoring processes (``-1`` for all CPUs, ``1`` to score in-process).
+    compiled:
+        Score with the NumPy exports instead of the scikit-learn pickles.
+    create_indexes:
+        Create the contract-history indexes in ``db_path`` first, which speeds
+        up the ordered scan but writes to the source database.
+
+    Returns
+    -------
+    ScoringSummary with rows, contracts and chunks written and the elapsed time.
+    """
+    if workers in (None, -1):
+        workers = os.cpu_count() or 1
+    workers = max(1, int(workers))
+
+    conn = get_connection(db_path)
+    same_db = output_db is None or Path(output_db).resolve() == Path(db_path).resolve()
+    out_conn = conn if same_db else sqlite3.connect(Path(output_db).expanduser())
+    try:
+        if create_indexes:
+            ensure_contract_history_indexes(conn)
+        if categories is None:
+            categories = build_category_vocabulary(conn, naics_filter=naics_filter)
+        categories = {key: list(values) for key, values in categories.items()}
+        ensure_results_table(out_conn, table)
+
+        rows = contracts = chunks = 0
+        start = time.perf_counter()
+
+        def record(scored: pd.DataFrame) -> None:
+            nonlocal rows, contracts, chunks
+            rows += write_predictions(out_conn, scored, table)
+            contracts += scored["contract_award_unique_key"].nunique()
+            chunks += 1
+            elapsed = time.perf_counter() - start
+            LOGGER.info(
+                "chunk %d: %d rows total, %.0f rows/s", chunks, rows, rows / max(elapsed, 1e-9)
+            )
+
+        chunk_iter = iter_contract_chunks(conn, chunk_size=chunk_size, naics_filter=naics_filter)
+        if workers == 1:
+            models = load_cascade_models(models_dir, categories, compiled=compiled)
+            for raw in chunk_iter:
+                record(score_chunk(raw, models))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(str(models_dir), categories, compiled),
+            ) as pool:
+                # Bound the chunks in flight so memory stays flat on large databases.
+                pending: deque[Future] = deque()
+                for raw in chunk_iter:
+                    pending.append(pool.submit(_score_in_worker, raw))
+                    if len(pending) >= 2 * workers:
+                        record(pending.popleft().result())
+                while pending:
+                    record(pending.popleft().result())
+
+        elapsed = time.perf_counter() - start
+    finally:
+        if out_conn is not conn:
+            out_conn.close()
+        conn.close()
+
+    return ScoringSummary(rows=rows, contracts=contracts, chunks=chunks, elapsed_seconds=elapsed)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score contract modifications with the cascade models.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score = subparsers.add_parser("score", help="Score a prime transactions database.")
+    score.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Prime transactions SQLite database.")
+    score.add_argument("--output-db", type=Path, default=None, help="Database for the results table (default: --db).")
+    score.add_argument("--table", default=DEFAULT_RESULTS_TABLE, help="Results table name.")
+    score.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR, help="Directory with the model pickles.")
+    score.add_argument("--categories", type=Path, default=None, help="JSON vocabulary of the categorical features.")
+    score.add_argument("--save-categories", type=Path, default=None, help="Write the vocabulary used to this JSON file.")
+    score.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Approximate rows per chunk.")
+    score.add_argument("--workers", type=int, default=1, help="Scoring processes (-1 for all CPUs).")
+    score.add_argument("--all-naics", action="store_true", help="Score every NAICS code, not only the security set.")
+    score.add_argument("--verbose", action="store_true", help="Log progress for every chunk.")
+    score.add_argument("--compiled", action="store_true", help="Use the NumPy model exports (see export-compiled).")
+    score.add_argument("--create-indexes", action="store_true", help="Index the source database by contract before scoring.")
+
+    export = subparsers.add_parser("export-compiled", help="Export the cascade pickles to NumPy .npz files.")
+    export.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR, help="Directory with the model pickles.")
+    export.add_argument("--output-dir", type=Path, default=None, help="Destination directory (default: --models-dir).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.command == "export-compiled":
+        for path in export_compiled_cascade(args.models_dir, args.output_dir):
+            print(f"Wrote {path}")
+        return
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    naics_filter = None if args.all_naics else DEFAULT_SECURITY_NAICS
+    if args.categories is not None:
+        categories = load_category_vocabulary(args.categories)
+    else:
+        with closing(get_connection(args.db)) as conn:
+            categories = build_category_vocabulary(conn, naics_filter=naics_filter)
+    if args.save_categories is not None:
+        args.save_categories.write_text(json.dumps(categories, indent=2), encoding="utf-8")
+
+    summary = score_database(
+        db_path=args.db,
+        output_db=args.output_db,
+        table=args.table,
+        models_dir=args.models_dir,
+        categories=categories,
+        naics_filter=naics_filter,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        compiled=args.compiled,
+        create_indexes=args.create_indexes,
+    )
+    print(
+        f"Scored {summary.rows:,} modifications from {summary.contracts:,} contracts "
+        f"in {summary.elapsed_seconds:.1f}s ({summary.rows_per_second:,.0f} rows/s)."
+    )
+
+
+__all__ = [
+    "CascadeModels",
+    "ScoringSummary",
+    "build_category_vocabulary",
+    "export_compiled_cascade",
+    "iter_contract_chunks",
+    "load_cascade_models",
+    "load_category_vocabulary",
+    "score_chunk",
+    "score_database",
+    "write_predictions",
+]
+
+
+if __name__ == "__main__":
+    main()
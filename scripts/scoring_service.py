@@ -0,0 +1,436 @@
+"""Local HTTP service for on-demand modification risk and cost predictions.
+
+The cascade models are loaded once and kept in memory. Concurrent requests
+are coalesced by a :class:`MicroBatcher`: the first pending request opens a
+batch, which is scored when it holds ``max_batch_size`` requests or
+``max_wait_ms`` has passed. A batch costs one indexed SQLite lookup and one
+``predict_proba``/``predict`` call, however many requests it holds.
+
+Endpoints::
+
+    POST /predict   {"contract_award_unique_key": "..."}
+                    or {"transactions": [{<raw prime transaction fields>}, ...]}
+    GET  /metrics   request/batch counts and latency percentiles (ms)
+    GET  /health    liveness check
+
+Usage::
+
+    python -m scripts.scoring_service --db db/prime_transactions_filtered.sqlite --port 8765
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .modification_cascade_utils import CASCADE_RAW_COLUMNS
+from .score_modifications import (
+    DEFAULT_MODELS_DIR,
+    build_category_vocabulary,
+    load_cascade_models,
+    load_category_vocabulary,
+    score_chunk,
+)
+from .usaspending_utils import (
+    DEFAULT_DB_PATH,
+    DEFAULT_SECURITY_NAICS,
+    ensure_contract_history_indexes,
+    get_prime_transactions_table_name,
+    missing_contract_history_indexes,
+)
+
+LOGGER = logging.getLogger("scoring_service")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of latencies with percentile snapshots."""
+
+    def __init__(self, window: int = 10_000) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, milliseconds: float) -> None:
+        with self._lock:
+            self._samples.append(milliseconds)
+            self.count += 1
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=float)
+            count = self.count
+        if samples.size == 0:
+            return {"count": count}
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {
+            "count": count,
+            "mean": float(samples.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(samples.max()),
+        }
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls into batches handled by one background thread.
+
+    Parameters
+    ----------
+    handler:
+        Called with a list of submitted items; returns one result per item.
+    max_batch_size:
+        Largest batch handed to ``handler``.
+    max_wait_ms:
+        How long the first item of a batch waits for company.
+
+    If ``handler`` raises on a batch, its items are retried one at a time so a
+    bad item only fails its own future.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[object]], Sequence[object]],
+        *,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive.")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = LatencyTracker()
+        self.batch_latency = LatencyTracker()
+        self._queue: queue.Queue[Optional[tuple[object, Future]]] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: object) -> Future:
+        """Queue ``item`` and return a future for its result."""
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self) -> None:
+        """Stop the worker thread once the queued items are processed."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self) -> tuple[list[tuple[object, Future]], bool]:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                else:
+                    self._run_singly(batch)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            finally:
+                self.batch_sizes.record(len(batch))
+                self.batch_latency.record((time.perf_counter() - start) * 1000)
+
+    def _run_singly(self, batch: list[tuple[object, Future]]) -> None:
+        for item, future in batch:
+            try:
+                future.set_result(self.handler([item])[0])
+            except Exception as exc:  # only this item fails; the service keeps running
+                future.set_exception(exc)
+
+
+class ModificationScoringService:
+    """Warm cascade models plus the lookups needed to score single contracts."""
+
+    def __init__(
+        self,
+        *,
+        db_path: Optional[Path | str] = DEFAULT_DB_PATH,
+        models_dir: Path | str = DEFAULT_MODELS_DIR,
+        categories: Optional[Mapping[str, Sequence[str]]] = None,
+        naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        create_indexes: bool = False,
+    ) -> None:
+        self.conn: Optional[sqlite3.Connection] = None
+        self.table_name: Optional[str] = None
+        if db_path is not None:
+            path = Path(db_path).expanduser().resolve()
+            if not path.exists():
+                raise FileNotFoundError(f"SQLite database not found at {path}")
+            # Only the batcher thread queries this connection.
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            if create_indexes:
+                ensure_contract_history_indexes(self.conn)
+            elif "contract_award_unique_key" in missing_contract_history_indexes(self.conn):
+                LOGGER.warning(
+                    "%s has no index on contract_award_unique_key; every lookup scans the "
+                    "table. Start with --create-indexes to add it.",
+                    path,
+                )
+            self.table_name = get_prime_transactions_table_name(self.conn)
+            if categories is None:
+                # Same vocabulary as batch scoring, so both encode labels alike.
+                categories = build_category_vocabulary(self.conn, naics_filter=naics_filter)
+        if categories is None:
+            raise ValueError("categories are required when no database is configured.")
+
+        self.models = load_cascade_models(models_dir, categories)
+        self.request_latency = LatencyTracker()
+        self.batcher = MicroBatcher(
+            self.score_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+        )
+
+    def _lookup(self, keys: Sequence[str]) -> pd.DataFrame:
+        if self.conn is None:
+            raise ValueError("No database configured; post transactions instead.")
+        placeholders = ",".join("?" for _ in keys)
+        query = (
+            f"SELECT {', '.join(CASCADE_RAW_COLUMNS)} FROM {self.table_name} "
+            f"WHERE contract_award_unique_key IN ({placeholders})"
+        )
+        return pd.read_sql_query(query, self.conn, params=list(keys))
+
+    def score_batch(self, payloads: list[Mapping[str, object]]) -> list[dict[str, object]]:
+        """Score a batch of request payloads with one lookup and one model call."""
+        keys = sorted(
+            {str(p["contract_award_unique_key"]) for p in payloads if "transactions" not in p}
+        )
+        stored = self._lookup(keys) if keys else pd.DataFrame(columns=CASCADE_RAW_COLUMNS)
+        stored_groups = dict(tuple(stored.groupby("contract_award_unique_key", sort=False)))
+
+        frames: list[pd.DataFrame] = []
+        for idx, payload in enumerate(payloads):
+            if "transactions" in payload:
+                frame = pd.DataFrame(list(payload["transactions"])).reindex(
+                    columns=CASCADE_RAW_COLUMNS
+                )
+                frame["contract_award_unique_key"] = frame["contract_award_unique_key"].fillna(
+                    "request"
+                )
+            else:
+                frame = stored_groups.get(str(payload["contract_award_unique_key"]))
+                if frame is None:
+                    continue
+                frame = frame.copy()
+            # Namespace keys per request so two requests never share a history.
+            frame["contract_award_unique_key"] = (
+                f"{idx}|" + frame["contract_award_unique_key"].astype(str)
+            )
+            frames.append(frame)
+
+        by_request: dict[int, pd.DataFrame] = {}
+        scored = score_chunk(pd.concat(frames, ignore_index=True), self.models) if frames else None
+        if scored is not None and not scored.empty:
+            split = scored["contract_award_unique_key"].str.split("|", n=1, expand=True)
+            scored["contract_award_unique_key"] = split[1]
+            by_request = dict(tuple(scored.groupby(split[0].astype(int), sort=False)))
+
+        results: list[dict[str, object]] = []
+        for idx in range(len(payloads)):
+            rows = by_request.get(idx)
+            if rows is None or rows.empty:
+                results.append({"error": "contract not found", "status": HTTPStatus.NOT_FOUND})
+                continue
+            latest = rows.loc[rows["mod_sequence"].idxmax()]
+            results.append(
+                {
+                    "contract_award_unique_key": latest["contract_award_unique_key"],
+                    "contract_transaction_unique_key": latest["contract_transaction_unique_key"],
+                    "modifications": int(len(rows)),
+                    "predicted_risk": float(latest["predicted_risk"]),
+                    "predicted_cost_change": float(latest["predicted_cost_change"]),
+                }
+            )
+        return results
+
+    def predict(self, payload: Mapping[str, object], timeout: float = 30.0) -> dict[str, object]:
+        """Score one request through the micro-batcher."""
+        if "transactions" not in payload and "contract_award_unique_key" not in payload:
+            raise KeyError("Provide 'contract_award_unique_key' or 'transactions'.")
+        start = time.perf_counter()
+        result = self.batcher.submit(payload).result(timeout=timeout)
+        self.request_latency.record((time.perf_counter() - start) * 1000)
+        return result
+
+    def metrics(self) -> dict[str, object]:
+        return {
+            "request_latency_ms": self.request_latency.snapshot(),
+            "batch_latency_ms": self.batcher.batch_latency.snapshot(),
+            "batch_size": self.batcher.batch_sizes.snapshot(),
+        }
+
+    def close(self) -> None:
+        self.batcher.close()
+        if self.conn is not None:
+            self.conn.close()
+
+
+def _json_safe(value: object) -> object:
+    """Replace NaN and infinities, which JSON cannot represent, with ``None``."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Mapping):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+class _ScoringRequestHandler(BaseHTTPRequestHandler):
+    server: "_ScoringHTTPServer"
+
+    def _send_json(self, status: int, body: object) -> None:
+        data = json.dumps(_json_safe(body), allow_nan=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(HTTPStatus.OK, self.server.service.metrics())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        if self.path != "/predict":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            result = self.server.service.predict(payload)
+        except (KeyError, ValueError) as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+        except Exception as exc:
+            LOGGER.exception("Scoring failed")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
+            return
+        status = result.pop("status", HTTPStatus.OK)
+        self._send_json(status, result)
+
+    def log_message(self, format: str, *args: object) -> None:
+        LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+
+class _ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections under concurrent load.
+    request_queue_size = 256
+
+    def __init__(self, address: tuple[str, int], service: ModificationScoringService) -> None:
+        super().__init__(address, _ScoringRequestHandler)
+        self.service = service
+
+
+def make_server(
+    service: ModificationScoringService,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+) -> ThreadingHTTPServer:
+    """Bind an HTTP server for ``service``; call ``serve_forever()`` on the result."""
+    return _ScoringHTTPServer((host, port), service)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve modification risk predictions over HTTP.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Prime transactions SQLite database.")
+    parser.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR, help="Directory with the model pickles.")
+    parser.add_argument("--categories", type=Path, default=None, help="JSON vocabulary of the categorical features.")
+    parser.add_argument("--all-naics", action="store_true", help="Build the vocabulary from every NAICS code, not only the security set.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to bind.")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Largest micro-batch.")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Batch collection window in milliseconds.")
+    parser.add_argument("--create-indexes", action="store_true", help="Index the source database by contract before serving.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    categories = load_category_vocabulary(args.categories) if args.categories else None
+    service = ModificationScoringService(
+        db_path=args.db,
+        models_dir=args.models_dir,
+        categories=categories,
+        naics_filter=None if args.all_naics else DEFAULT_SECURITY_NAICS,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        create_indexes=args.create_indexes,
+    )
+    server = make_server(service, args.host, args.port)
+    LOGGER.info("Serving on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+__all__ = [
+    "LatencyTracker",
+    "MicroBatcher",
+    "ModificationScoringService",
+    "make_server",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,592 @@
+"""Out-of-core baselines trained chunk by chunk with ``partial_fit``.
+
+The in-memory trainers in :mod:`scripts.modeling_utils` and
+:mod:`scripts.contract_modification_risk` load the full training frame. The
+functions here stream the prime transactions database instead, so the value
+and modification-risk baselines can be fitted on the unfiltered multi-NAICS
+extract:
+
+1. one pass collects the preprocessing statistics: Welford mean/variance and
+   a reservoir-sampled median per numeric column, and bounded frequency
+   dictionaries per categorical column;
+2. one pass per epoch feeds standardized, sparse one-hot chunks to an
+   ``SGDRegressor``/``SGDClassifier`` via ``partial_fit``;
+3. a final pass scores the holdout.
+
+Rows go to the holdout by a hash of their contract key, so the split is
+stable across passes and runs, and a contract never appears on both sides.
+
+Both streams run their database query once: the first pass spools the
+prepared chunks to a temporary directory and the later passes replay them
+from disk.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.metrics import (
+    accuracy_score,
+    average_precision_score,
+    f1_score,
+    mean_absolute_error,
+    mean_squared_error,
+    precision_score,
+    r2_score,
+    recall_score,
+    roc_auc_score,
+)
+
+from .contract_modification_risk import (
+    BOOLEAN_FEATURES,
+    NUMERIC_FEATURES,
+    TARGET_COLUMN,
+    iter_base_award_chunks,
+)
+from .modeling_utils import add_log_features
+from .usaspending_utils import DEFAULT_DB_PATH, iter_cost_dataset
+
+STREAMING_VALUE_NUMERIC: tuple[str, ...] = ("log_offers", "log_duration")
+
+STREAMING_VALUE_CATEGORICAL: tuple[str, ...] = (
+    "solicitation_procedures",
+    "type_of_contract_pricing",
+    "extent_competed",
+    "awarding_agency_name",
+    "naics_code",
+    "product_or_service_code",
+)
+
+# Low-cardinality subset of CATEGORICAL_FEATURES; free text and vendor
+# identities would only fill the category dictionaries.
+STREAMING_RISK_CATEGORICAL: tuple[str, ...] = (
+    "awarding_agency_name",
+    "awarding_sub_agency_name",
+    "funding_agency_name",
+    "award_type",
+    "idv_type",
+    "parent_award_type",
+    "type_of_contract_pricing",
+    "type_of_set_aside",
+    "action_type",
+    "extent_competed",
+    "solicitation_procedures",
+    "fair_opportunity_limited_sources",
+    "other_than_full_and_open_competition",
+    "commercial_item_acquisition_procedures",
+    "product_or_service_code",
+    "performance_based_service_acquisition",
+    "contract_bundling",
+    "place_of_manufacture",
+    "multi_year_contract",
+    "contract_financing",
+    "contracting_officers_determination_of_business_size",
+)
+
+_HOLDOUT_BUCKETS = 10_000
+
+
+def hash_holdout_mask(keys: pd.Series, test_fraction: float, *, seed: int = 42) -> np.ndarray:
+    """Return a boolean mask selecting a stable ``test_fraction`` of ``keys`` for the holdout."""
+    if not 0.0 < test_fraction < 1.0:
+        raise ValueError("test_fraction must be between 0 and 1.")
+    hashes = pd.util.hash_pandas_object(
+        keys.astype("string").fillna(""), index=False, hash_key=f"{seed:016d}"[-16:]
+    ).to_numpy()
+    return (hashes % _HOLDOUT_BUCKETS) < int(round(test_fraction * _HOLDOUT_BUCKETS))
+
+
+class ReservoirSample:
+    """Uniform fixed-size sample of a stream (Algorithm R), for approximate quantiles."""
+
+    def __init__(self, size: int = 10_000, *, seed: int = 42) -> None:
+        self.size = size
+        self.seen = 0
+        self.values = np.empty(size, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        fill = max(0, min(self.size - self.seen, values.size))
+        if fill:
+            self.values[self.seen : self.seen + fill] = values[:fill]
+        rest = values[fill:]
+        if rest.size:
+            positions = self.seen + fill + np.arange(rest.size)
+            slots = self._rng.integers(0, positions + 1)
+            keep = slots < self.size
+            self.values[slots[keep]] = rest[keep]
+        self.seen += values.size
+
+    def quantile(self, q: float) -> float:
+        filled = min(self.seen, self.size)
+        return float(np.quantile(self.values[:filled], q)) if filled else float("nan")
+
+
+class RunningMoments:
+    """Count, mean and variance merged chunk by chunk (Welford/Chan update)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        n = values.size
+        if n == 0:
+            return
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta**2 * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / self.count)) if self.count > 1 else 0.0
+
+
+class CategoryCounter:
+    """Label frequencies, pruned to the most frequent ``max_tracked`` labels when it grows."""
+
+    def __init__(self, max_tracked: int = 10_000) -> None:
+        self.max_tracked = max_tracked
+        self.counts: dict[str, int] = {}
+
+    def update(self, values: pd.Series) -> None:
+        for label, count in values.dropna().astype(str).value_counts().items():
+            self.counts[label] = self.counts.get(label, 0) + int(count)
+        if len(self.counts) > 2 * self.max_tracked:
+            kept = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+            self.counts = dict(kept[: self.max_tracked])
+
+    def top(self, n: int, min_count: int = 1) -> list[str]:
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [label for label, count in ranked[:n] if count >= min_count]
+
+
+def signed_log1p(values: np.ndarray) -> np.ndarray:
+    """``sign(x) * log1p(|x|)``; tames dollar amounts before standardization."""
+    return np.sign(values) * np.log1p(np.abs(values))
+
+
+@dataclass
+class StreamingPreprocessor:
+    """One-pass imputation, scaling and one-hot statistics for chunked data.
+
+    Call :meth:`partial_fit` on every training chunk, then :meth:`finalize`;
+    :meth:`transform` returns a CSR matrix with the standardized numeric
+    columns (missing values imputed with the streaming median) followed by
+    one indicator column per retained category. Unseen or rare labels map to
+    all zeros, like ``OneHotEncoder(handle_unknown="ignore")``.
+    """
+
+    numeric_features: Sequence[str]
+    categorical_features: Sequence[str]
+    max_categories: int = 50
+    min_category_count: int = 5
+    log_transform: Sequence[str] = ()
+    reservoir_size: int = 10_000
+    seed: int = 42
+    medians: dict[str, float] = field(default_factory=dict, init=False)
+    means: dict[str, float] = field(default_factory=dict, init=False)
+    scales: dict[str, float] = field(default_factory=dict, init=False)
+    categories: dict[str, list[str]] = field(default_factory=dict, init=False)
+
+    def __post_init__(self) -> None:
+        self._reservoirs = {
+            col: ReservoirSample(self.reservoir_size, seed=self.seed + idx)
+            for idx, col in enumerate(self.numeric_features)
+        }
+        self._moments = {col: RunningMoments() for col in self.numeric_features}
+        self._counters = {
+            col: CategoryCounter(max_tracked=max(10_000, 20 * self.max_categories))
+            for col in self.categorical_features
+        }
+        self.n_rows = 0
+
+    def _numeric(self, chunk: pd.DataFrame, col: str) -> np.ndarray:
+        values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        values = np.where(np.isfinite(values), values, np.nan)
+        return signed_log1p(values) if col in self.log_transform else values
+
+    def partial_fit(self, chunk: pd.DataFrame) -> "StreamingPreprocessor":
+        for col in self.numeric_features:
+            values = self._numeric(chunk, col)
+            self._reservoirs[col].update(values)
+            self._moments[col].update(values)
+        for col in self.categorical_features:
+            self._counters[col].update(chunk[col])
+        self.n_rows += len(chunk)
+        return self
+
+    def finalize(self) -> "StreamingPreprocessor":
+        for col in self.numeric_features:
+            median = self._reservoirs[col].quantile(0.5)
+            self.medians[col] = 0.0 if np.isnan(median) else median
+            self.means[col] = self._moments[col].mean
+            std = self._moments[col].std
+            self.scales[col] = std if std > 0 else 1.0
+        for col in self.categorical_features:
+            self.categories[col] = self._counters[col].top(
+                self.max_categories, self.min_category_count
+            )
+        return self
+
+    @property
+    def feature_names(self) -> list[str]:
+        names = list(self.numeric_features)
+        for col in self.categorical_features:
+            names.extend(f"{col}_{label}" for label in self.categories.get(col, []))
+        return names
+
+    def transform(self, chunk: pd.DataFrame) -> sparse.csr_matrix:
+        if not self.categories and self.categorical_features:
+            raise ValueError("Call finalize() before transform().")
+        n_rows = len(chunk)
+        numeric = np.empty((n_rows, len(self.numeric_features)), dtype=np.float64)
+        for idx, col in enumerate(self.numeric_features):
+            values = self._numeric(chunk, col)
+            values = np.where(np.isnan(values), self.medians[col], values)
+            numeric[:, idx] = (values - self.means[col]) / self.scales[col]
+
+        rows: list[np.ndarray] = []
+        cols: list[np.ndarray] = []
+        offset = 0
+        for col in self.categorical_features:
+            vocabulary = pd.Index(self.categories[col])
+            codes = vocabulary.get_indexer(chunk[col].astype("string").fillna("").to_numpy())
+            hit = codes >= 0
+            rows.append(np.flatnonzero(hit))
+            cols.append(codes[hit] + offset)
+            offset += len(vocabulary)
+        row_idx = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        col_idx = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+        one_hot = sparse.csr_matrix(
+            (np.ones(row_idx.size), (row_idx, col_idx)), shape=(n_rows, offset)
+        )
+        return sparse.hstack([sparse.csr_matrix(numeric), one_hot], format="csr")
+
+
+@dataclass
+class StreamingModelArtifacts:
+    """Model, preprocessing statistics and holdout metrics of a streaming fit."""
+
+    model: SGDRegressor | SGDClassifier
+    preprocessor: StreamingPreprocessor
+    metrics: dict[str, float]
+    n_train: int
+    n_test: int
+    passes: int
+    elapsed_seconds: float
+
+    def predict(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Predict for raw rows prepared like the training chunks."""
+        return self.model.predict(self.preprocessor.transform(chunk))
+
+
+def _split(
+    chunk: pd.DataFrame, key_col: str, test_fraction: float, seed: int
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    holdout = hash_holdout_mask(chunk[key_col], test_fraction, seed=seed)
+    return chunk.loc[~holdout], chunk.loc[holdout]
+
+
+def _run_streaming_fit(
+    chunks: Callable[[], Iterator[pd.DataFrame]],
+    *,
+    preprocessor: StreamingPreprocessor,
+    model: SGDRegressor | SGDClassifier,
+    target: Callable[[pd.DataFrame], np.ndarray],
+    key_col: str,
+    test_fraction: float,
+    n_epochs: int,
+    seed: int,
+    class_weights: Optional[Callable[[Mapping[int, int]], dict[int, float]]] = None,
+) -> tuple[np.ndarray, np.ndarray, int, int, float]:
+    """Statistics pass, ``n_epochs`` training passes and a holdout pass over ``chunks()``."""
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    class_counts: dict[int, int] = {}
+    n_train = 0
+    for chunk in chunks():
+        train, _ = _split(chunk, key_col, test_fraction, seed)
+        if train.empty:
+            continue
+        preprocessor.partial_fit(train)
+        n_train += len(train)
+        if class_weights is not None:
+            labels, counts = np.unique(target(train), return_counts=True)
+            for label, count in zip(labels.tolist(), counts.tolist()):
+                class_counts[int(label)] = class_counts.get(int(label), 0) + count
+    if n_train == 0:
+        raise ValueError("No training rows found in the stream.")
+    preprocessor.finalize()
+    weights = class_weights(class_counts) if class_weights is not None else None
+
+    for _ in range(n_epochs):
+        for chunk in chunks():
+            train, _ = _split(chunk, key_col, test_fraction, seed)
+            if train.empty:
+                continue
+            order = rng.permutation(len(train))
+            X = preprocessor.transform(train)[order]
+            y = target(train)[order]
+            fit_kwargs: dict[str, object] = {}
+            if weights is not None:
+                fit_kwargs["sample_weight"] = np.array([weights[int(label)] for label in y])
+                fit_kwargs["classes"] = np.array(sorted(weights))
+            model.partial_fit(X, y, **fit_kwargs)
+
+    truths: list[np.ndarray] = []
+    scores: list[np.ndarray] = []
+    for chunk in chunks():
+        _, test = _split(chunk, key_col, test_fraction, seed)
+        if test.empty:
+            continue
+        X = preprocessor.transform(test)
+        truths.append(target(test))
+        if isinstance(model, SGDClassifier):
+            scores.append(model.predict_proba(X)[:, 1])
+        else:
+            scores.append(model.predict(X))
+    elapsed = time.perf_counter() - start
+    y_true = np.concatenate(truths) if truths else np.empty(0)
+    y_score = np.concatenate(scores) if scores else np.empty(0)
+    return y_true, y_score, n_train, y_true.size, elapsed
+
+
+@contextmanager
+def _spooled_chunks(
+    source: Callable[[], Iterator[pd.DataFrame]],
+    temp_folder: Optional[str] = None,
+) -> Iterator[Callable[[], Iterator[pd.DataFrame]]]:
+    """Wrap ``source`` so only its first complete pass hits the database.
+
+    The first pass pickles every chunk into a temporary directory; later
+    passes read them back in order. The directory is removed on exit.
+    """
+    with tempfile.TemporaryDirectory(prefix="streaming_spool_", dir=temp_folder) as folder:
+        paths: list[Path] = []
+        complete = False
+
+        def chunks() -> Iterator[pd.DataFrame]:
+            nonlocal complete
+            if complete:
+                for path in paths:
+                    yield pd.read_pickle(path)
+                return
+            paths.clear()
+            for position, chunk in enumerate(source()):
+                path = Path(folder) / f"chunk_{position:06d}.pkl"
+                chunk.to_pickle(path)
+                paths.append(path)
+                yield chunk
+            complete = True
+
+        yield chunks
+
+
+def _value_chunks(chunk: pd.DataFrame, target_col: str) -> pd.DataFrame:
+    chunk = chunk.replace({np.inf: np.nan, -np.inf: np.nan})
+    chunk = chunk.loc[chunk[target_col].notna() & (chunk[target_col] > 0)].copy()
+    chunk["log_target"] = np.log10(chunk[target_col])
+    return add_log_features(chunk)
+
+
+def train_streaming_value_model(
+    *,
+    db_path: str = str(DEFAULT_DB_PATH),
+    naics_filter: Optional[Iterable[str]] = None,
+    chunksize: int = 100_000,
+    target_col: str = "annualized_base_all",
+    numeric_features: Sequence[str] = STREAMING_VALUE_NUMERIC,
+    categorical_features: Sequence[str] = STREAMING_VALUE_CATEGORICAL,
+    max_categories: int = 50,
+    test_fraction: float = 0.2,
+    n_epochs: int = 3,
+    random_state: int = 42,
+    model_params: Optional[dict[str, object]] = None,
+    temp_folder: Optional[str] = None,
+) -> StreamingModelArtifacts:
+    """Fit an ``SGDRegressor`` on the log10 annualized value, streaming the database.
+
+    The target and the ``log_offers``/``log_duration`` features are derived as
+    in ``train_log_linear_model_with_split``; the holdout is grouped by
+    ``contract_award_unique_key``. ``naics_filter=None`` (default) streams
+    every NAICS code. The cost query runs once and the prepared chunks are
+    replayed from a spool under ``temp_folder``, as in
+    :func:`train_streaming_modification_risk`. Metrics (rmse, mae, r2) are on
+    the log10 scale.
+    """
+    # Duplicates of the base cost columns are dropped by the query builder.
+    extra_fields = ["contract_award_unique_key", *categorical_features]
+
+    def cost_chunks() -> Iterator[pd.DataFrame]:
+        for chunk in iter_cost_dataset(
+            chunksize=chunksize,
+            db_path=db_path,
+            naics_filter=naics_filter,
+            additional_fields=extra_fields,
+        ):
+            prepared = _value_chunks(chunk, target_col)
+            if not prepared.empty:
+                yield prepared
+
+    preprocessor = StreamingPreprocessor(
+        numeric_features,
+        categorical_features,
+        max_categories=max_categories,
+        seed=random_state,
+    )
+    params = {"penalty": "l2", "alpha": 1e-5, "random_state": random_state, **(model_params or {})}
+    model = SGDRegressor(**params)
+
+    with _spooled_chunks(cost_chunks, temp_folder) as chunks:
+        y_true, y_pred, n_train, n_test, elapsed = _run_streaming_fit(
+            chunks,
+            preprocessor=preprocessor,
+            model=model,
+            target=lambda frame: frame["log_target"].to_numpy(dtype=float),
+            key_col="contract_award_unique_key",
+            test_fraction=test_fraction,
+            n_epochs=n_epochs,
+            seed=random_state,
+        )
+    metrics: dict[str, float] = {}
+    if n_test:
+        metrics = {
+            "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+            "mae": float(mean_absolute_error(y_true, y_pred)),
+            "r2": float(r2_score(y_true, y_pred)),
+        }
+    return StreamingModelArtifacts(
+        model=model,
+        preprocessor=preprocessor,
+        metrics=metrics,
+        n_train=n_train,
+        n_test=n_test,
+        passes=n_epochs + 2,
+        elapsed_seconds=elapsed,
+    )
+
+
+def _balanced_weights(counts: Mapping[int, int]) -> dict[int, float]:
+    # Same formula as class_weight="balanced", which partial_fit does not accept.
+    total = sum(counts.values())
+    weights = {label: total / (len(counts) * count) for label, count in counts.items()}
+    for label in (0, 1):
+        weights.setdefault(label, 1.0)
+    return weights
+
+
+def train_streaming_modification_risk(
+    *,
+    db_path: str | None = None,
+    naics_filter: Optional[Iterable[str]] = None,
+    chunksize: int = 100_000,
+    numeric_features: Sequence[str] = NUMERIC_FEATURES,
+    categorical_features: Sequence[str] = STREAMING_RISK_CATEGORICAL,
+    boolean_features: Sequence[str] = BOOLEAN_FEATURES,
+    max_categories: int = 50,
+    test_fraction: float = 0.2,
+    n_epochs: int = 3,
+    balance_classes: bool = True,
+    random_state: int = 42,
+    model_params: Optional[dict[str, object]] = None,
+    temp_folder: Optional[str] = None,
+) -> StreamingModelArtifacts:
+    """Fit a logistic ``SGDClassifier`` on the ``has_modification`` target, streaming the database.
+
+    Base awards and the target come from
+    :func:`scripts.contract_modification_risk.iter_base_award_chunks`, the
+    chunked form of ``build_contract_modification_dataset_sql``. The query
+    runs once; the remaining passes replay its chunks from a spool under
+    ``temp_folder`` (default: the system temporary directory). Dollar
+    amounts and durations are ``signed_log1p`` transformed before scaling.
+    ``balance_classes`` reweights samples like ``class_weight="balanced"``.
+    Returns holdout accuracy, precision, recall, f1, roc_auc and
+    average_precision at a 0.5 threshold.
+    """
+
+    def base_award_chunks() -> Iterator[pd.DataFrame]:
+        yield from iter_base_award_chunks(
+            chunksize=chunksize, db_path=db_path, naics_filter=naics_filter
+        )
+
+    preprocessor = StreamingPreprocessor(
+        list(numeric_features) + list(boolean_features),
+        categorical_features,
+        max_categories=max_categories,
+        log_transform=tuple(numeric_features),
+        seed=random_state,
+    )
+    params = {
+        "loss": "log_loss",
+        "penalty": "l2",
+        "alpha": 1e-4,
+        "random_state": random_state,
+        **(model_params or {}),
+    }
+    model = SGDClassifier(**params)
+
+    with _spooled_chunks(base_award_chunks, temp_folder) as chunks:
+        y_true, y_score, n_train, n_test, elapsed = _run_streaming_fit(
+            chunks,
+            preprocessor=preprocessor,
+            model=model,
+            target=lambda frame: frame[TARGET_COLUMN].astype(int).to_numpy(),
+            key_col="contract_award_unique_key",
+            test_fraction=test_fraction,
+            n_epochs=n_epochs,
+            seed=random_state,
+            class_weights=_balanced_weights if balance_classes else lambda counts: {0: 1.0, 1: 1.0},
+        )
+    metrics: dict[str, float] = {}
+    if n_test:
+        y_pred = (y_score >= 0.5).astype(int)
+        metrics = {
+            "accuracy": float(accuracy_score(y_true, y_pred)),
+            "precision": float(precision_score(y_true, y_pred, zero_division=0)),
+            "recall": float(recall_score(y_true, y_pred, zero_division=0)),
+            "f1": float(f1_score(y_true, y_pred, zero_division=0)),
+        }
+        if np.unique(y_true).size == 2:
+            metrics["roc_auc"] = float(roc_auc_score(y_true, y_score))
+            metrics["average_precision"] = float(average_precision_score(y_true, y_score))
+    return StreamingModelArtifacts(
+        model=model,
+        preprocessor=preprocessor,
+        metrics=metrics,
+        n_train=n_train,
+        n_test=n_test,
+        passes=n_epochs + 2,
+        elapsed_seconds=elapsed,
+    )
+
+
+__all__ = [
+    "CategoryCounter",
+    "ReservoirSample",
+    "RunningMoments",
+    "StreamingModelArtifacts",
+    "StreamingPreprocessor",
+    "hash_holdout_mask",
+    "train_streaming_modification_risk",
+    "train_streaming_value_model",
+]
@@ -7,8 +7,12 @@ provide reusable aggregations centred on solicitation procedure labels.
 from __future__ import annotations
 
 import sqlite3
+import warnings
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, Optional, Sequence
+from typing import Iterable, Iterator, Optional, Sequence
 
 import pandas as pd
 
@@ -79,6 +83,53 @@ def list_prime_transaction_columns(
         return tuple(row[1] for row in cursor.fetchall())
 
 
+def build_prime_transactions_query(
+    conn: sqlite3.Connection,
+    columns: Sequence[str] | None = None,
+    *,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+    additional_where: Optional[str] = None,
+) -> tuple[str, list[str]]:
+    """Return the SQL and parameters selecting ``columns`` from the prime transactions table."""
+    table_name = get_prime_transactions_table_name(conn)
+    if columns is None:
+        cursor = conn.execute(f"PRAGMA table_info({table_name})")
+        requested_columns = tuple(row[1] for row in cursor.fetchall())
+    else:
+        requested_columns = tuple(dict.fromkeys(columns))
+
+    if not requested_columns:
+        raise ValueError("At least one column must be requested.")
+
+    # Quote column names that start with digits (SQLite requirement)
+    quoted_columns = []
+    for col in requested_columns:
+        if col[0].isdigit():
+            quoted_columns.append(f'"{col}"')
+        else:
+            quoted_columns.append(col)
+    
+    column_sql = ", ".join(quoted_columns)
+
+    where_clauses: list[str] = []
+    params: list[str] = []
+
+    if naics_filter:
+        naics_codes = [str(code) for code in naics_filter]
+        placeholders = ",".join("?" for _ in naics_codes)
+        where_clauses.append(f"naics_code IN ({placeholders})")
+        params.extend(naics_codes)
+
+    if additional_where:
+        where_clauses.append(f"({additional_where})")
+
+    where_sql = ""
+    if where_clauses:
+        where_sql = "WHERE " + " AND ".join(where_clauses)
+
+    return f"SELECT {column_sql} FROM {table_name} {where_sql}", params
+
+
 def fetch_prime_transactions(
     columns: Sequence[str] | None = None,
     *,
@@ -88,47 +139,237 @@ def fetch_prime_transactions(
 ) -> pd.DataFrame:
     """Load selected columns from the filtered prime transactions table."""
     with get_connection(db_path) as conn:
-        table_name = get_prime_transactions_table_name(conn)
-        if columns is None:
-            requested_columns = list_prime_transaction_columns(db_path=db_path)
-        else:
-            requested_columns = tuple(dict.fromkeys(columns))
-
-        if not requested_columns:
-            raise ValueError("At least one column must be requested.")
-
-        # Quote column names that start with digits (SQLite requirement)
-        quoted_columns = []
-        for col in requested_columns:
-            if col[0].isdigit():
-                quoted_columns.append(f'"{col}"')
-            else:
-                quoted_columns.append(col)
-        
-        column_sql = ", ".join(quoted_columns)
-
-        where_clauses: list[str] = []
-        params: list[str] = []
-
-        if naics_filter:
-            naics_codes = [str(code) for code in naics_filter]
-            placeholders = ",".join("?" for _ in naics_codes)
-            where_clauses.append(f"naics_code IN ({placeholders})")
-            params.extend(naics_codes)
-
-        if additional_where:
-            where_clauses.append(f"({additional_where})")
-
-        where_sql = ""
-        if where_clauses:
-            where_sql = "WHERE " + " AND ".join(where_clauses)
-
-        query = f"SELECT {column_sql} FROM {table_name} {where_sql}"
+        query, params = build_prime_transactions_query(
+            conn, columns, naics_filter=naics_filter, additional_where=additional_where
+        )
         df = pd.read_sql_query(query, conn, params=params)
 
     return df
 
 
+def iter_prime_transactions(
+    columns: Sequence[str] | None = None,
+    *,
+    chunksize: int = 100_000,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+    additional_where: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the rows of :func:`fetch_prime_transactions` in chunks of ``chunksize``.
+
+    Only one chunk is held in memory at a time, so the full multi-NAICS
+    database can be scanned with ``naics_filter=None``.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be positive.")
+    conn = get_connection(db_path)
+    try:
+        query, params = build_prime_transactions_query(
+            conn, columns, naics_filter=naics_filter, additional_where=additional_where
+        )
+        yield from pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+    finally:
+        conn.close()
+
+
+CONTRACT_HISTORY_INDEXES: dict[str, str] = {
+    "contract_award_unique_key": "idx_prime_transactions_award_key",
+    "award_id_piid": "idx_prime_transactions_piid",
+}
+
+CONTRACT_HISTORY_COLUMNS: tuple[str, ...] = (
+    "contract_transaction_unique_key",
+    "contract_award_unique_key",
+    "award_id_piid",
+    "modification_number",
+    "action_date",
+    "action_date_fiscal_year",
+    "action_type",
+    "federal_action_obligation",
+    "current_total_value_of_award",
+    "potential_total_value_of_award",
+    "base_and_all_options_value",
+    "period_of_performance_start_date",
+    "period_of_performance_current_end_date",
+    "awarding_agency_name",
+    "awarding_office_name",
+    "recipient_name",
+    "transaction_description",
+)
+
+
+@dataclass(frozen=True)
+class ContractAction:
+    """One transaction of a contract as returned by :func:`get_contract_history`."""
+
+    contract_transaction_unique_key: str
+    contract_award_unique_key: Optional[str]
+    award_id_piid: Optional[str]
+    modification_number: str
+    action_date: Optional[date]
+    action_date_fiscal_year: Optional[int]
+    action_type: Optional[str]
+    federal_action_obligation: Optional[float]
+    current_total_value_of_award: Optional[float]
+    potential_total_value_of_award: Optional[float]
+    base_and_all_options_value: Optional[float]
+    period_of_performance_start_date: Optional[date]
+    period_of_performance_current_end_date: Optional[date]
+    awarding_agency_name: Optional[str]
+    awarding_office_name: Optional[str]
+    recipient_name: Optional[str]
+    transaction_description: Optional[str]
+
+
+def _to_optional_float(value: object) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_optional_int(value: object) -> Optional[int]:
+    number = _to_optional_float(value)
+    return None if number is None else int(number)
+
+
+def _to_optional_date(value: object) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _to_contract_action(row: Sequence[object]) -> ContractAction:
+    values = dict(zip(CONTRACT_HISTORY_COLUMNS, row))
+    return ContractAction(
+        contract_transaction_unique_key=str(values["contract_transaction_unique_key"]),
+        contract_award_unique_key=values["contract_award_unique_key"],
+        award_id_piid=values["award_id_piid"],
+        modification_number=str(values["modification_number"] or "0"),
+        action_date=_to_optional_date(values["action_date"]),
+        action_date_fiscal_year=_to_optional_int(values["action_date_fiscal_year"]),
+        action_type=values["action_type"],
+        federal_action_obligation=_to_optional_float(values["federal_action_obligation"]),
+        current_total_value_of_award=_to_optional_float(values["current_total_value_of_award"]),
+        potential_total_value_of_award=_to_optional_float(values["potential_total_value_of_award"]),
+        base_and_all_options_value=_to_optional_float(values["base_and_all_options_value"]),
+        period_of_performance_start_date=_to_optional_date(
+            values["period_of_performance_start_date"]
+        ),
+        period_of_performance_current_end_date=_to_optional_date(
+            values["period_of_performance_current_end_date"]
+        ),
+        awarding_agency_name=values["awarding_agency_name"],
+        awarding_office_name=values["awarding_office_name"],
+        recipient_name=values["recipient_name"],
+        transaction_description=values["transaction_description"],
+    )
+
+
+def ensure_contract_history_indexes(conn: sqlite3.Connection) -> None:
+    """Create the lookup indexes used by :func:`get_contract_history` if missing.
+
+    This writes to the database and can take minutes on the full table, so it
+    is never called implicitly; run it once on a writable copy.
+    """
+    table_name = get_prime_transactions_table_name(conn)
+    for column, index_name in CONTRACT_HISTORY_INDEXES.items():
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ON {table_name} ({column})'
+        )
+    conn.commit()
+
+
+def missing_contract_history_indexes(conn: sqlite3.Connection) -> list[str]:
+    """Return the lookup columns of :data:`CONTRACT_HISTORY_INDEXES` that no index leads with."""
+    table_name = get_prime_transactions_table_name(conn)
+    indexed: set[str] = set()
+    for row in conn.execute(f"PRAGMA index_list({table_name})").fetchall():
+        columns = conn.execute(f'PRAGMA index_info("{row[1]}")').fetchall()
+        if columns:
+            indexed.add(columns[0][2])
+    return [column for column in CONTRACT_HISTORY_INDEXES if column not in indexed]
+
+
+_HISTORY_CONNECTIONS: dict[str, tuple[sqlite3.Connection, str]] = {}
+
+
+def _contract_history_connection(db_path: str) -> tuple[sqlite3.Connection, str]:
+    """Return the pooled connection and SQL used for history lookups on ``db_path``."""
+    cached = _HISTORY_CONNECTIONS.get(db_path)
+    if cached is not None:
+        return cached
+
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"SQLite database not found at {db_path}")
+    conn = sqlite3.connect(
+        f"{Path(db_path).as_uri()}?mode=ro", uri=True, check_same_thread=False
+    )
+    table_name = get_prime_transactions_table_name(conn)
+    missing = missing_contract_history_indexes(conn)
+    if missing:
+        # Checked once per database, since the connection is pooled.
+        warnings.warn(
+            f"{db_path} has no index on {', '.join(missing)}; contract history lookups "
+            "scan the whole table. Run ensure_contract_history_indexes() once to add them.",
+            RuntimeWarning,
+            stacklevel=4,
+        )
+    column_sql = ", ".join(CONTRACT_HISTORY_COLUMNS)
+    sql = (
+        f"SELECT {column_sql} FROM {table_name} WHERE {{column}} = ? "
+        "ORDER BY action_date, modification_number, contract_transaction_unique_key"
+    )
+    _HISTORY_CONNECTIONS[db_path] = (conn, sql)
+    return conn, sql
+
+
+@lru_cache(maxsize=4096)
+def _cached_contract_history(
+    db_path: str, column: str, value: str
+) -> tuple[ContractAction, ...]:
+    conn, sql = _contract_history_connection(db_path)
+    rows = conn.execute(sql.format(column=column), (value,)).fetchall()
+    return tuple(_to_contract_action(row) for row in rows)
+
+
+def get_contract_history(
+    award_key: Optional[str] = None,
+    *,
+    piid: Optional[str] = None,
+    db_path: Path | str = DEFAULT_DB_PATH,
+) -> tuple[ContractAction, ...]:
+    """Return every action recorded for one award, ordered by action date.
+
+    Exactly one of ``award_key`` (``contract_award_unique_key``) or ``piid``
+    (``award_id_piid``) must be supplied. The database is opened read-only;
+    lookups use the index on the key column when
+    :func:`ensure_contract_history_indexes` has created it (a warning is
+    issued otherwise), and results are kept in an in-process LRU cache; call
+    :func:`clear_contract_history_cache` after the database is reloaded.
+    """
+    if (award_key is None) == (piid is None):
+        raise ValueError("Provide exactly one of award_key or piid.")
+
+    column = "contract_award_unique_key" if award_key is not None else "award_id_piid"
+    value = str(award_key if award_key is not None else piid).strip()
+    resolved = str(Path(db_path).expanduser().resolve())
+    return _cached_contract_history(resolved, column, value)
+
+
+def clear_contract_history_cache() -> None:
+    """Drop cached contract histories and close the pooled lookup connections."""
+    _cached_contract_history.cache_clear()
+    while _HISTORY_CONNECTIONS:
+        _, (conn, _) = _HISTORY_CONNECTIONS.popitem()
+        conn.close()
+
+
 def prepare_solicitation_dataset(
     *,
     value_fields: Sequence[str] = (
@@ -213,32 +454,25 @@ def pivot_solicitation_share(
     return share_table
 
 
-def prepare_cost_dataset(
-    *,
-    db_path: Path | str = DEFAULT_DB_PATH,
-    additional_fields: Optional[Sequence[str]] = None,
-    additional_where: Optional[str] = None,
-) -> pd.DataFrame:
-    """Return fields required for value and duration analysis."""
-    columns = [
-        "solicitation_procedures",
-        "federal_action_obligation",
-        "base_and_exercised_options_value",
-        "base_and_all_options_value",
-        "current_total_value_of_award",
-        "potential_total_value_of_award",
-        "total_outlayed_amount_for_overall_award",
-        "period_of_performance_start_date",
-        "period_of_performance_current_end_date",
-        "period_of_performance_potential_end_date",
-        "number_of_offers_received",
-        "type_of_contract_pricing",
-        "extent_competed",
-    ]
-    if additional_fields:
-        columns.extend(additional_fields)
-    df = fetch_prime_transactions(columns, db_path=db_path, additional_where=additional_where)
-
+COST_DATASET_COLUMNS: tuple[str, ...] = (
+    "solicitation_procedures",
+    "federal_action_obligation",
+    "base_and_exercised_options_value",
+    "base_and_all_options_value",
+    "current_total_value_of_award",
+    "potential_total_value_of_award",
+    "total_outlayed_amount_for_overall_award",
+    "period_of_performance_start_date",
+    "period_of_performance_current_end_date",
+    "period_of_performance_potential_end_date",
+    "number_of_offers_received",
+    "type_of_contract_pricing",
+    "extent_competed",
+)
+
+
+def derive_cost_fields(df: pd.DataFrame) -> pd.DataFrame:
+    """Type the raw value columns and add performance years and annualized values in place."""
     numeric_cols = [
         "federal_action_obligation",
         "base_and_exercised_options_value",
@@ -281,6 +515,42 @@ def prepare_cost_dataset(
     return df
 
 
+def prepare_cost_dataset(
+    *,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    additional_fields: Optional[Sequence[str]] = None,
+    additional_where: Optional[str] = None,
+) -> pd.DataFrame:
+    """Return fields required for value and duration analysis."""
+    columns = list(COST_DATASET_COLUMNS)
+    if additional_fields:
+        columns.extend(additional_fields)
+    df = fetch_prime_transactions(columns, db_path=db_path, additional_where=additional_where)
+    return derive_cost_fields(df)
+
+
+def iter_cost_dataset(
+    *,
+    chunksize: int = 100_000,
+    db_path: Path | str = DEFAULT_DB_PATH,
+    naics_filter: Optional[Iterable[str]] = DEFAULT_SECURITY_NAICS,
+    additional_fields: Optional[Sequence[str]] = None,
+    additional_where: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Chunked counterpart of :func:`prepare_cost_dataset`."""
+    columns = list(COST_DATASET_COLUMNS)
+    if additional_fields:
+        columns.extend(additional_fields)
+    for chunk in iter_prime_transactions(
+        columns,
+        chunksize=chunksize,
+        db_path=db_path,
+        naics_filter=naics_filter,
+        additional_where=additional_where,
+    ):
+        yield derive_cost_fields(chunk)
+
+
 def summarize_cost_by_procedure(
     df: pd.DataFrame,
     *,
@@ -330,10 +600,20 @@ def summarize_cost_by_procedure(
 
 
 __all__ = [
+    "COST_DATASET_COLUMNS",
+    "ContractAction",
+    "build_prime_transactions_query",
+    "clear_contract_history_cache",
     "compute_solicitation_timeseries",
+    "derive_cost_fields",
+    "ensure_contract_history_indexes",
     "fetch_prime_transactions",
+    "get_contract_history",
+    "iter_cost_dataset",
+    "iter_prime_transactions",
     "list_prime_transaction_columns",
     "load_naics_codes",
+    "missing_contract_history_indexes",
     "prepare_cost_dataset",
     "pivot_solicitation_share",
     "prepare_solicitation_dataset",
@@ -0,0 +1,26 @@
+"""``compute_balance_table`` against the single-column pandas helpers."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from scripts.performance_outcomes import compute_balance_table, compute_cohens_d
+
+
+def test_variance_is_stable_for_large_offsets():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "x": 1e9 + rng.normal(size=2000),
+            "is_performance_based": rng.random(2000) < 0.4,
+        }
+    )
+    df.loc[5, "x"] = np.nan
+
+    row = compute_balance_table(df, ["x"]).iloc[0]
+
+    treated = df["is_performance_based"]
+    np.testing.assert_allclose(row["var_treated"], df.loc[treated, "x"].var(), rtol=1e-6)
+    np.testing.assert_allclose(row["var_control"], df.loc[~treated, "x"].var(), rtol=1e-6)
+    np.testing.assert_allclose(row["cohens_d"], compute_cohens_d(df, "x"), rtol=1e-6)
@@ -0,0 +1,62 @@
+"""Brute-force checks of ``match_propensity_scores``."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from scripts.performance_outcomes import match_propensity_scores
+
+
+def _brute_force_nearest(treated_score, treated_stratum, control_scores, control_strata, caliper):
+    candidates = np.flatnonzero(control_strata == treated_stratum)
+    if len(candidates) == 0:
+        return None
+    distances = np.abs(control_scores[candidates] - treated_score)
+    best = distances.min()
+    if caliper is not None and best > caliper:
+        return None
+    return best
+
+
+@pytest.mark.parametrize("replace", [True, False])
+@pytest.mark.parametrize("caliper", [None, 0.05])
+def test_matches_respect_strata_caliper_and_replacement(replace, caliper):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n_treated, n_control = rng.integers(1, 15), rng.integers(0, 15)
+        treated_scores = rng.random(n_treated)
+        control_scores = rng.random(n_control)
+        # Stratum 3 never has controls.
+        treated_strata = rng.integers(0, 4, n_treated)
+        control_strata = rng.integers(0, 3, n_control)
+
+        treated, control = match_propensity_scores(
+            treated_scores,
+            control_scores,
+            treated_strata=treated_strata,
+            control_strata=control_strata,
+            caliper=caliper,
+            replace=replace,
+        )
+
+        assert np.all(control >= 0)
+        assert len(np.unique(treated)) == len(treated)
+        assert np.all(treated_strata[treated] == control_strata[control])
+        distances = np.abs(treated_scores[treated] - control_scores[control])
+        if caliper is not None:
+            assert np.all(distances <= caliper)
+        if not replace:
+            assert len(np.unique(control)) == len(control)
+            continue
+
+        # With replacement every unit with an eligible control gets its nearest one.
+        expected = {
+            position: _brute_force_nearest(
+                treated_scores[position], treated_strata[position], control_scores, control_strata, caliper
+            )
+            for position in range(n_treated)
+        }
+        assert set(treated.tolist()) == {pos for pos, best in expected.items() if best is not None}
+        for position, distance in zip(treated, distances):
+            assert distance == pytest.approx(expected[position])
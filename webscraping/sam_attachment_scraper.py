@@ -7,27 +7,74 @@ python webscraping/sam_attachment_scraper.py \
     --keyword "security guard" \
     --tables fy2025_archived_opportunities \
     --pages 1 \
-    --output-dir webscraping/downloads
+    --output-dir webscraping/downloads \
+    --concurrency 4
 
 The script will open each opportunity link in Playwright, navigate to the
 "Attachments/Links" tab, click "Download All", and store the resulting ZIP file
-under the chosen output directory. Results are throttled with small random
-sleeps to mimic manual browsing.
+under the chosen output directory. With ``--concurrency N`` the opportunities
+are shared through a queue by N pages of one browser. Visits are throttled
+globally: whatever the concurrency, two page loads never start less than a
+random ``--throttle-min``..``--throttle-max`` seconds apart.
+
+Orchestrator mode replaces one process per table (``--all-tables``)::
+
+python webscraping/sam_attachment_scraper.py \
+    --all-tables \
+    --concurrency 6 \
+    --browsers 2 \
+    --output-dir webscraping/downloads \
+    --progress-file webscraping/download_logs/progress.json \
+    --headless
+
+Every populated ``fy*`` table is queued (newest fiscal year first, each table
+in its own ``--output-dir`` subfolder) and served by one pool of browsers that
+shares the concurrency and rate budget; per-table counters are rewritten to
+the progress file as opportunities finish.
+
+Every visit stores its outcome (``ok``, ``no_attachments``, ``timeout`` or
+``failed``) in ``AttachmentStatus`` with the time in ``AttachmentCheckedAt``.
+Runs resume by default (``--no-resume`` starts over): rows whose ``DownloadPath`` points at a
+readable ZIP and rows marked ``no_attachments`` are skipped (the latter until
+``--recheck-empty-after`` days have passed), and each table continues below
+the rowid checkpoint (per table and keyword) saved in ``scraper_checkpoints``;
+timed-out and failed rows are retried even above the checkpoint.
+
+Pages load lean by default: a ``page.route`` handler aborts images, media,
+fonts and third-party analytics (``--block-resources``/``--block-hosts``,
+``--no-blocking`` to disable), navigation only waits for
+``domcontentloaded`` and the attachments panel, and each page's requests,
+bytes, blocked requests and load time are logged and summed per table in
+the progress file.
 """
 from __future__ import annotations
 
 import argparse
 import asyncio
 import hashlib
+import json
 import logging
+import os
 import random
 import re
 import sqlite3
-from dataclasses import dataclass
+import time
+import zipfile
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
 
-from playwright.async_api import Browser, Page, TimeoutError as PlaywrightTimeoutError, async_playwright
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Error as PlaywrightError,
+    Page,
+    Request,
+    Route,
+    TimeoutError as PlaywrightTimeoutError,
+    async_playwright,
+)
 
 LOGGER = logging.getLogger("sam_attachment_scraper")
 DEFAULT_DB_PATH = Path("db/sam_archived_opportunities_filtered.sqlite")
@@ -36,6 +83,35 @@ INVALID_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
 MAX_FILENAME_LENGTH = 180
 MAX_PATH_LENGTH = 255
 DOWNLOAD_PATH_COLUMN = "DownloadPath"
+STATUS_COLUMN = "AttachmentStatus"
+CHECKED_AT_COLUMN = "AttachmentCheckedAt"
+CHECKPOINT_TABLE = "scraper_checkpoints"
+TABLE_NAME_PATTERN = "fy%"
+
+STATUS_OK = "ok"
+STATUS_NO_ATTACHMENTS = "no_attachments"
+STATUS_TIMEOUT = "timeout"
+STATUS_FAILED = "failed"
+
+ATTACHMENTS_TAB_NAME = "Attachments/Links"
+# Section the Attachments/Links tab scrolls to; button and empty-state lookups
+# are scoped to it so notice descriptions cannot match them.
+ATTACHMENTS_PANEL_SELECTOR = "#attachments-links"
+DOWNLOAD_ALL_NAME = re.compile("Download All", re.IGNORECASE)
+# Text SAM.gov shows in an attachments panel that has nothing to download.
+EMPTY_ATTACHMENTS_TEXT = re.compile(r"\bno (attachments|links|documents)\b", re.IGNORECASE)
+
+WAIT_UNTIL_CHOICES = ("commit", "domcontentloaded", "load", "networkidle")
+DEFAULT_BLOCKED_RESOURCES = ("image", "media", "font")
+# Analytics and tag hosts seen on SAM.gov; subdomains are matched too.
+DEFAULT_BLOCKED_HOSTS = (
+    "dap.digitalgov.gov",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "newrelic.com",
+    "nr-data.net",
+)
 
 
 @dataclass
@@ -44,6 +120,222 @@ class Opportunity:
     title: str
     link: str
     table: str
+    priority: int = 0  # lower runs first: the table's position in the table list
+    rowid: Optional[int] = None
+
+
+@dataclass
+class DownloadResult:
+    status: str  # STATUS_OK, STATUS_NO_ATTACHMENTS, STATUS_TIMEOUT or STATUS_FAILED
+    path: Optional[Path] = None
+    load_seconds: Optional[float] = None  # navigation until the attachments panel resolved
+
+
+@dataclass
+class PageStats:
+    """Traffic of one page visit: finished requests, their bytes and blocked requests."""
+
+    requests: int = 0
+    bytes: int = 0
+    blocked: Dict[str, int] = field(default_factory=dict)
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = {}
+
+    def describe(self) -> str:
+        blocked = ", ".join(f"{reason} {count}" for reason, count in sorted(self.blocked.items()))
+        return (
+            f"{self.bytes / 1024:.0f} KiB in {self.requests} requests, "
+            f"{sum(self.blocked.values())} blocked" + (f" ({blocked})" if blocked else "")
+        )
+
+
+class ResourceBlocker:
+    """``page.route`` interception aborting requests the scraper never needs.
+
+    Requests are blocked by Playwright resource type (``image``, ``font``, ...)
+    or by host, matching subdomains. :meth:`attach` also counts each page's
+    finished requests and their transferred bytes.
+    """
+
+    def __init__(self, resource_types: Iterable[str], hosts: Iterable[str]) -> None:
+        self.resource_types = frozenset(resource_types)
+        self.hosts = tuple(host.lower().lstrip(".") for host in hosts)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.resource_types or self.hosts)
+
+    def block_reason(self, request: Request) -> Optional[str]:
+        if request.resource_type in self.resource_types:
+            return request.resource_type
+        hostname = (urlsplit(request.url).hostname or "").lower()
+        if any(hostname == host or hostname.endswith(f".{host}") for host in self.hosts):
+            return "host"
+        return None
+
+    async def attach(self, page: Page) -> PageStats:
+        stats = PageStats()
+
+        async def handle(route: Route) -> None:
+            reason = self.block_reason(route.request)
+            if reason is None:
+                await route.continue_()
+                return
+            stats.blocked[reason] = stats.blocked.get(reason, 0) + 1
+            await route.abort()
+
+        async def on_finished(request: Request) -> None:
+            stats.requests += 1
+            try:
+                sizes = await request.sizes()
+            except PlaywrightError:  # pragma: no cover - the page may be gone
+                return
+            stats.bytes += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+        if self.enabled:
+            await page.route("**/*", handle)
+        page.on("requestfinished", on_finished)
+        return stats
+
+
+class RateLimiter:
+    """Space out request starts across all workers.
+
+    Every call to :meth:`wait` reserves the next start slot, then sleeps until
+    it; consecutive slots are a random ``min_interval``..``max_interval``
+    seconds apart, so the overall request rate does not grow with the number
+    of workers.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + random.uniform(self.min_interval, self.max_interval)
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ProgressTracker:
+    """Per-table counters, rewritten as JSON whenever an opportunity finishes.
+
+    ``outcome`` is a free-form label (a download status such as ``ok`` or
+    ``no_attachments``, or ``error``); each table keeps one counter per label
+    next to its ``total`` and ``done`` counts and its start and finish times.
+    """
+
+    def __init__(self, path: Optional[Path], totals: Mapping[str, int]) -> None:
+        self.path = path
+        self.tables: Dict[str, Dict[str, object]] = {
+            table: {"total": total, "done": 0, "started_at": None, "finished_at": None}
+            for table, total in totals.items()
+        }
+        self.write()
+
+    def start(self, table: str) -> None:
+        entry = self.tables[table]
+        if entry["started_at"] is None:
+            entry["started_at"] = _timestamp()
+            self.write()
+
+    def record(self, table: str, outcome: str) -> None:
+        entry = self.tables[table]
+        entry["done"] = int(entry["done"]) + 1
+        entry[outcome] = int(entry.get(outcome, 0)) + 1
+        if entry["done"] == entry["total"]:
+            entry["finished_at"] = _timestamp()
+        self.write()
+
+    def add_page(self, table: str, stats: PageStats, load_seconds: Optional[float]) -> None:
+        """Add one visit's traffic and load time to the table's totals."""
+        entry = self.tables[table]
+        entry["pages"] = int(entry.get("pages", 0)) + 1
+        entry["bytes"] = int(entry.get("bytes", 0)) + stats.bytes
+        entry["blocked_requests"] = int(entry.get("blocked_requests", 0)) + sum(stats.blocked.values())
+        if load_seconds is not None:
+            entry["loaded_pages"] = int(entry.get("loaded_pages", 0)) + 1
+            entry["load_seconds"] = round(float(entry.get("load_seconds", 0.0)) + load_seconds, 3)
+
+    def totals(self) -> Dict[str, float]:
+        """Pages, bytes, blocked requests and load seconds summed over all tables."""
+        keys = ("pages", "bytes", "blocked_requests", "loaded_pages", "load_seconds")
+        return {key: sum(float(entry.get(key, 0)) for entry in self.tables.values()) for key in keys}
+
+    def write(self) -> None:
+        if self.path is None:
+            return
+        payload = {"updated_at": _timestamp(), "tables": self.tables}
+        # Write then rename so a reader never sees a half-written file.
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class CheckpointTracker:
+    """Move each table's rowid checkpoint over the rows that have finished.
+
+    Rows are queued in descending rowid order, so once every queued row down
+    to rowid ``r`` has finished, a restart can continue below ``r``. Workers
+    finish out of order; the checkpoint only advances over an unbroken run of
+    finished rows, so an interrupted run never skips unfinished work. With
+    ``resume``, rows at or above the saved checkpoint (timeout and failed
+    retries) are not tracked, so the checkpoint only ever moves down.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        keyword: Optional[str],
+        opportunities: Sequence[Opportunity],
+        *,
+        resume: bool = True,
+    ) -> None:
+        self.conn = conn
+        self.keyword = checkpoint_keyword(keyword)
+        self._limit: Dict[str, Optional[int]] = {}
+        self._order: Dict[str, List[int]] = {}
+        for opportunity in opportunities:
+            if opportunity.rowid is None:
+                continue
+            table = opportunity.table
+            if table not in self._limit:
+                self._limit[table] = load_checkpoint(conn, table, keyword) if resume else None
+            limit = self._limit[table]
+            if limit is None or opportunity.rowid < limit:
+                self._order.setdefault(table, []).append(opportunity.rowid)
+        self._position = {table: 0 for table in self._order}
+        self._finished: Dict[str, set] = {table: set() for table in self._order}
+
+    def finish(self, opportunity: Opportunity) -> None:
+        table = opportunity.table
+        limit = self._limit.get(table)
+        if opportunity.rowid is None or table not in self._order:
+            return
+        if limit is not None and opportunity.rowid >= limit:
+            return
+        self._finished[table].add(opportunity.rowid)
+        order = self._order[table]
+        start = position = self._position[table]
+        while position < len(order) and order[position] in self._finished[table]:
+            position += 1
+        if position > start:
+            self._position[table] = position
+            save_checkpoint(self.conn, table, self.keyword, order[position - 1])
+
+
+def _timestamp() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
 
 
 def parse_args() -> argparse.Namespace:
@@ -60,8 +352,13 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--tables",
         nargs="*",
-        default=[DEFAULT_TABLE],
-        help="One or more tables to scan for links (ordered priority).",
+        default=None,
+        help=f"One or more tables to scan for links (ordered priority; default {DEFAULT_TABLE}).",
+    )
+    parser.add_argument(
+        "--all-tables",
+        action="store_true",
+        help="Orchestrator mode: queue every populated fy* table (newest first) in one process.",
     )
     parser.add_argument(
         "--keyword",
@@ -72,8 +369,11 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--pages",
         type=int,
-        default=1,
-        help="How many 25-result pages to process (page size is configurable).",
+        default=None,
+        help=(
+            "How many 25-result pages to process (page size is configurable); 1 by default. "
+            "With --all-tables the limit applies per table and defaults to every row."
+        ),
     )
     parser.add_argument(
         "--page-size",
@@ -104,17 +404,79 @@ def parse_args() -> argparse.Namespace:
         default=60,
         help="Timeout in seconds while waiting for the ZIP to finish downloading.",
     )
+    parser.add_argument(
+        "--panel-timeout",
+        type=float,
+        default=10,
+        help="Seconds to wait for the attachments panel (button or empty state) after loading.",
+    )
+    parser.add_argument(
+        "--wait-until",
+        choices=WAIT_UNTIL_CHOICES,
+        default="domcontentloaded",
+        help="Navigation event to wait for before looking for the attachments panel.",
+    )
+    parser.add_argument(
+        "--block-resources",
+        nargs="*",
+        default=list(DEFAULT_BLOCKED_RESOURCES),
+        help="Playwright resource types to abort (e.g. image media font stylesheet).",
+    )
+    parser.add_argument(
+        "--block-hosts",
+        nargs="*",
+        default=list(DEFAULT_BLOCKED_HOSTS),
+        help="Hosts (and their subdomains) whose requests are aborted.",
+    )
+    parser.add_argument(
+        "--no-blocking",
+        action="store_true",
+        help="Disable request interception (same as empty --block-resources and --block-hosts).",
+    )
     parser.add_argument(
         "--throttle-min",
         type=float,
         default=2.5,
-        help="Minimum seconds to wait between opportunities.",
+        help="Minimum seconds between the start of two opportunities (across all workers).",
     )
     parser.add_argument(
         "--throttle-max",
         type=float,
         default=5.5,
-        help="Maximum seconds to wait between opportunities.",
+        help="Maximum seconds between the start of two opportunities (across all workers).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of browser pages processing opportunities in parallel.",
+    )
+    parser.add_argument(
+        "--browsers",
+        type=int,
+        default=1,
+        help="Chromium instances sharing the --concurrency pages (round-robin).",
+    )
+    parser.add_argument(
+        "--progress-file",
+        type=Path,
+        default=None,
+        help="JSON file with per-table progress counters, rewritten as work completes.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help=(
+            "Process every row again: ignore saved DownloadPath/AttachmentStatus values "
+            "and restart the rowid checkpoints."
+        ),
+    )
+    parser.add_argument(
+        "--recheck-empty-after",
+        type=float,
+        default=None,
+        help="Revisit no_attachments notices last checked more than this many days ago.",
     )
     parser.add_argument(
         "--verbose",
@@ -123,10 +485,27 @@ def parse_args() -> argparse.Namespace:
     )
     args = parser.parse_args()
 
-    if args.pages < 1:
+    if args.all_tables and args.tables:
+        parser.error("--all-tables and --tables are mutually exclusive")
+    if not args.all_tables and not args.tables:
+        args.tables = [DEFAULT_TABLE]
+    if args.pages is None and not args.all_tables:
+        args.pages = 1
+    if args.pages is not None and args.pages < 1:
         parser.error("--pages must be >= 1")
     if args.page_size < 1:
         parser.error("--page-size must be >= 1")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+    if args.browsers < 1:
+        parser.error("--browsers must be >= 1")
+    if args.no_blocking:
+        args.block_resources = []
+        args.block_hosts = []
+    if args.panel_timeout <= 0:
+        parser.error("--panel-timeout must be > 0")
+    if args.recheck_empty_after is not None and args.recheck_empty_after < 0:
+        parser.error("--recheck-empty-after must be >= 0")
     if args.throttle_min < 0 or args.throttle_max < 0 or args.throttle_min > args.throttle_max:
         parser.error("Throttle values must be non-negative and min <= max")
     return args
@@ -137,15 +516,64 @@ def sanitize_filename(name: str) -> str:
     return INVALID_FILENAME_CHARS.sub("_", name.strip()) or "attachment"
 
 
-def ensure_download_column(conn: sqlite3.Connection, table: str) -> None:
-    """Ensure the destination table has a column for storing download paths."""
+def ensure_tracking_columns(conn: sqlite3.Connection, table: str) -> None:
+    """Ensure the table has the download-path, attachment-status and checked-at columns."""
     cursor = conn.execute(f'PRAGMA table_info("{table}")')
     columns = {row[1] for row in cursor.fetchall()}
-    if DOWNLOAD_PATH_COLUMN not in columns:
-        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{DOWNLOAD_PATH_COLUMN}" TEXT')
+    added = False
+    for column in (DOWNLOAD_PATH_COLUMN, STATUS_COLUMN, CHECKED_AT_COLUMN):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" TEXT')
+            added = True
+    if added:
         conn.commit()
 
 
+def ensure_checkpoint_table(conn: sqlite3.Connection) -> None:
+    """Create the table holding the per-table, per-keyword rowid checkpoints."""
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{CHECKPOINT_TABLE}" ('
+        "table_name TEXT NOT NULL, keyword TEXT NOT NULL, last_rowid INTEGER NOT NULL, "
+        "updated_at TEXT NOT NULL, PRIMARY KEY (table_name, keyword))"
+    )
+    conn.commit()
+
+
+def checkpoint_keyword(keyword: Optional[str]) -> str:
+    """Checkpoint key of a Title filter: a keyword run only covers matching rows."""
+    return keyword.lower() if keyword else ""
+
+
+def load_checkpoint(conn: sqlite3.Connection, table: str, keyword: Optional[str]) -> Optional[int]:
+    """Return the rowid a table's previous run finished down to, if any."""
+    row = conn.execute(
+        f'SELECT last_rowid FROM "{CHECKPOINT_TABLE}" WHERE table_name = ? AND keyword = ?',
+        (table, checkpoint_keyword(keyword)),
+    ).fetchone()
+    return None if row is None else int(row[0])
+
+
+def save_checkpoint(conn: sqlite3.Connection, table: str, keyword: str, last_rowid: int) -> None:
+    conn.execute(
+        f'INSERT INTO "{CHECKPOINT_TABLE}" (table_name, keyword, last_rowid, updated_at) '
+        "VALUES (?, ?, ?, ?) ON CONFLICT (table_name, keyword) "
+        "DO UPDATE SET last_rowid = excluded.last_rowid, updated_at = excluded.updated_at",
+        (table, keyword, last_rowid, _timestamp()),
+    )
+    conn.commit()
+
+
+def verify_download(path_value: str | None) -> bool:
+    """True when a stored ``DownloadPath`` points at a non-empty, readable ZIP."""
+    if not path_value:
+        return False
+    path = Path(path_value)
+    try:
+        return path.is_file() and path.stat().st_size > 0 and zipfile.is_zipfile(path)
+    except OSError:
+        return False
+
+
 def truncate_filename(filename: str, max_length: int = MAX_FILENAME_LENGTH) -> str:
     """Truncate overly long filenames while retaining uniqueness with a hash suffix."""
     if len(filename) <= max_length:
@@ -209,16 +637,63 @@ def record_download_path(conn: sqlite3.Connection, opportunity: Opportunity, dow
         LOGGER.debug("No row updated for %s in %s", opportunity.notice_id, opportunity.table)
 
 
+def record_status(conn: sqlite3.Connection, opportunity: Opportunity, status: str) -> None:
+    """Store the attachment status of an opportunity and when it was observed."""
+    conn.execute(
+        f'UPDATE "{opportunity.table}" SET "{STATUS_COLUMN}" = ?, "{CHECKED_AT_COLUMN}" = ? '
+        "WHERE NoticeId = ?",
+        (status, _timestamp(), opportunity.notice_id),
+    )
+    conn.commit()
+
+
+def discover_tables(db_path: Path) -> List[str]:
+    """Return the populated ``fy*`` tables of the database, newest fiscal year first."""
+    if not db_path.exists():
+        raise FileNotFoundError(db_path)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        names = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ORDER BY name DESC",
+                (TABLE_NAME_PATTERN,),
+            )
+        ]
+        return [name for name in names if conn.execute(f'SELECT 1 FROM "{name}" LIMIT 1').fetchone()]
+    finally:
+        conn.close()
+
+
 def fetch_opportunities(
     db_path: Path,
     tables: Sequence[str],
     keyword: str | None,
-    limit: int,
+    limit: int | None,
+    per_table_limit: int | None = None,
+    *,
+    resume: bool = False,
+    recheck_empty_after: float | None = None,
 ) -> List[Opportunity]:
+    """Collect opportunities with a link, table by table in priority order.
+
+    ``limit`` caps the total across tables and ``per_table_limit`` each table;
+    ``None`` means no cap. With ``resume``, rows with a verified download or
+    the ``no_attachments`` status and rows above the table's checkpoint are
+    left out (and do not count towards the limits). Rows whose last visit
+    timed out or failed, and ``no_attachments`` rows checked more than
+    ``recheck_empty_after`` days ago, are visited again even above the
+    checkpoint.
+    """
     if not db_path.exists():
         raise FileNotFoundError(db_path)
 
     keyword_like = f"%{keyword.lower()}%" if keyword else None
+    recheck_before = (
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - recheck_empty_after * 86400))
+        if recheck_empty_after is not None
+        else None
+    )
 
     conn = sqlite3.connect(str(db_path))
     conn.text_factory = lambda b: b.decode("utf-8", "replace") if isinstance(b, bytes) else str(b)
@@ -226,44 +701,97 @@ def fetch_opportunities(
     opportunities: List[Opportunity] = []
 
     try:
-        for table in tables:
-            remaining = limit - len(opportunities)
-            if remaining <= 0:
+        ensure_checkpoint_table(conn)
+        for priority, table in enumerate(tables):
+            remaining = None if limit is None else limit - len(opportunities)
+            if remaining is not None and remaining <= 0:
                 break
-            ensure_download_column(conn, table)
-            sql = f"SELECT NoticeId, Title, Link FROM {table} WHERE Link IS NOT NULL AND Link != ''"
+            if per_table_limit is not None:
+                remaining = per_table_limit if remaining is None else min(remaining, per_table_limit)
+            ensure_tracking_columns(conn, table)
+            sql = (
+                f'SELECT rowid, NoticeId, Title, Link, "{DOWNLOAD_PATH_COLUMN}" AS download_path '
+                f"FROM {table} WHERE Link IS NOT NULL AND Link != ''"
+            )
             params: List[object] = []
             if keyword_like:
                 sql += " AND lower(Title) LIKE ?"
                 params.append(keyword_like)
-            sql += " ORDER BY rowid DESC LIMIT ?"
-            params.append(remaining)
+            checkpoint = load_checkpoint(conn, table, keyword) if resume else None
+            # Timestamps are ISO strings, so they compare chronologically; a
+            # NULL recheck_before never expires the no_attachments status.
+            expired_empty = f'("{STATUS_COLUMN}" = ? AND "{CHECKED_AT_COLUMN}" < ?)'
+            if checkpoint is not None:
+                sql += f' AND (rowid < ? OR "{STATUS_COLUMN}" IN (?, ?) OR {expired_empty})'
+                params.extend(
+                    [checkpoint, STATUS_TIMEOUT, STATUS_FAILED, STATUS_NO_ATTACHMENTS, recheck_before]
+                )
+            if resume:
+                sql += f' AND ("{STATUS_COLUMN}" IS NULL OR "{STATUS_COLUMN}" != ? OR {expired_empty})'
+                params.extend([STATUS_NO_ATTACHMENTS, STATUS_NO_ATTACHMENTS, recheck_before])
+            sql += " ORDER BY rowid DESC"
 
-            LOGGER.debug("Querying %s (remaining=%s)", table, remaining)
+            LOGGER.debug("Querying %s (remaining=%s, checkpoint=%s)", table, remaining, checkpoint)
+            taken = verified = 0
             for row in conn.execute(sql, params):
+                if remaining is not None and taken >= remaining:
+                    break
+                if resume and verify_download(row["download_path"]):
+                    verified += 1
+                    continue
+                if row["download_path"] and resume:
+                    LOGGER.info("Stored download for %s is missing or unreadable; retrying", row["NoticeId"])
                 opportunities.append(
                     Opportunity(
                         notice_id=row["NoticeId"],
                         title=row["Title"],
                         link=row["Link"],
                         table=table,
+                        priority=priority,
+                        rowid=row["rowid"],
                     )
                 )
+                taken += 1
+            if verified or checkpoint is not None:
+                LOGGER.info(
+                    "%s: resuming below rowid %s, skipped %s verified downloads",
+                    table,
+                    checkpoint if checkpoint is not None else "<none>",
+                    verified,
+                )
     finally:
         conn.close()
 
     return opportunities
 
 
-async def ensure_attachments_tab(page: Page) -> None:
-    """Switch to the Attachments/Links tab if present."""
+async def wait_for_attachments_panel(page: Page, timeout_ms: float) -> Optional[bool]:
+    """Wait until the attachments panel shows a Download All button or an empty state.
+
+    The button and the empty-state text are only looked up inside
+    ``ATTACHMENTS_PANEL_SELECTOR``. A single ``locator.or_`` wait resolves as
+    soon as the Attachments/Links tab, the button or the empty state renders;
+    if the tab came first it is clicked. The panel itself must then render
+    before the button-or-empty wait decides. Returns ``True`` for a button,
+    ``False`` for an empty panel and ``None`` when nothing appeared within
+    ``timeout_ms`` per wait.
+    """
+    tab = page.get_by_role("link", name=ATTACHMENTS_TAB_NAME)
+    panel = page.locator(ATTACHMENTS_PANEL_SELECTOR)
+    button = panel.get_by_role("button", name=DOWNLOAD_ALL_NAME)
+    empty = panel.get_by_text(EMPTY_ATTACHMENTS_TEXT)
     try:
-        tab = page.get_by_role("link", name="Attachments/Links")
-        await tab.wait_for(state="visible", timeout=5000)
-        await tab.click()
-        await page.wait_for_timeout(500)  # allow content to swap
+        await tab.or_(button).or_(empty).first.wait_for(state="visible", timeout=timeout_ms)
+        if await button.first.is_visible():
+            return True
+        if await tab.first.is_visible():
+            await tab.first.click()
+        await panel.first.wait_for(state="visible", timeout=timeout_ms)
+        await button.or_(empty).first.wait_for(state="visible", timeout=timeout_ms)
     except PlaywrightTimeoutError:
-        LOGGER.debug("Attachments tab not found on %s", page.url)
+        LOGGER.debug("Attachments panel did not render on %s", page.url)
+        return None
+    return await button.first.is_visible()
 
 
 async def download_bundle(
@@ -272,23 +800,26 @@ async def download_bundle(
     destination_dir: Path,
     nav_timeout: int,
     download_timeout: int,
-) -> Path | None:
+    panel_timeout: float = 10,
+    wait_until: str = "domcontentloaded",
+) -> DownloadResult:
+    start = time.perf_counter()
     try:
-        await page.goto(opportunity.link, wait_until="networkidle", timeout=nav_timeout * 1000)
+        await page.goto(opportunity.link, wait_until=wait_until, timeout=nav_timeout * 1000)
     except PlaywrightTimeoutError:
         LOGGER.warning("Navigation timed out for %s", opportunity.link)
-        return None
+        return DownloadResult(STATUS_TIMEOUT)
 
-    # Allow the layout to settle before we search for the attachments panel.
-    await page.wait_for_timeout(2000)
-    await ensure_attachments_tab(page)
-
-    download_button = page.get_by_role("button", name=re.compile("Download All", re.IGNORECASE))
-    try:
-        await download_button.wait_for(state="visible", timeout=5000)
-    except PlaywrightTimeoutError:
-        LOGGER.info("No 'Download All' button for %s", opportunity.notice_id)
-        return None
+    has_button = await wait_for_attachments_panel(page, panel_timeout * 1000)
+    load_seconds = time.perf_counter() - start
+    if has_button is None:
+        # Nothing rendered in time: a slow page, not evidence of an empty one.
+        LOGGER.warning("Attachments panel did not render for %s", opportunity.notice_id)
+        return DownloadResult(STATUS_TIMEOUT, load_seconds=load_seconds)
+    if not has_button:
+        LOGGER.info("No 'Download All' button for %s (empty attachments panel)", opportunity.notice_id)
+        return DownloadResult(STATUS_NO_ATTACHMENTS, load_seconds=load_seconds)
+    download_button = page.get_by_role("button", name=DOWNLOAD_ALL_NAME).first
 
     try:
         async with page.expect_download(timeout=download_timeout * 1000) as download_info:
@@ -297,52 +828,202 @@ async def download_bundle(
         LOGGER.debug("Download URL for %s: %s", opportunity.notice_id, download.url)
     except PlaywrightTimeoutError:
         LOGGER.warning("Download timed out for %s", opportunity.notice_id)
-        return None
+        return DownloadResult(STATUS_TIMEOUT, load_seconds=load_seconds)
 
     output_path = build_output_path(destination_dir, opportunity, download.suggested_filename)
     try:
         await download.save_as(output_path)
     except OSError as exc:  # pragma: no cover - safety net for unforeseen filesystem issues
         LOGGER.error("Failed to save download for %s: %s", opportunity.notice_id, exc)
-        return None
+        return DownloadResult(STATUS_FAILED, load_seconds=load_seconds)
     LOGGER.info("Saved %s (%s)", output_path, opportunity.title)
-    return output_path
+    return DownloadResult(STATUS_OK, output_path, load_seconds)
+
+
+QueueItem = Tuple[int, int, Optional[Opportunity]]
+
+
+def opportunity_output_dir(args: argparse.Namespace, opportunity: Opportunity) -> Path:
+    """Download folder of an opportunity: one subfolder per table in orchestrator mode."""
+    if args.all_tables:
+        return args.output_dir / opportunity.table
+    return args.output_dir
+
+
+async def scrape_worker(
+    worker_id: int,
+    context: BrowserContext,
+    queue: "asyncio.PriorityQueue[QueueItem]",
+    limiter: RateLimiter,
+    db_conn: sqlite3.Connection,
+    args: argparse.Namespace,
+    total: int,
+    progress: ProgressTracker,
+    checkpoints: CheckpointTracker,
+    blocker: ResourceBlocker,
+) -> Tuple[int, int]:
+    """Process queued opportunities on a dedicated page until a sentinel.
+
+    Queue items are ``(priority, index, opportunity)``; sentinels carry no
+    opportunity and sort after all real work. Errors are contained per
+    opportunity: the failure is logged, the page is replaced in case it
+    crashed, and the worker moves on. Returns the number of successful
+    downloads and failed opportunities.
+    """
+    successes = failures = 0
+    page = await context.new_page()
+    stats = await blocker.attach(page)
+    try:
+        while True:
+            _, idx, opportunity = await queue.get()
+            try:
+                if opportunity is None:
+                    return successes, failures
+                await limiter.wait()
+                progress.start(opportunity.table)
+                LOGGER.info(
+                    "[%s/%s] Worker %s processing %s (%s)",
+                    idx,
+                    total,
+                    worker_id,
+                    opportunity.notice_id,
+                    opportunity.table,
+                )
+                stats.reset()
+                try:
+                    result = await download_bundle(
+                        page,
+                        opportunity,
+                        opportunity_output_dir(args, opportunity),
+                        args.nav_timeout,
+                        args.download_timeout,
+                        args.panel_timeout,
+                        args.wait_until,
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    failures += 1
+                    progress.record(opportunity.table, "error")
+                    # Marked failed so a resumed run retries it despite the checkpoint.
+                    record_status(db_conn, opportunity, STATUS_FAILED)
+                    checkpoints.finish(opportunity)
+                    LOGGER.exception("Worker %s failed on %s", worker_id, opportunity.notice_id)
+                    try:
+                        await page.close()
+                    except Exception:  # pragma: no cover - the page may already be gone
+                        pass
+                    page = await context.new_page()
+                    stats = await blocker.attach(page)
+                    continue
+                if result.path is not None:
+                    successes += 1
+                    record_download_path(db_conn, opportunity, result.path)
+                record_status(db_conn, opportunity, result.status)
+                LOGGER.info(
+                    "Page %s: %s, loaded in %s",
+                    opportunity.notice_id,
+                    stats.describe(),
+                    "n/a" if result.load_seconds is None else f"{result.load_seconds:.1f}s",
+                )
+                progress.add_page(opportunity.table, stats, result.load_seconds)
+                progress.record(opportunity.table, result.status)
+                checkpoints.finish(opportunity)
+            finally:
+                queue.task_done()
+    finally:
+        if not page.is_closed():
+            await page.close()
 
 
 async def process_opportunities(args: argparse.Namespace, opportunities: Sequence[Opportunity]) -> None:
-    args.output_dir.mkdir(parents=True, exist_ok=True)
+    """Run the worker pool over ``opportunities``, highest-priority tables first.
 
+    ``--concurrency`` pages are spread round-robin over ``--browsers``
+    Chromium instances; all of them share one queue, one rate limiter and
+    one progress tracker.
+    """
     db_conn = sqlite3.connect(str(args.db))
     db_conn.text_factory = lambda b: b.decode("utf-8", "replace") if isinstance(b, bytes) else str(b)
 
-    for table in sorted({op.table for op in opportunities}):
-        ensure_download_column(db_conn, table)
+    totals: Dict[str, int] = {}
+    for opportunity in opportunities:
+        totals[opportunity.table] = totals.get(opportunity.table, 0) + 1
+    for table in sorted(totals):
+        ensure_tracking_columns(db_conn, table)
+    ensure_checkpoint_table(db_conn)
+    checkpoints = CheckpointTracker(db_conn, args.keyword, opportunities, resume=args.resume)
+    for opportunity in {op.table: op for op in opportunities}.values():
+        opportunity_output_dir(args, opportunity).mkdir(parents=True, exist_ok=True)
+    if args.progress_file is not None:
+        args.progress_file.parent.mkdir(parents=True, exist_ok=True)
+    progress = ProgressTracker(args.progress_file, totals)
+
+    workers = min(args.concurrency, len(opportunities))
+    queue: "asyncio.PriorityQueue[QueueItem]" = asyncio.PriorityQueue()
+    for idx, opportunity in enumerate(opportunities, start=1):
+        queue.put_nowait((opportunity.priority, idx, opportunity))
+    # Sentinels sort after every real item, so each worker drains the queue first.
+    sentinel_priority = max(op.priority for op in opportunities) + 1
+    for worker_id in range(workers):
+        queue.put_nowait((sentinel_priority, len(opportunities) + 1 + worker_id, None))
+    limiter = RateLimiter(args.throttle_min, args.throttle_max)
+    blocker = ResourceBlocker(args.block_resources, args.block_hosts)
 
     async with async_playwright() as playwright:
-        browser: Browser = await playwright.chromium.launch(headless=args.headless)
-        context = await browser.new_context(accept_downloads=True)
-        page = await context.new_page()
-
-        successes = 0
-        for idx, opportunity in enumerate(opportunities, start=1):
-            LOGGER.info("[%s/%s] Processing %s (%s)", idx, len(opportunities), opportunity.notice_id, opportunity.table)
-            downloaded = await download_bundle(
-                page,
-                opportunity,
-                args.output_dir,
-                args.nav_timeout,
-                args.download_timeout,
-            )
-            if downloaded:
-                successes += 1
-                record_download_path(db_conn, opportunity, downloaded)
+        browsers: List[Browser] = []
+        contexts: List[BrowserContext] = []
+        for _ in range(min(args.browsers, workers)):
+            browser = await playwright.chromium.launch(headless=args.headless)
+            browsers.append(browser)
+            contexts.append(await browser.new_context(accept_downloads=True))
 
-            sleep_for = random.uniform(args.throttle_min, args.throttle_max)
-            await asyncio.sleep(sleep_for)
+        results = await asyncio.gather(
+            *(
+                scrape_worker(
+                    worker_id,
+                    contexts[(worker_id - 1) % len(contexts)],
+                    queue,
+                    limiter,
+                    db_conn,
+                    args,
+                    len(opportunities),
+                    progress,
+                    checkpoints,
+                    blocker,
+                )
+                for worker_id in range(1, workers + 1)
+            ),
+            return_exceptions=True,
+        )
+        successes = failures = 0
+        for worker_id, result in enumerate(results, start=1):
+            if isinstance(result, BaseException):
+                LOGGER.error("Worker %s stopped: %r", worker_id, result)
+                continue
+            successes += result[0]
+            failures += result[1]
 
-        LOGGER.info("Finished: %s/%s downloads succeeded", successes, len(opportunities))
-        await context.close()
-        await browser.close()
+        LOGGER.info(
+            "Finished: %s/%s downloads succeeded (%s errors, %s workers, %s browsers)",
+            successes,
+            len(opportunities),
+            failures,
+            workers,
+            len(browsers),
+        )
+        traffic = progress.totals()
+        if traffic["pages"]:
+            LOGGER.info(
+                "Average page: %.0f KiB, %.1f blocked requests, %.1fs to the attachments panel",
+                traffic["bytes"] / 1024 / traffic["pages"],
+                traffic["blocked_requests"] / traffic["pages"],
+                traffic["load_seconds"] / max(traffic["loaded_pages"], 1),
+            )
+        for context in contexts:
+            await context.close()
+        for browser in browsers:
+            await browser.close()
     db_conn.close()
 
 
@@ -353,16 +1034,37 @@ async def main() -> None:
         format="%(asctime)s - %(levelname)s - %(message)s",
     )
 
-    limit = args.pages * args.page_size
+    if args.all_tables:
+        tables = discover_tables(args.db)
+        limit = None
+        per_table_limit = args.pages * args.page_size if args.pages is not None else None
+    else:
+        tables = args.tables
+        limit = args.pages * args.page_size
+        per_table_limit = None
+    if limit is not None:
+        scope = f"up to {limit}"
+    elif per_table_limit is not None:
+        scope = f"up to {per_table_limit} per table"
+    else:
+        scope = "all"
     LOGGER.info(
-        "Querying up to %s opportunities from %s (tables=%s, keyword=%s)",
-        limit,
+        "Querying %s opportunities from %s (tables=%s, keyword=%s)",
+        scope,
         args.db,
-        ",".join(args.tables),
+        ",".join(tables),
         args.keyword or "<any>",
     )
 
-    opportunities = fetch_opportunities(args.db, args.tables, args.keyword, limit)
+    opportunities = fetch_opportunities(
+        args.db,
+        tables,
+        args.keyword,
+        limit,
+        per_table_limit,
+        resume=args.resume,
+        recheck_empty_after=args.recheck_empty_after,
+    )
     if not opportunities:
         LOGGER.warning("No opportunities matched the filters")
         return